@@ -13,6 +13,7 @@ import seaborn as sns
 
 # own code
 import src.Movers as movers
+import src.Reachability as reachability
 
 if __name__ == '__main__':
 
@@ -21,92 +22,40 @@ if __name__ == '__main__':
     rb = movers.RiverBoat.get_default(delta_t)
 
     # define the initial conditions
-    initial_conditions = dict()
-    initial_conditions['x_pos'] = 0.0
-    initial_conditions['y_pos'] = 0.0
-    initial_conditions['v_xp'] = 0.25
-    initial_conditions['v_yp'] = 0.0
-    initial_conditions['v_x'] = 0.0
-    initial_conditions['v_y'] = 0.0
-    initial_conditions['psi'] = np.deg2rad(45.0)
-
-    # reset all of the information of the boat
-    rb.initalize_in_state_dict()
-
-    # set initial conditions to desited state
-    for key, item in initial_conditions.items():
-        rb.state_dict[key] = item
-
-    # get the maximum distance a boat can travel
+    start = (0.0, 0.0)
+    v_xp = 0.25
+    psi = np.deg2rad(45.0)
+
+    # range of propeller angles to sweep over for polygon. The straight run at zero degrees gives the maximum distance
     max_t = 10.0
-    t = 0
-    while t < max_t:
-        rb.step(t)
+    delta_values = np.deg2rad(np.linspace(-45,45,51))
+    rs = reachability.ReachableSet.create(rb, start=start, speeds=[v_xp], headings=[psi],
+                                          propeller_angles=delta_values, horizon=max_t)
 
-        t += delta_t
-    max_dst = np.sqrt(rb.state_dict['x_pos']**2 + rb.state_dict['y_pos']**2)
+    # ending location of the boat for every propeller angle
+    end_points = rs.get_end_points()[:, 0, :]
+    x_end = end_points[:, 0]
+    y_end = end_points[:, 1]
 
     # directly stragith maximum location
-    max_x = rb.state_dict['x_pos']
-    max_y = rb.state_dict['y_pos']
+    straight_idx = np.argmin(np.abs(delta_values))
+    max_x = x_end[straight_idx]
+    max_y = y_end[straight_idx]
+    max_dst = np.sqrt(max_x**2 + max_y**2)
     far_angle = np.arctan2(max_y,max_x)
 
-
-    # range of propeller angles to sweep over for polygon
-    delta_values = np.deg2rad(np.linspace(-45,45,51))
-    # data to extract from simulations
-    x_end = []
-    x_paths = []
-    y_end = []
-    y_paths = []
-    for delta in delta_values:
-
-        # reset all of the information of the boat
-        rb.initalize_in_state_dict()
-
-        # set initial conditions to desited state
-        for key, item in initial_conditions.items():
-            rb.state_dict[key] = item
-
-        # set initial propeller angle
-        rb.state_dict['delta'] = delta
-
-        # run simulation for 10 seconds
-        t = 0.0
-        tmp_x_path = [rb.state_dict['x_pos']]
-        tmp_y_path = [rb.state_dict['y_pos']]
-        while t < max_t:
-
-            rb.step(t)
-
-            tmp_x_path.append(rb.state_dict['x_pos'])
-            tmp_y_path.append(rb.state_dict['y_pos'])
-
-            t += delta_t
-
-        # get ending location of the boat
-        x_end.append(rb.state_dict['x_pos'])
-        y_end.append(rb.state_dict['y_pos'])
-        x_paths.append(tmp_x_path)
-        y_paths.append(tmp_y_path)
-
     sns.set_theme()
     fig = plt.figure(1,figsize=(14,8))
     ax = fig.add_subplot(111)
 
-    end_points = np.zeros((len(x_end),2))
-    end_points[:,0] = x_end
-    end_points[:,1] = y_end
-    #end_points = np.vstack([end_points, [initial_conditions['x_pos'],initial_conditions['y_pos']]])
-    path_tolerance = Polygon(end_points, True)
+    path_tolerance = Polygon(rs.get_polygon(), True)
     bp = [path_tolerance]
 
     p = PatchCollection(bp, alpha=0.4)
     p.set_color('tab:blue')
     ax.add_collection(p)
 
-    end_points = np.vstack([end_points, [initial_conditions['x_pos'], initial_conditions['y_pos']]])
-    path_tolerance = Polygon(end_points, True)
+    path_tolerance = Polygon(rs.get_polygon(include_start=True), True)
     bp = [path_tolerance]
 
     p = PatchCollection(bp, alpha=0.1)
@@ -116,9 +65,6 @@ if __name__ == '__main__':
     ax.plot([0], [0], 'o', label='Start')
     #ax.scatter(x_end,y_end,label='Ending Location')
 
-    #for i, path in enumerate(x_paths):
-    #    ax.plot(x_paths[i],y_paths[i],label=str(np.rad2deg(delta_values[i])))
-
     # graph maximum circle
     x_max = []
     y_max = []
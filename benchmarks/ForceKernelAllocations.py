@@ -0,0 +1,90 @@
+"""
+measures the memory allocated and the time taken by the scalar force and moment kernel of the river boat, and compares
+it to the reference numpy implementation. Memory is traced with tracemalloc. The net growth over many calls shows if
+anything is kept alive between calls, and the peak above the starting memory shows the temporaries made within a call.
+
+Run from the root of the repository with python -m benchmarks.ForceKernelAllocations
+"""
+
+# native modules
+import sys
+import time
+import tracemalloc
+
+# 3rd party code
+import numpy as np
+
+# own code
+import src.Movers as Movers
+
+
+def get_boat():
+    """
+    creates the default boat in a state with wind, current, sideslip, and rotation so every term of the kernel is used
+
+    :return: the boat
+    """
+    rb = Movers.RiverBoat.get_default(0.1)
+    rb.state_dict['v_x'] = 1.5
+    rb.state_dict['v_y'] = -0.3
+    rb.state_dict['v_yp'] = 0.2
+    rb.state_dict['psi'] = 0.4
+    rb.state_dict['psi_dot'] = 0.05
+    rb.state_dict['delta'] = 0.2
+    rb.state_dict['v_wind'] = (2.0, 1.0)
+    rb.state_dict['v_current'] = (-0.5, 0.1)
+    return rb
+
+
+def measure(method, n_calls=10000):
+    """
+    calls a force and moment method many times and traces its memory use
+
+    :param method: bound method that takes the thrust
+    :param n_calls: number of calls
+    :return: net bytes kept after the calls, peak bytes above the start during the calls, net allocated blocks, and the
+        time per call [s]
+    """
+    # warm up so caches and interned values are created before measuring
+    for _ in range(100):
+        method(1000.0)
+
+    tracemalloc.start()
+    blocks_start = sys.getallocatedblocks()
+    current_start, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(n_calls):
+        method(1000.0)
+    current_end, peak = tracemalloc.get_traced_memory()
+    blocks_end = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        method(1000.0)
+    time_per_call = (time.perf_counter() - start) / n_calls
+
+    return current_end - current_start, peak - current_start, blocks_end - blocks_start, time_per_call
+
+
+if __name__ == '__main__':
+
+    kernel_boat = get_boat()
+    reference_boat = get_boat()
+
+    kernel_boat.calc_forces_and_moments(1000.0)
+    reference_boat.calc_forces_and_moments_reference(1000.0)
+    max_error = 0.0
+    for key in Movers.LOGGED_FORCE_FIELDS[2:]:
+        ref = reference_boat.state_dict[key]
+        max_error = max(max_error, abs(kernel_boat.state_dict[key] - ref) / max(abs(ref), 1.0e-12))
+    print('largest relative difference to the reference: {:.3e}'.format(max_error))
+    print('kernel output types: ' + ', '.join(sorted(set(type(kernel_boat.state_dict[key]).__name__
+                                                         for key in Movers.LOGGED_FORCE_FIELDS[2:]))))
+
+    print('{:<12s}{:>16s}{:>20s}{:>14s}{:>16s}'.format('method', 'net [bytes]', 'peak per call [b]', 'net blocks',
+                                                       'time [us]'))
+    for name, method in (('kernel', kernel_boat.calc_forces_and_moments),
+                         ('reference', reference_boat.calc_forces_and_moments_reference)):
+        net, peak, blocks, time_per_call = measure(method)
+        print('{:<12s}{:>16d}{:>20d}{:>14d}{:>16.2f}'.format(name, net, peak, blocks, time_per_call * 1.0e6))
@@ -0,0 +1,96 @@
+"""
+compares the accuracy and cost of the river boat integrators against the Euler integrator at the default time step of
+0.1 [s]. A reference trajectory is found with rk4 at a very small time step. Every integrator is then run at larger time
+steps with the same control history, and its position error to the reference is reported. A scheme and time step pair
+is as good as the current scheme if its error is not larger than the error of euler at 0.1 [s].
+
+Run from the root of the repository with python -m benchmarks.IntegratorAccuracy
+"""
+
+# native modules
+import time
+import warnings
+
+# 3rd party code
+import numpy as np
+
+# own code
+import src.Movers as Movers
+
+
+def get_control(boat, t):
+    """
+    a deterministic control history that changes once a second so every time step that divides one second sees the
+    same controls
+
+    :param boat: the boat being controlled
+    :param t: simulation time [s]
+    :return: power [watt] and propeller angle [rad]
+    """
+    t_decision = np.floor(t)
+    power = boat.state_dict['power_max'] * (0.6 + 0.4 * np.cos(0.05 * t_decision))
+    propeller_angle = 0.5 * np.sin(0.1 * t_decision)
+    return power, propeller_angle
+
+
+def run_trajectory(integrator, delta_t, substeps=1, max_time=160.0, rtol=1.0e-6, atol=1.0e-8):
+    """
+    runs the default boat through the control history
+
+    :param integrator: name of the integrator
+    :param delta_t: time step [s]
+    :param substeps: number of substeps per step
+    :param max_time: length of the trajectory [s]
+    :param rtol: relative tolerance of rk45
+    :param atol: absolute tolerance of rk45
+    :return: the x and y position at the end of each second, the wall time [s], and the number of equation of motion
+        evaluations
+    """
+    rb = Movers.RiverBoat.get_default(delta_t)
+    rb.set_integrator(integrator, substeps, rtol, atol)
+    rb.state_dict['v_xp'] = 0.5
+
+    n_steps = int(round(max_time / delta_t))
+    steps_per_second = int(round(1.0 / delta_t)) if delta_t < 1.0 else 1
+    positions = []
+    start = time.perf_counter()
+    for i in range(n_steps):
+        t = i * delta_t
+        power, propeller_angle = get_control(rb, t)
+        rb.set_control(power, propeller_angle)
+        rb.step(t)
+        if (i + 1) % steps_per_second == 0:
+            positions.append([rb.state_dict['x_pos'], rb.state_dict['y_pos']])
+    wall_time = time.perf_counter() - start
+
+    n_evaluations = rb.integrator_stats['n_evaluations']
+    if integrator == 'euler':
+        n_evaluations = n_steps * substeps
+
+    return np.array(positions), wall_time, n_evaluations
+
+
+if __name__ == '__main__':
+
+    warnings.simplefilter('ignore', RuntimeWarning)  # unstable schemes overflow
+
+    reference, _, _ = run_trajectory('rk4', 0.01)
+
+    cases = [('euler', 0.1, 1), ('euler', 0.5, 1), ('euler', 0.5, 5),
+             ('semi_implicit_euler', 0.1, 1), ('semi_implicit_euler', 0.5, 5),
+             ('rk4', 0.1, 1), ('rk4', 0.5, 1), ('rk4', 1.0, 1), ('rk4', 1.0, 2),
+             ('rk45', 0.5, 1), ('rk45', 1.0, 1)]
+
+    print('{:<20s}{:>8s}{:>10s}{:>16s}{:>16s}{:>12s}{:>14s}'.format('integrator', 'dt [s]', 'substeps', 'max err [m]',
+                                                                   'final err [m]', 'time [s]', 'evaluations'))
+    for integrator, delta_t, substeps in cases:
+        try:
+            positions, wall_time, n_evaluations = run_trajectory(integrator, delta_t, substeps)
+        except (OverflowError, ValueError):
+            # the scalar kernel uses the math module which raises once the state of an unstable scheme blows up
+            print('{:<20s}{:>8.2f}{:>10d}{:>16s}'.format(integrator, delta_t, substeps, 'diverged'))
+            continue
+        error = np.hypot(positions[:, 0] - reference[:, 0], positions[:, 1] - reference[:, 1])
+        print('{:<20s}{:>8.2f}{:>10d}{:>16.3e}{:>16.3e}{:>12.3f}{:>14d}'.format(integrator, delta_t, substeps,
+                                                                               np.max(error), error[-1], wall_time,
+                                                                               n_evaluations))
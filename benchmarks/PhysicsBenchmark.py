@@ -0,0 +1,563 @@
+"""
+speed and accuracy gates for the river boat physics.
+
+The speed part times RiverBoat.step, calc_thrust, calc_forces_and_moments, and derived_measurements over a grid of
+speeds, headings, propeller angles, and power levels, and the vectorized engine over the same grid. Every call starts
+from a snapshot of a grid state so each function sees every state equally often. The vectorized engine is also timed
+against stepping the same boats one at a time for several numbers of boats, and must reach a minimum speed up for each.
+
+The accuracy part runs every fast path through the scenarios of the golden trajectories in
+benchmarks/Golden/default_boat.npz. The golden file holds two trajectories per scenario: the default boat as it is
+simulated today (euler at 0.1 [s]) and a converged trajectory (rk4 at 0.01 [s]). A fast path that should give the same
+result as the default boat must stay within a small distance of the default trajectory. A fast path that changes the
+integration must be at least as close to the converged trajectory as the default boat is.
+
+Results are written as JSON, named after the current commit, so runs on different commits can be compared. Passing a
+previous result with --baseline prints the speed ratio of every timing. The script exits with an error if any gate
+fails.
+
+Run from the root of the repository with python -m benchmarks.PhysicsBenchmark. Use --update-golden to recreate the
+golden trajectories after an intended change of the physics. The archive records the commit it was created on.
+
+The golden trajectories in the repository were created with the warm-started Newton solver of the induced velocity
+(commit 2241b29), which solves the thrust equation to machine precision. The solver before it (commit 13d9c8e) bisected
+the induced velocity to 1e-6 [m/s] only. Its default trajectories differ from the golden ones by up to 1.3e-6 [m] in
+cruise, 5.5e-6 [m] in wind_and_current, and 5.3e-7 [m] in hard_turn over the 1600 steps, so they would not pass the
+exact gate.
+"""
+
+# native modules
+import argparse
+from collections import OrderedDict
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# 3rd party code
+import numpy as np
+
+# own code
+import src.Movers as Movers
+import src.VectorizedMovers as VectorizedMovers
+
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Golden', 'default_boat.npz')
+
+# the columns saved for every golden trajectory
+GOLDEN_FIELDS = ('x_pos', 'y_pos', 'psi', 'v_xp', 'v_yp', 'psi_dot', 'thrust')
+
+# length of the golden trajectories [s]. Values are saved at the end of every second
+GOLDEN_DURATION = 160.0
+
+# time step of the default boat and of the converged trajectory [s]
+DEFAULT_DELTA_T = 0.1
+CONVERGED_DELTA_T = 0.01
+
+# largest distance to the default trajectory [m] of fast paths that should not change the result, and of fast paths
+# that approximate the physics with interpolated tables
+EXACT_TOLERANCE = 1.0e-6
+APPROXIMATE_TOLERANCE = 0.05
+
+# grid of states the speed benchmark cycles through
+GRID_SPEEDS = (0.0, 0.5, 2.0, 5.0)  # [m/s]
+GRID_HEADINGS = (0.0, 0.5 * np.pi, np.pi, 1.5 * np.pi)  # [rad]
+GRID_PROPELLER_ANGLES = (-0.75, 0.0, 0.75)  # [rad]
+GRID_POWER_FRACTIONS = (0.0, 0.3, 1.0)  # of the maximum power
+
+# smallest speed up of a vectorized step over stepping the same boats one at a time, by the number of boats. The array
+# operations have a fixed cost, so one boat is only checked for not getting worse and the batches are checked for
+# paying off
+VECTORIZED_MIN_SPEEDUP = OrderedDict([(1, 0.02), (32, 0.6), (256, 3.0), (1024, 5.0)])
+
+
+def get_scenarios():
+    """
+    the scenarios of the golden trajectories. The controls change once a second so every time step that divides one
+    second, and every step of one second or longer, sees the same controls.
+
+    :return: ordered dictionary of the scenario name to a dictionary of the initial state changes and a control function
+        of the boat and the time
+    """
+    def cruise(boat, t):
+        t_decision = np.floor(t)
+        return boat.state_dict['power_max'] * (0.6 + 0.4 * np.cos(0.05 * t_decision)), 0.5 * np.sin(0.1 * t_decision)
+
+    def gusty(boat, t):
+        t_decision = np.floor(t)
+        return boat.state_dict['power_max'] * (0.5 + 0.3 * np.sin(0.13 * t_decision)), \
+            0.3 * np.cos(0.07 * t_decision) - 0.2
+
+    def hard_turn(boat, t):
+        t_decision = np.floor(t)
+        angle = boat.state_dict['delta_max'][1] if t_decision % 40 < 20 else boat.state_dict['delta_max'][0]
+        return boat.state_dict['power_max'], angle
+
+    scenarios = OrderedDict()
+    scenarios['cruise'] = {'initial': {'v_xp': 0.5}, 'control': cruise}
+    scenarios['wind_and_current'] = {'initial': {'v_xp': 1.0, 'psi': 1.0, 'v_wind': (2.0, 1.0),
+                                                 'v_current': (-0.5, 0.1)},
+                                     'control': gusty}
+    scenarios['hard_turn'] = {'initial': {'v_xp': 2.0, 'v_current': (0.3, -0.2)}, 'control': hard_turn}
+    return scenarios
+
+
+def get_boat(delta_t, initial):
+    """
+    creates the default boat in the initial state of a scenario
+
+    :param delta_t: time step [s]
+    :param initial: dictionary of state values to change
+    :return: the boat
+    """
+    rb = Movers.RiverBoat.get_default(delta_t)
+    for key, value in initial.items():
+        rb.state_dict[key] = value
+    return rb
+
+
+def run_scenario(scenario, delta_t, setup=None):
+    """
+    runs the default boat through a scenario
+
+    :param scenario: the scenario from get_scenarios
+    :param delta_t: time step [s]
+    :param setup: function called with the boat before it is run, for example to turn on a fast path
+    :return: array of shape (seconds, len(GOLDEN_FIELDS)) of the state at the end of every second, and the wall time
+        of the run [s]
+    """
+    rb = get_boat(delta_t, scenario['initial'])
+    if setup is not None:
+        setup(rb)
+
+    n_steps = int(round(GOLDEN_DURATION / delta_t))
+    steps_per_second = max(int(round(1.0 / delta_t)), 1)
+    rows = []
+    start = time.perf_counter()
+    for i in range(n_steps):
+        t = i * delta_t
+        power, propeller_angle = scenario['control'](rb, t)
+        rb.set_control(power, propeller_angle)
+        rb.step(t)
+        if (i + 1) % steps_per_second == 0:
+            rows.append([rb.state_dict[key] for key in GOLDEN_FIELDS])
+    return np.array(rows), time.perf_counter() - start
+
+
+def run_scenarios_vectorized(scenarios, delta_t):
+    """
+    runs every scenario at once with the vectorized engine. Every boat starts from its scenario's initial state
+
+    :param scenarios: the scenarios from get_scenarios
+    :param delta_t: time step [s]
+    :return: dictionary of the scenario name to the array of states at the end of every second, and the wall time of
+        the run [s]
+    """
+    boats = [get_boat(delta_t, scenario['initial']) for scenario in scenarios.values()]
+    vrb = VectorizedMovers.VectorizedRiverBoat(boats[0], len(boats))
+    for i, boat in enumerate(boats):
+        vrb.set_boat(i, boat)
+
+    n_steps = int(round(GOLDEN_DURATION / delta_t))
+    steps_per_second = max(int(round(1.0 / delta_t)), 1)
+    rows = []
+    start = time.perf_counter()
+    for i in range(n_steps):
+        t = i * delta_t
+        # the control functions only read the limits of the boat, which are the same for every scenario
+        controls = [scenario['control'](boats[0], t) for scenario in scenarios.values()]
+        vrb.set_control(np.array([c[0] for c in controls]), np.array([c[1] for c in controls]))
+        vrb.step(t)
+        if (i + 1) % steps_per_second == 0:
+            rows.append([vrb[key].copy() for key in GOLDEN_FIELDS])
+    wall_time = time.perf_counter() - start
+
+    rows = np.array(rows)  # (seconds, fields, boats)
+    return OrderedDict((name, rows[:, :, i]) for i, name in enumerate(scenarios)), wall_time
+
+
+def create_golden(file_name=GOLDEN_FILE):
+    """
+    simulates the scenarios with the default boat and the converged integration and saves them as the golden
+    trajectories
+
+    :param file_name: path of the archive
+    :return:
+    """
+    arrays = {'fields': np.array(GOLDEN_FIELDS), 'commit': np.array(get_commit())}
+    for name, scenario in get_scenarios().items():
+        arrays[name + '_default'], _ = run_scenario(scenario, DEFAULT_DELTA_T)
+        arrays[name + '_converged'], _ = run_scenario(scenario, CONVERGED_DELTA_T,
+                                                      lambda rb: rb.set_integrator('rk4'))
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    np.savez_compressed(file_name, **arrays)
+
+
+def get_golden_commit(file_name=GOLDEN_FILE):
+    """
+    gets the commit the golden trajectories were created on
+
+    :param file_name: path of the archive
+    :return: the short hash of the commit, or unknown if the archive does not record it
+    """
+    data = np.load(file_name)
+    if 'commit' not in data.files:
+        return 'unknown'
+    return str(data['commit'])
+
+
+def load_golden(file_name=GOLDEN_FILE):
+    """
+    loads the golden trajectories
+
+    :param file_name: path of the archive
+    :return: dictionary of the scenario name to the default and converged trajectories
+    """
+    data = np.load(file_name)
+    if tuple(data['fields']) != GOLDEN_FIELDS:
+        raise ValueError('The golden trajectories were saved with different fields. Recreate them with --update-golden')
+    golden = OrderedDict()
+    for name in get_scenarios():
+        golden[name] = {'default': data[name + '_default'], 'converged': data[name + '_converged']}
+    return golden
+
+
+def get_position_error(trajectory, reference):
+    """
+    largest distance between two trajectories saved at the same times
+
+    :param trajectory: array of states from run_scenario
+    :param reference: array of states from run_scenario
+    :return: the distance [m]. inf if the trajectory diverged
+    """
+    error = np.hypot(trajectory[:, 0] - reference[:, 0], trajectory[:, 1] - reference[:, 1])
+    if not np.all(np.isfinite(error)):
+        return float('inf')
+    return float(np.max(error))
+
+
+def get_fast_paths():
+    """
+    the fast paths that are gated. Each has the time step it runs at, a setup function for the boat, and the gate it
+    must pass
+
+    :return: ordered dictionary of the fast path name to its settings
+    """
+    def use_tables(rb):
+        rb.use_coefficient_tables()
+
+    def use_surface(rb):
+        rb.use_thrust_surface(cache_dir=None)
+
+    def use_integrator(name, substeps=1):
+        return lambda rb: rb.set_integrator(name, substeps)
+
+    fast_paths = OrderedDict()
+    fast_paths['default'] = {'delta_t': DEFAULT_DELTA_T, 'setup': None, 'gate': 'exact'}
+    fast_paths['vectorized'] = {'delta_t': DEFAULT_DELTA_T, 'setup': None, 'gate': 'exact'}
+    fast_paths['coefficient_tables'] = {'delta_t': DEFAULT_DELTA_T, 'setup': use_tables, 'gate': 'approximate'}
+    fast_paths['thrust_surface'] = {'delta_t': DEFAULT_DELTA_T, 'setup': use_surface, 'gate': 'approximate'}
+    fast_paths['semi_implicit_euler_0.1'] = {'delta_t': 0.1, 'setup': use_integrator('semi_implicit_euler'),
+                                             'gate': 'converged'}
+    # rk4 needs an internal step of 0.25 [s] or less to stay stable in the hard turn
+    fast_paths['rk4_0.5_2_substeps'] = {'delta_t': 0.5, 'setup': use_integrator('rk4', 2), 'gate': 'converged'}
+    fast_paths['rk4_1.0_4_substeps'] = {'delta_t': 1.0, 'setup': use_integrator('rk4', 4), 'gate': 'converged'}
+    fast_paths['rk45_1.0'] = {'delta_t': 1.0, 'setup': use_integrator('rk45'), 'gate': 'converged'}
+    return fast_paths
+
+
+def check_accuracy(golden):
+    """
+    runs every fast path through every scenario and checks it against its gate
+
+    :param golden: the golden trajectories from load_golden
+    :return: ordered dictionary of the fast path name to its errors, tolerances, speed, and if it passed
+    """
+    scenarios = get_scenarios()
+    results = OrderedDict()
+    for name, fast_path in get_fast_paths().items():
+        if name == 'vectorized':
+            trajectories, wall_time = run_scenarios_vectorized(scenarios, fast_path['delta_t'])
+        else:
+            trajectories = OrderedDict()
+            wall_time = 0.0
+            for scenario_name, scenario in scenarios.items():
+                try:
+                    trajectories[scenario_name], run_time = run_scenario(scenario, fast_path['delta_t'],
+                                                                         fast_path['setup'])
+                except (OverflowError, ValueError):
+                    # the scalar kernel raises once the state of an unstable integration blows up
+                    trajectories[scenario_name], run_time = None, 0.0
+                wall_time += run_time
+
+        result = OrderedDict([('gate', fast_path['gate']), ('delta_t', fast_path['delta_t']),
+                              ('wall_time', wall_time), ('scenarios', OrderedDict())])
+        passed = True
+        for scenario_name, trajectory in trajectories.items():
+            reference = golden[scenario_name]
+            if fast_path['gate'] == 'converged':
+                # at least as close to the converged trajectory as the default boat is
+                tolerance = get_position_error(reference['default'], reference['converged'])
+                target = reference['converged']
+            else:
+                tolerance = EXACT_TOLERANCE if fast_path['gate'] == 'exact' else APPROXIMATE_TOLERANCE
+                target = reference['default']
+            error = float('inf') if trajectory is None else get_position_error(trajectory, target)
+            result['scenarios'][scenario_name] = OrderedDict([('position_error', error), ('tolerance', tolerance)])
+            passed = passed and error <= tolerance
+        result['passed'] = passed
+        results[name] = result
+
+    return results
+
+
+def get_grid_snapshots(boat):
+    """
+    snapshots of the boat's state at every point of the benchmark grid. The boat has wind, current, sideslip, and a
+    rotation so every term of the physics is used
+
+    :param boat: the boat. Its state is changed
+    :return: list of snapshots of the state
+    """
+    snapshots = []
+    boat.state_dict['v_wind'] = (2.0, 1.0)
+    boat.state_dict['v_current'] = (-0.5, 0.1)
+    boat.state_dict['psi_dot'] = 0.05
+    for speed in GRID_SPEEDS:
+        for heading in GRID_HEADINGS:
+            for propeller_angle in GRID_PROPELLER_ANGLES:
+                for power_fraction in GRID_POWER_FRACTIONS:
+                    boat.state_dict['v_xp'] = speed
+                    boat.state_dict['v_yp'] = 0.2 * speed
+                    boat.state_dict['psi'] = heading
+                    boat.set_control(power_fraction * boat.state_dict['power_max'], propeller_angle)
+                    cos_psi = np.cos(-heading)
+                    sin_psi = np.sin(-heading)
+                    boat.state_dict['v_x'] = speed * cos_psi + 0.2 * speed * sin_psi
+                    boat.state_dict['v_y'] = -speed * sin_psi + 0.2 * speed * cos_psi
+                    boat.state_dict['thrust'] = boat.calc_thrust([speed, 0.2 * speed], 0.05)
+                    snapshots.append(boat.state_dict.snapshot())
+    return snapshots
+
+
+def time_calls(boat, snapshots, call, n_calls, n_repeats):
+    """
+    times a function over the grid. The state is restored from the next snapshot before every call, and the time of
+    only restoring is subtracted
+
+    :param boat: the boat the snapshots are from
+    :param snapshots: the grid snapshots
+    :param call: function without arguments that calls the method being timed
+    :param n_calls: number of calls per repeat
+    :param n_repeats: number of repeats. The fastest repeat is used
+    :return: calls per second, and micro seconds per call
+    """
+    state = boat.state_dict
+    n_snapshots = len(snapshots)
+
+    def run(with_call):
+        start = time.perf_counter()
+        for i in range(n_calls):
+            state.restore(snapshots[i % n_snapshots])
+            if with_call:
+                call()
+        return time.perf_counter() - start
+
+    call_time = min(run(True) for _ in range(n_repeats))
+    restore_time = min(run(False) for _ in range(n_repeats))
+    time_per_call = max(call_time - restore_time, 1.0e-12) / n_calls
+    return 1.0 / time_per_call, time_per_call * 1.0e6
+
+
+def check_speed(n_calls=20000, n_repeats=5):
+    """
+    times the physics functions over the grid of states
+
+    :param n_calls: number of calls per repeat
+    :param n_repeats: number of repeats. The fastest repeat is used
+    :return: ordered dictionary of the timing name to its calls per second and micro seconds per call
+    """
+    boat = Movers.RiverBoat.get_default(DEFAULT_DELTA_T)
+    snapshots = get_grid_snapshots(boat)
+    state = boat.state_dict
+    destination = (150.0, -80.0)
+
+    calls = OrderedDict()
+    calls['step'] = lambda: boat.step(0.0)
+    calls['calc_thrust'] = lambda: boat.calc_thrust([state['v_xp'], state['v_yp']], state['psi_dot'])
+    calls['calc_forces_and_moments'] = lambda: boat.calc_forces_and_moments(state['thrust'])
+    calls['derived_measurements'] = lambda: boat.derived_measurements(destination)
+
+    results = OrderedDict()
+    for name, call in calls.items():
+        calls_per_second, us_per_call = time_calls(boat, snapshots, call, n_calls, n_repeats)
+        results[name] = OrderedDict([('calls_per_second', calls_per_second), ('us_per_call', us_per_call)])
+
+    # the vectorized engine with one boat per grid state. Reported per boat step
+    vrb = VectorizedMovers.VectorizedRiverBoat(boat, len(snapshots))
+    for i, snapshot in enumerate(snapshots):
+        state.restore(snapshot)
+        vrb.set_boat(i, boat)
+    init_state = vrb.state.copy()
+    n_vector_steps = max(n_calls // len(snapshots), 1)
+    best = float('inf')
+    for _ in range(n_repeats):
+        vrb.state[:] = init_state
+        start = time.perf_counter()
+        for _ in range(n_vector_steps):
+            vrb.step(0.0)
+        best = min(best, time.perf_counter() - start)
+    time_per_call = best / (n_vector_steps * len(snapshots))
+    results['vectorized_step_per_boat'] = OrderedDict([('calls_per_second', 1.0 / time_per_call),
+                                                       ('us_per_call', time_per_call * 1.0e6)])
+
+    return results
+
+
+def check_vectorized_scaling(n_steps=100, n_repeats=3, max_scalar_boats=64):
+    """
+    times a vectorized step of different numbers of boats against stepping the same boats one at a time, and checks
+    the speed up against VECTORIZED_MIN_SPEEDUP. The boats start from the grid states
+
+    :param n_steps: number of steps per repeat
+    :param n_repeats: number of repeats. The fastest repeat is used
+    :param max_scalar_boats: the most boats stepped one at a time. The scalar time of more boats is scaled from these
+    :return: ordered dictionary of the number of boats to the micro seconds per boat step of both, the speed up, the
+        minimum speed up, and if it passed
+    """
+    template = Movers.RiverBoat.get_default(DEFAULT_DELTA_T)
+    snapshots = get_grid_snapshots(template)
+
+    results = OrderedDict()
+    for n_boats, min_speedup in VECTORIZED_MIN_SPEEDUP.items():
+        boats = []
+        for i in range(n_boats):
+            boat = Movers.RiverBoat.get_default(DEFAULT_DELTA_T)
+            boat.state_dict.restore(snapshots[i % len(snapshots)])
+            boats.append(boat)
+        vrb = VectorizedMovers.VectorizedRiverBoat(boats[0], n_boats)
+        for i, boat in enumerate(boats):
+            vrb.set_boat(i, boat)
+        init_state = vrb.state.copy()
+        init_snapshots = [boat.state_dict.snapshot() for boat in boats]
+
+        vector_time = float('inf')
+        scalar_time = float('inf')
+        n_scalar = min(n_boats, max_scalar_boats)
+        for _ in range(n_repeats):
+            vrb.state[:] = init_state
+            start = time.perf_counter()
+            for i in range(n_steps):
+                vrb.step(i * DEFAULT_DELTA_T)
+            vector_time = min(vector_time, time.perf_counter() - start)
+
+            for boat, snapshot in zip(boats, init_snapshots):
+                boat.state_dict.restore(snapshot)
+            start = time.perf_counter()
+            for i in range(n_steps):
+                for boat in boats[:n_scalar]:
+                    boat.step(i * DEFAULT_DELTA_T)
+            scalar_time = min(scalar_time, time.perf_counter() - start)
+
+        vector_us = vector_time / (n_steps * n_boats) * 1.0e6
+        scalar_us = scalar_time / (n_steps * n_scalar) * 1.0e6
+        speedup = scalar_us / vector_us
+        results[str(n_boats)] = OrderedDict([('vectorized_us_per_boat_step', vector_us),
+                                             ('scalar_us_per_boat_step', scalar_us), ('speedup', speedup),
+                                             ('min_speedup', min_speedup), ('passed', speedup >= min_speedup)])
+
+    return results
+
+
+def get_commit():
+    """
+    gets the short hash of the current commit
+
+    :return: the hash, or 'unknown' outside of a git repository
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare_speed(results, baseline):
+    """
+    prints the speed of every timing relative to a previous result
+
+    :param results: the current results
+    :param baseline: results loaded from a previous run
+    :return:
+    """
+    print('\nspeed relative to {} ({})'.format(baseline.get('commit', 'baseline'), baseline.get('date', '')))
+    for name, timing in results['speed'].items():
+        if name in baseline.get('speed', {}):
+            ratio = timing['calls_per_second'] / baseline['speed'][name]['calls_per_second']
+            print('{:<28s}{:>10.2f}x'.format(name, ratio))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='speed and accuracy gates for the river boat physics')
+    parser.add_argument('--output', default=None, help='JSON file the results are written to')
+    parser.add_argument('--baseline', default=None, help='JSON results of a previous run to compare the speed to')
+    parser.add_argument('--update-golden', action='store_true', help='recreate the golden trajectories')
+    args = parser.parse_args()
+
+    if args.update_golden or not os.path.exists(GOLDEN_FILE):
+        print('creating the golden trajectories in ' + GOLDEN_FILE)
+        create_golden()
+
+    commit = get_commit()
+    results = OrderedDict([('commit', commit), ('date', datetime.datetime.now().isoformat(timespec='seconds')),
+                           ('python', platform.python_version()), ('numpy', np.__version__),
+                           ('machine', platform.machine())])
+
+    results['speed'] = check_speed()
+    print('{:<28s}{:>16s}{:>14s}'.format('function', 'calls/s', 'us/call'))
+    for name, timing in results['speed'].items():
+        print('{:<28s}{:>16.0f}{:>14.2f}'.format(name, timing['calls_per_second'], timing['us_per_call']))
+
+    results['scaling'] = check_vectorized_scaling()
+    print('\n{:<10s}{:>22s}{:>22s}{:>10s}{:>10s}{:>8s}'.format('boats', 'vectorized us/boat', 'scalar us/boat',
+                                                             'speed up', 'minimum', 'passed'))
+    for n_boats, scaling in results['scaling'].items():
+        print('{:<10s}{:>22.2f}{:>22.2f}{:>10.2f}{:>10.2f}{:>8s}'.format(n_boats,
+                                                                        scaling['vectorized_us_per_boat_step'],
+                                                                        scaling['scalar_us_per_boat_step'],
+                                                                        scaling['speedup'], scaling['min_speedup'],
+                                                                        str(scaling['passed'])))
+
+    results['golden_commit'] = get_golden_commit()
+    results['accuracy'] = check_accuracy(load_golden())
+    print('\ngolden trajectories created on commit ' + results['golden_commit'])
+    print('{:<26s}{:<13s}{:>8s}{:>14s}{:>14s}{:>10s}{:>8s}'.format('fast path', 'gate', 'dt [s]', 'worst err [m]',
+                                                                    'worst tol [m]', 'time [s]', 'passed'))
+    for name, result in results['accuracy'].items():
+        worst = max(result['scenarios'].values(), key=lambda s: s['position_error'] - s['tolerance'])
+        print('{:<26s}{:<13s}{:>8.2f}{:>14.3e}{:>14.3e}{:>10.3f}{:>8s}'.format(name, result['gate'],
+                                                                              result['delta_t'],
+                                                                              worst['position_error'],
+                                                                              worst['tolerance'], result['wall_time'],
+                                                                              str(result['passed'])))
+
+    output = args.output
+    if output is None:
+        output = os.path.join('Output', 'Benchmarks', 'physics_' + commit + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('\nresults written to ' + output)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            compare_speed(results, json.load(f))
+
+    if not all(result['passed'] for result in results['accuracy'].values()):
+        sys.exit(1)
+    if not all(scaling['passed'] for scaling in results['scaling'].values()):
+        sys.exit(1)
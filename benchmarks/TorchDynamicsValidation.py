@@ -0,0 +1,161 @@
+"""
+validates the torch river boat dynamics against Movers.RiverBoat and checks their gradients. A batch of boats with
+different controls is stepped with both and the largest differences in position, heading, and thrust are reported. The
+gradients of the thrust solve are checked with torch.autograd.gradcheck, and the gradient of the final position of a
+rollout with respect to the power is compared to central finite differences of Movers.RiverBoat.
+
+Run from the root of the repository with python -m benchmarks.TorchDynamicsValidation
+"""
+
+# native modules
+import time
+
+# 3rd party code
+import numpy as np
+import torch
+
+# own code
+import src.Movers as Movers
+import src.TorchMovers as TorchMovers
+
+
+def get_template():
+    """
+    creates the default boat with wind and current so every term of the dynamics is used
+
+    :return: the boat
+    """
+    rb = Movers.RiverBoat.get_default(0.1)
+    rb.state_dict['v_xp'] = 0.5
+    rb.state_dict['v_wind'] = (2.0, 1.0)
+    rb.state_dict['v_current'] = (-0.5, 0.1)
+    return rb
+
+
+def get_controls(n_boats, n_steps, power_max):
+    """
+    a deterministic control history that is different for every boat
+
+    :param n_boats: number of boats
+    :param n_steps: number of steps
+    :param power_max: maximum power of the boats [watt]
+    :return: power [watt] and propeller angle [rad], both of shape (n_steps, n_boats)
+    """
+    t = np.arange(n_steps)[:, np.newaxis] * 0.1
+    phase = np.linspace(0.0, 2.0 * np.pi, n_boats, endpoint=False)[np.newaxis, :]
+    power = power_max * (0.55 + 0.45 * np.cos(0.07 * t + phase))
+    propeller_angle = 0.6 * np.sin(0.11 * t + 2.0 * phase)
+    return power, propeller_angle
+
+
+def compare_trajectories(n_boats=16, n_steps=500):
+    """
+    steps a batch of torch boats and one Movers.RiverBoat per control history, and compares them
+
+    :param n_boats: number of boats
+    :param n_steps: number of steps
+    :return: largest position error [m], heading error [rad], relative thrust error, and the wall time of the torch
+        and scalar rollouts [s]
+    """
+    template = get_template()
+    power, propeller_angle = get_controls(n_boats, n_steps, template.state_dict['power_max'])
+
+    trb = TorchMovers.TorchRiverBoat(template, n_boats)
+    start = time.perf_counter()
+    torch_x = np.zeros((n_steps, n_boats))
+    torch_y = np.zeros((n_steps, n_boats))
+    torch_psi = np.zeros((n_steps, n_boats))
+    torch_thrust = np.zeros((n_steps, n_boats))
+    with torch.no_grad():
+        for i in range(n_steps):
+            trb.set_control(torch.as_tensor(power[i]), torch.as_tensor(propeller_angle[i]))
+            trb.step(i * 0.1)
+            torch_x[i] = trb['x_pos'].numpy()
+            torch_y[i] = trb['y_pos'].numpy()
+            torch_psi[i] = trb['psi'].numpy()
+            torch_thrust[i] = trb['thrust'].numpy()
+    torch_time = time.perf_counter() - start
+
+    position_error = 0.0
+    heading_error = 0.0
+    thrust_error = 0.0
+    start = time.perf_counter()
+    for j in range(n_boats):
+        rb = get_template()
+        for i in range(n_steps):
+            rb.set_control(power[i, j], propeller_angle[i, j])
+            rb.step(i * 0.1)
+            position_error = max(position_error, np.hypot(rb.state_dict['x_pos'] - torch_x[i, j],
+                                                          rb.state_dict['y_pos'] - torch_y[i, j]))
+            heading_error = max(heading_error, abs(rb.state_dict['psi'] - torch_psi[i, j]))
+            thrust_error = max(thrust_error, abs(rb.state_dict['thrust'] - torch_thrust[i, j]) /
+                               max(abs(rb.state_dict['thrust']), 1.0))
+    scalar_time = time.perf_counter() - start
+
+    return position_error, heading_error, thrust_error, torch_time, scalar_time
+
+
+def check_thrust_gradient():
+    """
+    checks the implicit gradient of the induced velocity against finite differences with torch.autograd.gradcheck.
+    The inflow angles include the negative angles where the root jumps between branches, away from the jump itself.
+
+    :return: True if the check passed
+    """
+    v0 = torch.tensor([0.0, 0.5, 2.0, 4.0, 6.0, 3.0], dtype=torch.float64, requires_grad=True)
+    alpha_d = torch.tensor([0.3, -0.2, 1.0, -1.2, 0.0, 2.5], dtype=torch.float64, requires_grad=True)
+    power = torch.tensor([500.0, 3000.0, 1000.0, 8000.0, 200.0, 4000.0], dtype=torch.float64, requires_grad=True)
+    rho = torch.full((6,), 1000.0, dtype=torch.float64)
+    area = torch.full((6,), 0.05, dtype=torch.float64)
+
+    def func(v0_in, alpha_in, power_in):
+        return TorchMovers.solve_induced_velocity(v0_in, alpha_in, power_in, rho, area)
+
+    return torch.autograd.gradcheck(func, (v0, alpha_d, power), eps=1.0e-6, atol=1.0e-6, rtol=1.0e-4)
+
+
+def check_rollout_gradient(n_steps=100, step_size=1.0):
+    """
+    compares the gradient of the final x position of a rollout with respect to a constant power to central finite
+    differences of Movers.RiverBoat
+
+    :param n_steps: number of steps in the rollout
+    :param step_size: finite difference step in the power [watt]
+    :return: the autograd derivative and the finite difference derivative [m/watt]
+    """
+    template = get_template()
+    base_power = 0.5 * template.state_dict['power_max']
+
+    trb = TorchMovers.TorchRiverBoat(template, 1)
+    power = torch.tensor([base_power], dtype=torch.float64, requires_grad=True)
+    for i in range(n_steps):
+        trb.set_control(power, 0.2)
+        trb.step(i * 0.1)
+    trb['x_pos'].sum().backward()
+    autograd_derivative = float(power.grad[0])
+
+    def final_x(p):
+        rb = get_template()
+        for j in range(n_steps):
+            rb.set_control(p, 0.2)
+            rb.step(j * 0.1)
+        return rb.state_dict['x_pos']
+
+    fd_derivative = (final_x(base_power + step_size) - final_x(base_power - step_size)) / (2.0 * step_size)
+
+    return autograd_derivative, fd_derivative
+
+
+if __name__ == '__main__':
+
+    position_error, heading_error, thrust_error, torch_time, scalar_time = compare_trajectories()
+    print('largest position difference to Movers.RiverBoat [m]: {:.3e}'.format(position_error))
+    print('largest heading difference to Movers.RiverBoat [rad]: {:.3e}'.format(heading_error))
+    print('largest relative thrust difference to Movers.RiverBoat: {:.3e}'.format(thrust_error))
+    print('rollout time torch batch [s]: {:.3f}, scalar boats [s]: {:.3f}'.format(torch_time, scalar_time))
+
+    print('thrust solve gradcheck passed: {}'.format(check_thrust_gradient()))
+
+    autograd_derivative, fd_derivative = check_rollout_gradient()
+    print('d x_pos / d power autograd: {:.6e}, finite difference: {:.6e}, relative difference: {:.3e}'.format(
+        autograd_derivative, fd_derivative, abs(autograd_derivative - fd_derivative) / abs(fd_derivative)))
@@ -108,6 +108,16 @@ class ActionOperation(ABC):
         :return:
         """
 
+    def needs_decision(self, time):
+        """
+        checks if the next call to action_to_command uses the raw output of the agent. When it does not, the agent
+        does not need to be queried and None can be passed as the raw output.
+
+        :param time: current time of the simulation [s]
+        :return: boolean for if the agent needs to make a decision
+        """
+        return True
+
 
 class DirectControlActionDiscrete(ActionOperation):
 
@@ -550,6 +560,16 @@ class PathActionOperation(ActionOperation):
         self.path = None
         self.last_replan = 0.0
 
+    def needs_decision(self, time):
+        """
+        a new path is only planned from the agent's output at the start of an episode and after the replan rate has
+        elapsed. In between, the controller follows the current path without the agent.
+
+        :param time: current time of the simulation [s]
+        :return: boolean for if a new path is planned
+        """
+        return self.path is None or (time - self.last_replan) > self.replan_rate
+
 
 class PathContinousCp(PathActionOperation):
 
@@ -618,7 +638,7 @@ class PathContinousCp(PathActionOperation):
         if self.power_range is not None:
             raise ValueError('Power changing for propeller not implemented')
 
-        if (time - self.last_replan) > self.replan_rate or self.path is None:
+        if self.needs_decision(time):
             # enough time to replan
 
             if self.path is None:
@@ -845,7 +865,7 @@ class PathDiscreteCp(PathActionOperation):
         if self.power_change_lst is not None:
             raise ValueError('Power changing for propeller not implemented')
 
-        if (time - self.last_replan) > self.replan_rate or self.path is None:
+        if self.needs_decision(time):
             # enough time to replan
 
             if self.path is None:
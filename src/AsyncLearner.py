@@ -0,0 +1,113 @@
+"""
+A learner thread that trains a copy of the agent while the main thread collects episodes with the acting agent. Each
+finished episode is handed to the thread, which trains on the replay storage and publishes a cpu copy of the new policy
+weights after every training call. The acting agent loads the published weights whenever it is refreshed, so neither
+the simulation nor the training waits on the other. torch releases the interpreter lock inside of its operations, so
+the training mostly runs at the same time as the simulation.
+
+"""
+
+# native packages
+import queue
+import threading
+
+# 3rd party packages
+
+# own packages
+
+
+class AsyncLearner:
+
+    def __init__(self, agent, train_func, max_lag=2):
+        """
+        a background thread that trains an agent
+
+        :param agent: the LearningAlgorithms.LearningAlgorithms that is trained. This must not be the agent that acts
+            in the simulation
+        :param train_func: function of the agent and the episode number that trains the agent after an episode
+        :param max_lag: the most finished episodes that wait to be trained on. Collection blocks when the learner falls
+            further behind
+        """
+        if max_lag < 1:
+            raise ValueError('The learner must be allowed to lag at least one episode')
+
+        self.agent = agent
+        self.train_func = train_func
+        self.episode_queue = queue.Queue(maxsize=max_lag)
+        self.weights = agent.get_policy_weights()  # the newest published policy weights
+        self.error = None  # an exception raised in the thread, raised again in the main thread
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        """
+        starts the learner thread
+
+        :return:
+        """
+        self.thread.start()
+
+    def run(self):
+        """
+        the loop of the learner thread. A None episode number stops the thread.
+
+        :return:
+        """
+        while True:
+            ep_num = self.episode_queue.get()
+            try:
+                if ep_num is None:
+                    return
+                if self.error is None:
+                    self.train_func(self.agent, ep_num)
+                    # replace the reference so a reader always sees a complete set of weights
+                    self.weights = self.agent.get_policy_weights()
+            except Exception as error:
+                self.error = error
+            finally:
+                self.episode_queue.task_done()
+
+    def check_error(self):
+        """
+        raises the exception of the learner thread in the calling thread, if there is one
+
+        :return:
+        """
+        if self.error is not None:
+            raise self.error
+
+    def submit(self, ep_num):
+        """
+        queues a training after an episode has finished and its data is in the replay storage
+
+        :param ep_num: the episode number in the training
+        :return:
+        """
+        self.check_error()
+        self.episode_queue.put(ep_num)
+
+    def wait(self):
+        """
+        blocks until the learner has trained on every submitted episode
+
+        :return:
+        """
+        self.episode_queue.join()
+        self.check_error()
+
+    def get_policy_weights(self):
+        """
+        :return: the newest published policy weights, in the format of LearningAlgorithms.get_policy_weights
+        """
+        self.check_error()
+        return self.weights
+
+    def close(self):
+        """
+        finishes the queued trainings and stops the thread
+
+        :return:
+        """
+        if self.thread.is_alive():
+            self.episode_queue.put(None)
+            self.thread.join()
+        self.check_error()
@@ -6,6 +6,7 @@ Is a class for holding the simulation environment. Specific simualations can be
 # native packages
 from abc import ABC, abstractmethod
 from collections import namedtuple
+import copy
 from collections import OrderedDict
 import os
 
@@ -17,12 +18,60 @@ import yaml
 
 # own packages
 import src.ActionOperation as ActionOperation
+import src.AsyncLearner as AsyncLearner
 import src.Controller as Controller
 import src.LearningAlgorithms as LearningAlgorithms
 import src.Movers as Movers
+import src.Observations as Observations
+import src.Proximity as Proximity
 import src.ReplayMemory as ReplayMemory
+import src.ResetGenerator as ResetGenerator
 import src.RewardFunctions as RewardFunctions
+import src.RolloutWorkers as RolloutWorkers
 import src.Sensors as Sensors
+import src.Telemetry as Telemetry
+import src.UpdateScheduler as UpdateScheduler
+import src.VecEnvironment as VecEnvironment
+
+
+class EpisodeProgress:
+
+    def __init__(self, ep_num, is_evaluation, delta_t, max_steps, is_recorded=True):
+        """
+        the loop variables of an episode that is being run. Kept together so an episode can be advanced one step at a
+        time by run_simulation or by a slot of a vectorized environment.
+
+        :param ep_num: the episode number in the training
+        :param is_evaluation: if the episode is an evaluation episode
+        :param delta_t: time step of the simulation [s]
+        :param max_steps: the number of steps after which the episode is stopped
+        :param is_recorded: if the histories are recorded every step
+        """
+        self.ep_num = ep_num
+        self.is_evaluation = is_evaluation
+        self.delta_t = delta_t
+        self.max_steps = max_steps
+        self.is_recorded = is_recorded  # if the histories are recorded every step. False for training episodes that are not saved
+        self.step_num = 0
+        self.t = 0.0
+
+        # holding the state prior to a step. Reset is true so the loop knows to use the first state as its state
+        self.reset_state = True
+        self.state = None
+        self.action = None
+        self.reward = 0.0
+        self.cumulative_reward = 0.0
+        self.min_dst = np.infty  # the minimum distance of the boat to the goal
+        # boolean for if the agent has reached a terminal state prior to the end of the episode
+        self.is_terminal = False
+        self.is_crashed = False
+        self.is_success = False
+
+    def is_done(self):
+        """
+        :return: true when the episode has reached a terminal state or run out of time
+        """
+        return self.step_num >= self.max_steps or self.is_terminal
 
 
 class Environment(ABC):
@@ -35,10 +84,18 @@ class Environment(ABC):
         self.reward_func = None  # reward function for the simulation
         self.device = 'cuda' # TODO need to check this
         self.header = ['time', 'reward', 'is_terminal', 'is_crashed', 'is_reached', 'destination_x','destination_y'] # history data frame header
-        self.history = None  # eventually a data frame to hold information about the simulation
+        self.history = None  # eventually a Telemetry.TelemetryBuffer to hold information about the simulation
         self.evaluation_info = None  # dictionary used for setting the initial conditions of evaluation episodes.
         self.n_evaluations = 0  # the size of the evaluation episode set.
         self.destination = None  # point in space for the destination of the boat (x,y) [m]
+        self.evaluation_workers = None  # pool of processes that run the evaluation set, if one is used
+        self.learning_mover = None  # the mover the agent controls
+        self.observation_spec = None  # compiled observation of the learning mover
+        self.is_observation_cached = False  # true when the observation after the last step is in the spec's buffers
+        self.critic_values = None  # critic values of the last decision of the agent
+        self.update_scheduler = None  # decides how many gradient steps the agent takes per transition of data
+        self.reset_generator = None  # draws the random initial conditions of training episodes in batches
+        self.proximity = None  # distances between the movers shared by the sensors and the reward function
 
     #@abstractmethod
     def reset_environment(self, reset_to_max_power):
@@ -47,36 +104,29 @@ class Environment(ABC):
         :return:
         """
 
-        domain = self.h_params['scenario']['domain']
-
-        # set a random initial location for the destination
-        x = np.random.random() * domain
-        y = np.random.random() * domain
-        self.destination = [x,y]
+        # the destination and the positions are drawn in batches with the spacing between them already checked
+        reset = self.reset_generator.get_reset(self.mover_dict)
+        self.destination = reset['destination']
 
         # set up random locations and orientations for the movers
         for name, mover in self.mover_dict.items():
 
+            values = reset[name]
             if 'river_boat' in name:
 
                 # whipe state to base configuration for the boat
                 mover.initalize_in_state_dict()
 
                 # reset the river boats data
-                dst_to_dest = 0.0
-
-                while dst_to_dest <= 30.0:
-                    mover.state_dict['x_pos'] = np.random.random() * domain
-                    mover.state_dict['y_pos'] = np.random.random() * domain
-                    dst_to_dest = np.sqrt((mover.state_dict['x_pos'] - self.destination[0]) ** 2 + (
-                                mover.state_dict['y_pos'] - self.destination[1]) ** 2)
+                mover.state_dict['x_pos'] = values['x_pos']
+                mover.state_dict['y_pos'] = values['y_pos']
 
-                mover.state_dict['psi'] = np.random.random() * 2.0*np.pi
-                tmp_delta = (np.random.random()-0.5)*2.0*np.abs(mover.state_dict['delta_max'][0])
+                mover.state_dict['psi'] = values['psi']
+                tmp_delta = values['delta_fraction']*np.abs(mover.state_dict['delta_max'][0])
 
                 # reset the velocities of the boat
-                mover.state_dict['v_xp'] = np.random.random()
-                mover.state_dict['v_yp'] = np.random.random()-0.5
+                mover.state_dict['v_xp'] = values['v_xp']
+                mover.state_dict['v_yp'] = values['v_yp']
                 mover.state_dict['psi_dot'] = 0.0 #(np.random.random()-0.5)/10.0
 
                 mover.state_dict['v_x'] = mover.state_dict['v_xp'] * np.cos(-mover.state_dict['psi']) + mover.state_dict[
@@ -88,40 +138,22 @@ class Environment(ABC):
                 if reset_to_max_power:
                     tmp_power = mover.state_dict['power_max']
                 else:
-                    tmp_power = np.random.random()*mover.state_dict['power_max']
+                    tmp_power = values['power_fraction']*mover.state_dict['power_max']
 
                 mover.set_control(tmp_power, tmp_delta)
 
                 # reset the fuel on the boat
                 mover.state_dict['fuel'] = mover.state_dict['fuel_capacity']
 
-
             elif 'static_circle' in name:
-                # reset the static circle
-                max_dst_to_other = 0.0
-                dst_to_dest = 0.0
-                while dst_to_dest <= mover.state_dict['radius']*2.0 and max_dst_to_other <= mover.state_dict['radius']*2.0:
-                    # draw random positions for the obstacle until it is not too close to the goal location or any other
-                    # movers
-
-                    mover.state_dict['x_pos'] = np.random.random()*domain
-                    mover.state_dict['y_pos'] = np.random.random() * domain
-                    dst_to_dest = np.sqrt( (mover.state_dict['x_pos']-self.destination[0])**2 + (mover.state_dict['y_pos']-self.destination[1])**2)
-
-                    max_dst_to_other = np.infty
-
-                    for tmp_name, tmp_mover in self.mover_dict.items():
-                        if tmp_name != name:
-                            # other obstacle selected in the loop
-                            x_other = tmp_mover.state_dict['x_pos']
-                            y_other = tmp_mover.state_dict['y_pos']
-                            tmp_dst = np.sqrt((mover.state_dict['x_pos']-x_other)**2 + (mover.state_dict['y_pos']-y_other)**2)
-                            if tmp_dst < max_dst_to_other:
-                                max_dst_to_other = tmp_dst
-            else:
-                raise ValueError('Mover not currently supported')
+                # reset the static circle. It is already clear of the goal location and the other movers
+                mover.state_dict['x_pos'] = values['x_pos']
+                mover.state_dict['y_pos'] = values['y_pos']
 
-        # updates sensors
+        # updates sensors. The static movers only move here, so the distances and sensors prepare for them first
+        self.proximity.reset(self.mover_dict)
+        for name, mover in self.mover_dict.items():
+            mover.reset_sensors(self.mover_dict)
         for name, mover in self.mover_dict.items():
             mover.update_sensors(self.mover_dict)
             mover.derived_measurements(self.destination)
@@ -132,6 +164,9 @@ class Environment(ABC):
         # reset the action operation
         self.ao.reset()
 
+        # the movers moved, so the observation from the last step is out of date
+        self.is_observation_cached = False
+
     #@abstractmethod
     def reset_evaluation_environment(self, row_idx, reset_to_max_power):
 
@@ -185,7 +220,10 @@ class Environment(ABC):
             else:
                 raise ValueError('Mover not currently supported')
 
-        # updates sensors
+        # updates sensors. The static movers only move here, so the distances and sensors prepare for them first
+        self.proximity.reset(self.mover_dict)
+        for name, mover in self.mover_dict.items():
+            mover.reset_sensors(self.mover_dict)
         for name, mover in self.mover_dict.items():
             mover.update_sensors(self.mover_dict)
             mover.derived_measurements(self.destination)
@@ -196,6 +234,9 @@ class Environment(ABC):
         # reset the action operation
         self.ao.reset()
 
+        # the movers moved, so the observation from the last step is out of date
+        self.is_observation_cached = False
+
 
     def add_mover(self, mover):
         """
@@ -218,8 +259,36 @@ class Environment(ABC):
         :param ep_num: the episode number in the training
         :return:
         """
+        progress = self.begin_episode(ep_num, is_evaluation, reset_to_max_power, evaluation_number)
+
+        while not progress.is_done():
+
+            # step the simulation up to the next decision of the agent
+            reward, is_terminal, is_crashed, is_success, min_dst, transitions = self.advance(progress, progress.max_steps)
+
+            # store the data
+            if not is_evaluation:
+                for transition in transitions:
+                    self.push_transition(transition)
+
+        episode_results = self.end_episode(progress)
 
+        # sort the stored data into buffers as needed
+        if not is_evaluation:
+            self.replay_storage.sort_data_into_buffers()
+
+        return episode_results
 
+    def begin_episode(self, ep_num, is_evaluation, reset_to_max_power, evaluation_number=0):
+        """
+        resets the environment and the histories for a new episode
+
+        :param ep_num: the episode number in the training
+        :param is_evaluation: if the episode is an evaluation episode
+        :param reset_to_max_power: if the boats start at their maximum power
+        :param evaluation_number: the row of the evaluation set used for an evaluation episode
+        :return: the progress of the new episode
+        """
         # reset environment
         if is_evaluation:
             # reset the initial conditions
@@ -227,13 +296,15 @@ class Environment(ABC):
         else:
             self.reset_environment(reset_to_max_power)
 
+        # evaluation episodes solve the thrust exactly instead of interpolating a thrust surface
+        for mover in self.mover_dict.values():
+            if isinstance(mover, Movers.RiverBoat):
+                mover.set_strict_thrust(is_evaluation)
 
         # reset the reward function
         self.reward_func.reset(self.mover_dict)
 
         # reset the time stamps of the
-        step_num = 0
-        t = 0.0
         delta_t = self.h_params['scenario']['time_step']
         max_t = float(self.h_params['scenario']['max_time'])
         max_steps = int(np.ceil(max_t / delta_t))
@@ -246,149 +317,237 @@ class Environment(ABC):
         for name, mover in self.mover_dict.items():
             mover.reset_history(max_steps)
 
-        # reset own history
-        self.history = pd.DataFrame(data=np.zeros(((max_steps), len(self.header))),columns=self.header)
+        # reset own history. The buffer is reused across episodes while the header stays the same
+        if self.history is None or self.history.columns != self.header:
+            self.history = Telemetry.TelemetryBuffer(self.header, object_columns=['path'],
+                                                     bool_columns=['is_terminal', 'is_crashed', 'is_reached'])
+        self.history.reset(max_steps)
 
-        # holding the state prior to a step. Initialized as none so the loop knows to use the first state as its state
-        reset_state = True
+        # in headless mode only the results of a training episode are kept when its history is not going to be saved
+        is_recorded = is_evaluation or not self.headless or self.is_training_history_saved(ep_num)
+
+        return EpisodeProgress(ep_num, is_evaluation, delta_t, max_steps, is_recorded)
+
+    def advance(self, progress, n_steps):
+        """
+        steps the simulation in one call until n_steps have run, the episode ends, or the agent has to make its next
+        decision. Path action operations only decide every replan interval, so a call runs a whole path segment;
+        direct control decides every step, so a call runs one step. The histories are recorded for every step.
+
+        :param progress: the progress of the episode
+        :param n_steps: the most steps to run
+        :return: the reward summed over the steps, if the episode reached a terminal state, if the boat crashed, if the
+            boat reached the destination, the closest distance to the destination over the steps [m], and the
+            transitions of the agent steps that completed, as returned from record_step
+        """
         reward = 0.0
-        cumulative_reward = 0.0
-        min_dst = np.infty  # the minimum distance of the boat to the goal
-        # boolean for if the agent has reached a terminal state prior to the end of the episode
-        is_terminal = False
-        end_step = False  # if this is true the agent will know to log the data and make another prediction
-        while step_num < max_steps and not is_terminal:
-
-            # step the simulation
-            interim_state, interim_org_action, interim_used_action, interim_path_cps, interim_critic_vals, interim_reward, interim_next_state, end_step, is_terminal, is_crashed, is_success, curr_dist = self.step(ep_num, t, end_step, is_evaluation)
-
-            # the non-dimensional values of the state
-            # org_action - action before exmplation is added
-            # used_action - action where exploration may or may not be used. THis is the action used for the MDP
-            # path_cps - a list of path control points that define the naviation path. This is none for direct contol methods
-            # critic values - q values or the critics outpput values
-            # reward - given rewared during the simualtion step
-            # next_state - non-dimensional state after the movers moved
-            # end_step - if teh agents step completed or not. Should always be true for direct control and periodically true for path control
-            # is_terminal - if the simulation is done
-            # is_crashed - boolean if the boat crashed into an obstacle
-            # is_success - of the simulation ended reaching its goal
-            # dest_dst - distance to the destination after stepping
-            #return state, org_action, used_action, path_cps, critic_values, reward, next_state, end_step, is_terminal, self.reward_func.is_crashed, self.reward_func.is_success, dest_dst
-
-            # check if the distance is closer than any previous distances. If so save the distance
-            if curr_dist < min_dst:
-                min_dst = curr_dist
-
-            # if the state is empty update it to the interim state
-            if reset_state:
-                state = interim_state
-                org_action = interim_org_action
-                action = interim_used_action
-                path_cps = interim_path_cps
-                critic_vals = interim_critic_vals
-                reward = interim_reward
-                reset_state = False
-
-            if end_step or is_terminal:
-                # add data to memory because the agents step has completed.
-                next_state = interim_next_state
-                reward = interim_reward
-
-                # convert the tuple to tensors
-                state_tensor = ReplayMemory.convert_numpy_to_tensor(self.device,list(state.values()))
-                next_state_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, list(next_state.values()))
-
-                if type(action) == list:
-                    action_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, action)
-                else:
-                    action_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, [action])
-                #reward_tensor = torch.tensor([reward]).to(self.device)
-                reward_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, [reward])
-                #is_terminal_tensor = torch.tensor([is_terminal]).to(self.device)
-                is_terminal_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, [is_terminal])
-
-                # store the data
-                if not is_evaluation:
-                    if self.replay_storage.strategy == 'outcome':
-                        outcome = 'other'
-                        if is_crashed:
-                            outcome = 'crash'
-                        elif is_success:
-                            outcome = 'success'
-
-                        self.replay_storage.push(state_tensor,action_tensor,next_state_tensor,reward_tensor,is_terminal_tensor, outcome)
-                    else:
-                        self.replay_storage.push(state_tensor,action_tensor,next_state_tensor,reward_tensor,is_terminal_tensor)
-
-                # reset the state to None for the agents next step
-                reset_state = True
-            else:
-                reward += interim_reward
+        min_dst = np.infty
+        transitions = []
+        for i in range(n_steps):
+            if progress.is_done() or (i > 0 and self.ao.needs_decision(progress.t)):
+                break
+
+            state, raw_outputs = self.get_decision(progress.t)
+            org_action, used_action, path_cps, end_step = self.act(progress.ep_num, progress.t, raw_outputs,
+                                                                   progress.is_evaluation)
+            next_state = self.observe(self.observation_spec.next_state_buffer)
+            self.is_observation_cached = True
+            step_reward, is_terminal, dest_dst = self.get_step_outcome(progress.t)
+
+            reward += step_reward
+            min_dst = min(min_dst, dest_dst)
+
+            transition = self.record_step(progress, state, org_action, used_action, path_cps, step_reward, next_state,
+                                          end_step, is_terminal, dest_dst)
+            if transition is not None:
+                transitions.append(transition)
+
+        return reward, progress.is_terminal, progress.is_crashed, progress.is_success, min_dst, transitions
+
+    def record_step(self, progress, state, org_action, used_action, path_cps, reward, next_state, end_step, is_terminal,
+                    dest_dst):
+        """
+        books one simulation step into the progress of the episode and the histories. The critic values are the last
+        ones the agent gave, and if the boat crashed or reached the destination is read from the reward function. When
+        an agent step has completed the transition for the replay buffer is returned.
+
+        :param progress: the progress of the episode
+        :param state: the non-dimensional state before the movers moved
+        :param org_action: the action before exploration is added
+        :param used_action: the action, with or without exploration, the movers were stepped with
+        :param path_cps: control points of the navigation path. None for direct control
+        :param reward: the reward given for the step
+        :param next_state: the non-dimensional state after the movers moved
+        :param end_step: if the agents step completed. Always true for direct control
+        :param is_terminal: if the simulation is done
+        :param dest_dst: distance of the learning mover to the destination after the step [m]
+        :return: None, or a transition tuple of the state, action, next state, reward, is terminal, and the outcome.
+            These are lists and floats that still need to be converted to tensors
+        """
+        is_crashed = self.reward_func.is_crashed
+        is_success = self.reward_func.is_success
+
+        progress.is_terminal = is_terminal
+        progress.is_crashed = is_crashed
+        progress.is_success = is_success
+
+        # check if the distance is closer than any previous distances. If so save the distance
+        if dest_dst < progress.min_dst:
+            progress.min_dst = dest_dst
+
+        # if the state is empty update it to the state before the step
+        if progress.reset_state:
+            # the observation buffer is reused every step, so a copy is kept until the agents step completes
+            progress.state = state.copy()
+            progress.action = used_action
+            progress.reward = reward
+            progress.reset_state = False
+
+        transition = None
+        if end_step or is_terminal:
+            # add data to memory because the agents step has completed.
+            progress.reward = reward
+
+            outcome = 'other'
+            if is_crashed:
+                outcome = 'crash'
+            elif is_success:
+                outcome = 'success'
+
+            action = progress.action
+            if type(action) != list:
+                action = [action]
+            transition = (progress.state.tolist(), action, next_state.tolist(), progress.reward,
+                          is_terminal, outcome)
+
+            # reset the state to None for the agents next step
+            progress.reset_state = True
+        else:
+            progress.reward += reward
 
+        # add simulation specific history
+        action = used_action
+        if type(org_action) != list and not isinstance(org_action,np.ndarray):
+            org_action = [org_action]
+        if type(action) != list and not isinstance(org_action,np.ndarray):
+            action = [action]
+
+        if progress.is_recorded:
             # add history of the movers the simulation
             for name, mover in self.mover_dict.items():
-                mover.add_step_history(step_num)
+                mover.add_step_history(progress.step_num)
 
-            # add simulation specific history
-            org_action = interim_org_action
-            action = interim_used_action
-            path_cps = interim_path_cps
-            critic_vals = interim_critic_vals
+            telemetry = np.concatenate(([progress.t, progress.reward, is_terminal, is_crashed, is_success,
+                                         self.destination[0], self.destination[1]],org_action,action,self.critic_values))
+            self.history.write(progress.step_num, telemetry, path_cps)
 
-            if type(org_action) != list and not isinstance(org_action,np.ndarray):
-                org_action = [org_action]
-            if type(action) != list and not isinstance(org_action,np.ndarray):
-                action = [action]
+        # the latest action is carried into the agents step
+        progress.action = action
+
+        # add simulation specific data from the learner. destination distance
+
+        progress.t += progress.delta_t
+        progress.step_num += 1
+        progress.cumulative_reward += reward
 
-            telemetry = np.concatenate(([t, reward, is_terminal, is_crashed, is_success,
-                                         self.destination[0], self.destination[1]],org_action,action,path_cps,critic_vals))
-            self.history.iloc[step_num] = telemetry
+        return transition
 
-            # add simulation specific data from the learner. destination distance
+    def push_transition(self, transition):
+        """
+        converts a transition from record_step to tensors and pushes it into the replay storage
+
+        :param transition: tuple of the state, action, next state, reward, is terminal, and the outcome
+        :return:
+        """
+        state, action, next_state, reward, is_terminal, outcome = transition
+
+        # convert the tuple to tensors
+        state_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, state)
+        next_state_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, next_state)
+        action_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, action)
+        #reward_tensor = torch.tensor([reward]).to(self.device)
+        reward_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, [reward])
+        #is_terminal_tensor = torch.tensor([is_terminal]).to(self.device)
+        is_terminal_tensor = ReplayMemory.convert_numpy_to_tensor(self.device, [is_terminal])
+
+        if self.replay_storage.strategy == 'outcome':
+            self.replay_storage.push(state_tensor,action_tensor,next_state_tensor,reward_tensor,is_terminal_tensor, outcome)
+        else:
+            self.replay_storage.push(state_tensor,action_tensor,next_state_tensor,reward_tensor,is_terminal_tensor)
 
-            t += delta_t
-            step_num += 1
-            cumulative_reward += interim_reward
+    def end_episode(self, progress):
+        """
+        trims the histories to the length of the episode. The data of a training episode still needs to be sorted into
+        the replay buffers by the caller.
 
+        :param progress: the progress of the episode
+        :return: the cumulative reward, if the boat crashed, if the boat reached the destination, the closest distance
+            to the destination, and the simulation time
+        """
         # trim the history
-        self.history.drop(range(step_num, len(self.history)), inplace=True)
+        self.history.trim(progress.step_num)
         for name, mover in self.mover_dict.items():
-            mover.trim_history(step_num)
+            mover.trim_history(progress.step_num)
 
-        # sort the stored data into buffers as needed
-        if not is_evaluation:
-            self.replay_storage.sort_data_into_buffers()
+        # an episode that is not recorded must not leave rows that could be mistaken for its history
+        if not progress.is_recorded:
+            if len(self.history) > 0 or any(len(mover.history) > 0 for mover in self.mover_dict.values()):
+                raise ValueError('The history of episode '+str(progress.ep_num)+' was written although it is not recorded')
 
-        return cumulative_reward, is_crashed, is_success, min_dst, t
+        return progress.cumulative_reward, progress.is_crashed, progress.is_success, progress.min_dst, progress.t
 
-    def write_history(self, ep_num, is_evaluation, eval_num=0):
+    def create_slot(self):
         """
-        writes the histories of the movers and the simulation out for later analysis
-        :return:
+        creates a copy of the environment that runs its own episodes. The movers, action operation, reward function, and
+        proximity service are copied together so the references between them stay inside of the copy. The agent, replay
+        storage, reset generator, and hyperparameters are shared with this environment.
+
+        :return: the copied environment
         """
+        slot = copy.copy(self)
+        slot.mover_dict, slot.ao, slot.reward_func, slot.proximity = copy.deepcopy((self.mover_dict, self.ao,
+                                                                                    self.reward_func, self.proximity))
+        slot.compile_observations()
+        slot.destination = None
+        slot.history = None
+        return slot
+
+    def get_total_history(self):
+        """
+        converts the history of the simulation and of every mover into one data frame. This is only done when the
+        history is written out
 
-        total_history = self.history
+        :return: the data frame of the episode
+        """
+        total_history = self.history.to_data_frame()
 
         for name, mover in self.mover_dict.items():
 
             # get mover files
-            tmp_histroy = mover.history
+            tmp_histroy = mover.history.to_data_frame()
 
             # add history together
             total_history = pd.concat([total_history, tmp_histroy], axis=1)
 
+        return total_history
+
+    def write_history(self, ep_num, is_evaluation, eval_num=0):
+        """
+        writes the histories of the movers and the simulation out for later analysis
+        :return:
+        """
+
         # write total history out to a file
         if is_evaluation:
             file_name = 'Output//' + str(self.h_params['scenario']['experiment_set']) + '//' + str(
                 self.h_params['scenario']['trial_num']) + '//Evaluation//Data//History_' + str(ep_num) + '-'+str(eval_num)+'.csv'
-            total_history.to_csv(file_name, index=False)
+            self.get_total_history().to_csv(file_name, index=False)
         else:
-            if self.save_training_data and ep_num % self.save_freq == 0:
+            if self.is_training_history_saved(ep_num):
                 # only save the data to a csv if it is allowed and the episode number matches the goal. Ideally all of
                 # the data is saved, but there is no more room on my computer
                 file_name = 'Output//' + str(self.h_params['scenario']['experiment_set'])+ '//' + str(self.h_params['scenario']['trial_num'])+'//TrainingHistory//Data//History_'+str(ep_num)+'.csv'
-                total_history.to_csv(file_name, index=False)
+                self.get_total_history().to_csv(file_name, index=False)
 
     def step(self, ep_num, t, end_step, is_evaluation):
         """
@@ -398,44 +557,105 @@ class Environment(ABC):
         :param t:  time of the simulation [s]
         :return:
         """
+        state, raw_ouputs = self.get_decision(t)
+
+        org_action, used_action, path_cps, end_step = self.act(ep_num, t, raw_ouputs, is_evaluation)
+
+        # normalize the state prime
+        next_state = self.observe(self.observation_spec.next_state_buffer)
+        self.is_observation_cached = True
+
+        reward, is_terminal, dest_dst = self.get_step_outcome(t)
+
+        # the non-dimensional values of the state
+        # org_action - action before exmplation is added
+        # used_action - action where exploration may or may not be used. THis is the action used for the MDP
+        # path_cps - a list of path control points that define the naviation path. This is none for direct contol methods
+        # critic values - q values or the critics outpput values
+        # reward - given rewared during the simualtion step
+        # next_state - non-dimensional state after the movers moved
+        # end_step - if teh agents step completed or not. Should always be true for direct control and periodically true for path control
+        # is_terminal - if the simulation is done
+        # is_crashed - boolean if the boat crashed into an obstacle
+        # is_success - of the simulation ended reaching its goal
+        # dest_dst - distance to the destination after stepping
+        return state, org_action, used_action, path_cps, self.critic_values, reward, next_state, end_step, is_terminal, self.reward_func.is_crashed, self.reward_func.is_success, dest_dst
+
+    def get_decision(self, t):
+        """
+        gets the state before a step and the network outputs for it. Path action operations only use the network when
+        a new path is planned, so the agent is not queried between plans and the last critic values are kept
+
+        :param t: time of the simulation [s]
+        :return: the non-dimensional state, and the q values or actor values. The values are None between plans
+        """
+        # save the original state before stepping. The movers have not moved since the last step observed them, so
+        # its observation is reused unless the environment was reset
+        if self.is_observation_cached:
+            self.observation_spec.swap_buffers()
+            state = self.observation_spec.state_buffer
+        else:
+            state = self.observe(self.observation_spec.state_buffer)
+
+        # get the action and network outputs from the network
+        if self.ao.needs_decision(t):
+            inp = state
+
+            # raw_outputs - q values or actor values
+            # critic values - either the q values or the critics values
+            raw_outputs, critic_values = self.agent.get_output(inp)
+            self.critic_values = critic_values.cpu().detach().numpy()[0]
+        else:
+            raw_outputs = None
+
+        return state, raw_outputs
+
+    def observe(self, out):
+        """
+        updates the sensors and derived measurements of every mover, and writes the normalized observation of the
+        learning mover with the compiled observation spec
 
-        # updates sensors
+        :param out: float32 buffer the observation is written into, the state_buffer or next_state_buffer of the spec
+        :return: out
+        """
+        # updates the distances between the movers once, then the sensors that read them
+        self.proximity.update(self.mover_dict)
         for name, mover in self.mover_dict.items():
             mover.update_sensors(self.mover_dict)
             mover.derived_measurements(self.destination)
 
-        # step movers
-        for name, mover in self.mover_dict.items():
-            if mover.can_learn:
-                # this mover is an agent and not a deterministic entity
-
-                # normalize the state
-                keys = mover.observation_df['name']
-                dimensional_values = OrderedDict()
-                non_dimensional_values = OrderedDict()
-                for key in keys:
-                    dimensional_values[key] = mover.state_dict.get(key)
-                    non_dimensional_values[key] = mover.state_dict.get(key)
-
-                norm_values = mover.observation_df['norm_value'].to_numpy()
-                norm_methods = mover.observation_df['norm_method'].to_numpy()
-                for i, norm_strat in enumerate(norm_values):
-                    # TODO norm by strategy. MOve this to its own method
-                    non_dimensional_values[keys[i]] = dimensional_values[keys[i]]/norm_values[i]
-
-                # add the normalized sensor measurements
-                for sensor in mover.sensors:
-                    norm_meas = sensor.get_norm_measurements()
-                    non_dimensional_values.update(norm_meas)
+        return self.observation_spec.extract(self.learning_mover, out)
 
-                # get the action and network outputs from the network
-                inp = list(non_dimensional_values.values())
+    def compile_observations(self):
+        """
+        compiles the observation of the learning mover into an Observations.ObservationSpec, so each step reads the
+        state through index arrays instead of the observation data frame
 
-                # raw_outputs - q values or actor values
-                # critic values - either the q values or the critics values
-                raw_ouputs, critic_values = self.agent.get_output(inp)
-                critic_values = critic_values.cpu().detach().numpy()[0]
+        :return:
+        """
+        self.learning_mover = None
+        for name, mover in self.mover_dict.items():
+            if mover.can_learn:
+                if self.learning_mover is not None:
+                    raise ValueError('Only single agent learning currently supported')
+                self.learning_mover = mover
+        if self.learning_mover is None:
+            raise ValueError('A mover that learns is needed. Set is_agent for one of the movers in the input file')
+        self.observation_spec = Observations.ObservationSpec.compile(self.learning_mover)
+
+    def act(self, ep_num, t, raw_ouputs, is_evaluation):
+        """
+        converts the network outputs into a command for the learning mover and steps every mover forward in time
 
+        :param ep_num: the episode number in the training
+        :param t: time of the simulation [s]
+        :param raw_ouputs: q values or actor values for the learning mover. A tensor with one row
+        :param is_evaluation: if the episode is an evaluation episode
+        :return: the original action, the used action, the path control points, and if the agent step has ended
+        """
+        org_action = used_action = path_cps = end_step = None
+        for name, mover in self.mover_dict.items():
+            if mover.can_learn:
                 # convert the action to a command change
                 #propeller_angle_change, power_change, action, action_meta_data, end_step = self.ao.action_to_command(ep_num, t, mover.state_dict, raw_ouputs)
 
@@ -454,39 +674,16 @@ class Environment(ABC):
 
             mover.step(time=t)
 
-        # save the original state before stepping
-        state = non_dimensional_values
-
-        # normalize the state prime
-        for name, mover in self.mover_dict.items():
-            mover.update_sensors(self.mover_dict)
-            mover.derived_measurements(self.destination)
-
-        for name, mover in self.mover_dict.items():
-            if mover.can_learn:
-                # this mover is an agent and not a deterministic entity
-
-                # normalize the state
-                keys = mover.observation_df['name']
-                dimensional_values = OrderedDict()
-                non_dimensional_values = OrderedDict()
-                for key in keys:
-                    dimensional_values[key] = mover.state_dict.get(key)
-                    non_dimensional_values[key] = mover.state_dict.get(key)
-
-                norm_values = mover.observation_df['norm_value'].to_numpy()
-                norm_methods = mover.observation_df['norm_method'].to_numpy()
-                for i, norm_strat in enumerate(norm_values):
-                    # TODO norm by strategy. MOve this to its own method
-                    non_dimensional_values[keys[i]] = dimensional_values[keys[i]]/norm_values[i]
-
-                # add the normalized sensor measurements
-                for sensor in mover.sensors:
-                    norm_meas = sensor.get_norm_measurements()
-                    non_dimensional_values.update(norm_meas)
+        return org_action, used_action, path_cps, end_step
 
-        next_state = non_dimensional_values
+    def get_step_outcome(self, t):
+        """
+        gets the reward and the termination of a step after the movers have moved and been observed
 
+        :param t: time of the simulation [s]
+        :return: the reward, if the simulation has reached a terminal state, and the distance of the learning mover to
+            the destination [m]
+        """
         # get the reward
         reward = self.reward_func.get_reward(t, self.mover_dict)
 
@@ -494,24 +691,13 @@ class Environment(ABC):
         is_terminal = self.reward_func.get_terminal()
 
         # get the distance to the destination
+        dest_dst = None
         for name, mover in self.mover_dict.items():
             if mover.can_learn:
                 # updates sensors
                 dest_dst = mover.state_dict['dest_dist']
 
-        # the non-dimensional values of the state
-        # org_action - action before exmplation is added
-        # used_action - action where exploration may or may not be used. THis is the action used for the MDP
-        # path_cps - a list of path control points that define the naviation path. This is none for direct contol methods
-        # critic values - q values or the critics outpput values
-        # reward - given rewared during the simualtion step
-        # next_state - non-dimensional state after the movers moved
-        # end_step - if teh agents step completed or not. Should always be true for direct control and periodically true for path control
-        # is_terminal - if the simulation is done
-        # is_crashed - boolean if the boat crashed into an obstacle
-        # is_success - of the simulation ended reaching its goal
-        # dest_dst - distance to the destination after stepping
-        return state, org_action, used_action, path_cps, critic_values, reward, next_state, end_step, is_terminal, self.reward_func.is_crashed, self.reward_func.is_success, dest_dst
+        return reward, is_terminal, dest_dst
 
     def launch_training(self):
         """
@@ -548,9 +734,84 @@ class Environment(ABC):
         # save a copy of the hyperparameters
         self.save_hparams()
 
+        # build the movers, agent, and the rest of the simulation
+        reset_to_max_power = self.build_simulation()
+
+        # loop over training
+        elapsed_episodes = 0
+        num_episodes = self.h_params['scenario']['num_episodes']
+
+        # write the header for overall training progress
+        progress_file_name = "Output/" + str(self.h_params['scenario']['experiment_set']) + "/" + str(
+                               self.h_params['scenario']['trial_num'])+"/Progress/Data/training_progress.csv"
+        with open(progress_file_name, 'w') as f:
+            f.write('ep_num,cumulative_reward,is_crashed,is_success,min_dst,simulation_time,n_transitions,n_updates,update_to_data_ratio\n')
+            f.flush()
+
+        # create the files for saveing evaluation information. Only the learner writes them, rollout workers that build
+        # their own copy of the simulation do not
+        file_name = 'Output//' + str(self.h_params['scenario']['experiment_set']) + '//' + str(
+            self.h_params['scenario']['trial_num']) + '//Progress//Data//evaluation.csv'
+        with open(file_name, 'w') as f:
+            f.write("EpNum,SetNum,isSuccess,isCrashed,minDst,cumReward,simTime\n")
+
+        file_name = 'Output//' + str(self.h_params['scenario']['experiment_set']) + '//' + str(
+            self.h_params['scenario']['trial_num']) + '//Progress//Data//evaluation_average.csv'
+        with open(file_name, 'w') as f:
+            f.write("EpNum,successRate,crashRate,avgMinDst,avgCumReward,simTime\n")
+
+        try:
+            n_workers = self.h_params['scenario'].get('n_workers', 1)
+            if n_workers > 1:
+                # collect the episodes in rollout worker processes while this process trains
+                self.launch_worker_training(n_workers, num_episodes, reset_to_max_power, progress_file_name)
+                return
+
+            if self.h_params['scenario'].get('async_learner', False):
+                # train in a background thread while the episodes are collected
+                self.launch_async_training(num_episodes, reset_to_max_power, progress_file_name)
+                return
+
+            n_envs = self.h_params['scenario'].get('n_envs', 1)
+            if n_envs > 1:
+                # run several training episodes in lockstep so the agent acts for all of them with one forward pass
+                self.launch_vectorized_training(n_envs, num_episodes, reset_to_max_power, progress_file_name)
+                return
+
+            while elapsed_episodes < num_episodes:
+
+                # check if evaluation episodes are to be rn
+
+
+                if elapsed_episodes % self.h_params['scenario']['evaluation_frequency'] == 0 or elapsed_episodes == 0:
+                    # run a suite of evaluation episodes
+                    self.run_evaluation_set(elapsed_episodes, reset_to_max_power)
+
+
+                # run the episode where training data is accumulated
+                episode_results = self.run_simulation(elapsed_episodes,is_evaluation=False, reset_to_max_power=reset_to_max_power)
+
+                self.complete_training_episode(elapsed_episodes, episode_results, progress_file_name)
+
+                elapsed_episodes += 1
+        finally:
+            self.close_evaluation_workers()
+
+    def build_simulation(self):
+        """
+        builds the movers, sensors, action operation, learning agent, reward function, replay storage, and evaluation
+        set from the hyperparameters. The output folders are not touched, so this is also used to build the copies of
+        the environment that run in rollout worker processes.
+
+        :return: if the boats start at their maximum power
+        """
         # add agents/entities to the simulation. Boats, and obstacles
         self.add_entities()
 
+        # draws the initial conditions of the training episodes. Slots of a vectorized environment share it
+        self.reset_generator = ResetGenerator.ResetGenerator(self.h_params['scenario']['domain'],
+                                                             self.h_params['scenario'].get('reset_batch_size', 64))
+
         # load in the senors
         sensors = self.add_sensors()
 
@@ -568,6 +829,9 @@ class Environment(ABC):
         # get the state size
         state_size = self.get_state_size()
 
+        # compile how the observations are read from the learning mover
+        self.compile_observations()
+
         # temporary for when only using one agent
         #if len(state_size) != 1:
         #    raise ValueError('Only single agent learning currently supported')
@@ -575,10 +839,20 @@ class Environment(ABC):
         # get the learning algorithm
         la = self.get_learning_algorithm(action_size,state_size, self.h_params['optimizer'])
         self.agent = la
+        settings = self.h_params['learning_algorithm']
+        self.update_scheduler = UpdateScheduler.UpdateScheduler(settings['n_batches'], settings.get('train_every', None),
+                                                                settings.get('max_updates_per_second', None))
 
         # get the reward function
         self.reward_func = RewardFunctions.select_reward_function(self.h_params, self.ao)
 
+        # share one computation of the distances between the movers with the sensors and the reward function
+        self.proximity = Proximity.ProximityService()
+        self.reward_func.proximity = self.proximity
+        for mover in self.mover_dict.values():
+            for sensor in mover.sensors:
+                sensor.proximity = self.proximity
+
         # get the replay buffer
         self.get_memory_mechanism()
 
@@ -588,56 +862,169 @@ class Environment(ABC):
         # set data storage parameters
         self.set_data_storage()
 
-        # loop over training
+        return reset_to_max_power
+
+    def launch_vectorized_training(self, n_envs, num_episodes, reset_to_max_power, progress_file_name):
+        """
+        runs the training episodes with a VecEnvironment.VecEnvironment. The episodes are numbered in the order they are
+        started, and each one is logged and trained on when it ends, like the episodes of launch_training. The
+        evaluation set is run whenever the count of completed episodes reaches the evaluation frequency.
+
+        :param n_envs: number of episodes run in lockstep
+        :param num_episodes: total number of training episodes
+        :param reset_to_max_power: if the boats start at their maximum power
+        :param progress_file_name: file the overall training progress is written to
+        :return:
+        """
+        vec_env = VecEnvironment.VecEnvironment(self, n_envs, num_episodes, reset_to_max_power)
+
         elapsed_episodes = 0
-        num_episodes = self.h_params['scenario']['num_episodes']
+        self.run_evaluation_set(elapsed_episodes, reset_to_max_power)
+        while not vec_env.is_done():
 
-        # write the header for overall training progress
-        progress_file_name = "Output/" + str(self.h_params['scenario']['experiment_set']) + "/" + str(
-                               self.h_params['scenario']['trial_num'])+"/Progress/Data/training_progress.csv"
-        with open(progress_file_name, 'w') as f:
-            f.write('ep_num,cumulative_reward,is_crashed,is_success,min_dst,simulation_time\n')
-            f.flush()
+            for ep_num, slot, episode_results in vec_env.step():
 
-        while elapsed_episodes < num_episodes:
+                slot.complete_training_episode(ep_num, episode_results, progress_file_name)
+                elapsed_episodes += 1
 
-            # check if evaluation episodes are to be rn
+                if elapsed_episodes % self.h_params['scenario']['evaluation_frequency'] == 0 and elapsed_episodes < num_episodes:
+                    # run a suite of evaluation episodes
+                    self.run_evaluation_set(elapsed_episodes, reset_to_max_power)
 
+    def launch_worker_training(self, n_workers, num_episodes, reset_to_max_power, progress_file_name):
+        """
+        runs the training episodes in RolloutWorkers.RolloutWorkers processes. This process is the learner. Each
+        episode a worker finishes is pushed into the replay storage, logged, and trained on like the episodes of
+        launch_training, and the new policy weights are sent to the workers every weight_sync_frequency episodes. The
+        evaluation set is run here whenever the count of completed episodes reaches the evaluation frequency.
+
+        :param n_workers: number of rollout worker processes
+        :param num_episodes: total number of training episodes
+        :param reset_to_max_power: if the boats start at their maximum power
+        :param progress_file_name: file the overall training progress is written to
+        :return:
+        """
+        sync_frequency = self.h_params['scenario'].get('weight_sync_frequency', 1)
 
-            if elapsed_episodes % self.h_params['scenario']['evaluation_frequency'] == 0 or elapsed_episodes == 0:
-                # run a suite of evaluation episodes
-                self.run_evaluation_set(elapsed_episodes, reset_to_max_power)
+        workers = RolloutWorkers.RolloutWorkers(Environment(self.h_params), n_workers, num_episodes)
+        workers.start(self.agent.get_policy_weights())
 
+        elapsed_episodes = 0
+        self.run_evaluation_set(elapsed_episodes, reset_to_max_power)
+        try:
+            for worker_id, ep_num, transitions, episode_results in workers.get_episodes():
 
-            # run the episode where training data is accumulated
-            cumulative_reward, is_crashed, is_success, min_dst, total_episode_time = self.run_simulation(elapsed_episodes,is_evaluation=False, reset_to_max_power=reset_to_max_power)
+                # store the data of the episode
+                self.replay_storage.push_batch(self.device, [worker_id] * len(transitions), transitions)
+                self.replay_storage.sort_data_into_buffers(worker_id)
 
-            print("Episode Number={}\tSuccess={}\tCrash={}\tProximity={:.3f}\tReward={:.3f}".format(elapsed_episodes, is_success, is_crashed,min_dst,
-                                                                                 cumulative_reward))
+                self.complete_training_episode(ep_num, episode_results, progress_file_name, is_history_written=True)
+                elapsed_episodes += 1
 
-            # write episode history out to a file
-            self.write_history(elapsed_episodes,is_evaluation=False)
+                if elapsed_episodes % sync_frequency == 0:
+                    workers.send_weights(self.agent.get_policy_weights())
 
-            # save macro simulation information
-            with open(progress_file_name, 'a') as f:
-                f.write(str(elapsed_episodes)+','+str(cumulative_reward)+','+str(is_crashed)+','+str(is_success)+','+str(min_dst)+','+str(total_episode_time)+'\n')
-                f.flush()
+                if elapsed_episodes % self.h_params['scenario']['evaluation_frequency'] == 0 and elapsed_episodes < num_episodes:
+                    # run a suite of evaluation episodes
+                    self.run_evaluation_set(elapsed_episodes, reset_to_max_power)
+        finally:
+            workers.close()
+
+    def launch_async_training(self, num_episodes, reset_to_max_power, progress_file_name):
+        """
+        runs the training episodes while an AsyncLearner.AsyncLearner trains a copy of the agent in a background
+        thread. The agent that acts loads the newest weights of the learner every actor_refresh_frequency episodes.
+        Before the evaluation set is run, the learner catches up on every finished episode so the evaluation uses the
+        current policy.
+
+        :param num_episodes: total number of training episodes
+        :param reset_to_max_power: if the boats start at their maximum power
+        :param progress_file_name: file the overall training progress is written to
+        :return:
+        """
+        refresh_frequency = self.h_params['scenario'].get('actor_refresh_frequency', 1)
+        max_lag = self.h_params['scenario'].get('max_learner_lag', 2)
+
+        learner = AsyncLearner.AsyncLearner(copy.deepcopy(self.agent), self.train_after_episode, max_lag)
+        learner.start()
+        try:
+            for ep_num in range(num_episodes):
+
+                if ep_num % self.h_params['scenario']['evaluation_frequency'] == 0:
+                    # run a suite of evaluation episodes with the current policy
+                    learner.wait()
+                    self.agent.set_policy_weights(learner.get_policy_weights())
+                    self.run_evaluation_set(ep_num, reset_to_max_power)
+
+                # run the episode where training data is accumulated
+                episode_results = self.run_simulation(ep_num, is_evaluation=False, reset_to_max_power=reset_to_max_power)
+
+                self.complete_training_episode(ep_num, episode_results, progress_file_name, learner=learner)
+
+                if (ep_num + 1) % refresh_frequency == 0:
+                    self.agent.set_policy_weights(learner.get_policy_weights())
+        finally:
+            learner.close()
+
+    def complete_training_episode(self, ep_num, episode_results, progress_file_name, is_history_written=False,
+                                  learner=None):
+        """
+        logs a training episode that has ended, trains the agent, and updates the target networks when it is time to.
+
+        :param ep_num: the episode number in the training
+        :param episode_results: the results of the episode as returned from run_simulation
+        :param progress_file_name: file the overall training progress is written to
+        :param is_history_written: true if the episode history was already written, like by a rollout worker
+        :param learner: an AsyncLearner.AsyncLearner the training is handed to. None to train before returning
+        :return:
+        """
+        cumulative_reward, is_crashed, is_success, min_dst, total_episode_time = episode_results
+
+        print("Episode Number={}\tSuccess={}\tCrash={}\tProximity={:.3f}\tReward={:.3f}".format(ep_num, is_success, is_crashed,min_dst,
+                                                                             cumulative_reward))
+
+        # write episode history out to a file
+        if not is_history_written:
+            self.write_history(ep_num,is_evaluation=False)
+
+        # train the networks
+        if learner is None:
+            self.train_after_episode(self.agent, ep_num)
+        else:
+            learner.submit(ep_num)
+
+        # save macro simulation information. The counts include the training on this episode. A learner thread trains
+        # later, so its updates lag behind the transitions in the replay storage
+        n_transitions = self.replay_storage.n_transitions
+        with open(progress_file_name, 'a') as f:
+            f.write(str(ep_num)+','+str(cumulative_reward)+','+str(is_crashed)+','+str(is_success)+','+str(min_dst)+','+str(total_episode_time)+','+
+                    str(n_transitions)+','+str(self.update_scheduler.n_updates)+','+str(self.update_scheduler.get_update_to_data_ratio(n_transitions))+'\n')
+            f.flush()
 
-            # train the networks
-            self.agent.train_agent(self.replay_storage)
+    def train_after_episode(self, agent, ep_num):
+        """
+        trains an agent on the replay storage after an episode, and updates the target networks when it is time to.
 
-            # update target networks if applicable
-            if elapsed_episodes > 0 and elapsed_episodes % self.h_params['learning_algorithm']['target_frequency'] == 0:
+        :param agent: the agent that is trained
+        :param ep_num: the episode number in the training
+        :return:
+        """
+        # train the networks for as many gradient steps as the data collected since the last training has earned
+        n_batches = self.update_scheduler.get_n_updates(self.replay_storage.n_transitions)
+        n_updates = agent.n_updates
+        agent.train_agent(self.replay_storage, n_batches)
+        self.update_scheduler.add_updates(agent.n_updates - n_updates)
 
-                # update the target networks parameters
-                #self.agent.target_network.load_state_dict(self.agent.network.state_dict())
-                self.agent.update_target_network()
+        # update target networks if applicable
+        if ep_num > 0 and ep_num % self.h_params['learning_algorithm']['target_frequency'] == 0:
 
-                # save the networks
-                self.agent.save_networks(elapsed_episodes,"Output/" + str(self.h_params['scenario']['experiment_set']) + "/" + str(
-                               self.h_params['scenario']['trial_num'])+"/Models/")
+            # update the target networks parameters
+            #self.agent.target_network.load_state_dict(self.agent.network.state_dict())
+            agent.update_target_network()
 
-            elapsed_episodes += 1
+            # save the networks
+            agent.save_networks(ep_num,"Output/" + str(self.h_params['scenario']['experiment_set']) + "/" + str(
+                           self.h_params['scenario']['trial_num'])+"/Models/")
 
     def create_folders(self):
         """
@@ -693,48 +1080,58 @@ class Environment(ABC):
         :return: none
         """
 
-        try:
-            sensors_data = self.h_params['sensors']
-
-            for name, sensor in sensors_data.items():
-
-                if 'lidar_' in name:
-                    # create a ProcessedLidar object that simulates the measurements after the raw lidar data has been
-                    # filtered and obstacles more succintly defined
-
-                    measurement_df = pd.DataFrame(columns=['name','norm_value','norm_method'])
-                    meas_var_info = sensor['max_range']
-                    meas_var_info = meas_var_info.split(',')
-                    row = dict()
-                    row['name'] = 'max_range'
-                    row['norm_value'] = float(meas_var_info[1])
-                    row['norm_method'] = meas_var_info[2]
-                    measurement_df = measurement_df.append(row, ignore_index=True)
-
-                    meas_var_info = sensor['max_theta']
-                    meas_var_info = meas_var_info.split(',')
-                    row = dict()
-                    row['name'] = 'max_theta'
-                    row['norm_value'] = float(meas_var_info[1])
-                    row['norm_method'] = meas_var_info[2]
-                    measurement_df = measurement_df.append(row, ignore_index=True)
-
-                    tmp_sensor = Sensors.ProcessedLidar(base_range=float(sensor['base_range']),base_theta=float(sensor['base_theta']),
-                                           name=name,measurement_norm_df=measurement_df,mover_owner_name=sensor['install_on'])
-
-                    for mover_name, mover in self.mover_dict.items():
-                        if mover_name == tmp_sensor.mover_owner_name:
-                            mover.add_sensor(tmp_sensor)
-
-                            # add the data from the sensor to the history for the mover
-                            tmp_state = tmp_sensor.get_raw_measurements()
-                            for ts in tmp_state:
-                                mover.history_header.append(mover.state_dict['name'] + '_' + ts)
+        # the sensors are optional
+        sensors_data = self.h_params.get('sensors', None)
+        if sensors_data is None:
+            return
+
+        for name, sensor in sensors_data.items():
+
+            if 'raycast_' in name:
+                # create a RayCastLidar object that measures the range along each of its beams to the obstacles
+                meas_var_info = sensor['max_range'].split(',')
+                measurement_df = pd.DataFrame([{'name': 'max_range', 'norm_value': float(meas_var_info[1]),
+                                                'norm_method': meas_var_info[2]}])
+
+                tmp_sensor = Sensors.RayCastLidar(name=name, measurement_norm_df=measurement_df,
+                                                  mover_owner_name=sensor['install_on'], n_beams=int(sensor['n_beams']),
+                                                  field_of_view=float(sensor.get('field_of_view', 2.0*np.pi)))
+
+                for mover_name, mover in self.mover_dict.items():
+                    if mover_name == tmp_sensor.mover_owner_name:
+                        mover.add_sensor(tmp_sensor)
+
+            elif 'lidar_' in name:
+                # create a ProcessedLidar object that simulates the measurements after the raw lidar data has been
+                # filtered and obstacles more succintly defined
+
+                measurement_df = pd.DataFrame(columns=['name','norm_value','norm_method'])
+                meas_var_info = sensor['max_range']
+                meas_var_info = meas_var_info.split(',')
+                row = dict()
+                row['name'] = 'max_range'
+                row['norm_value'] = float(meas_var_info[1])
+                row['norm_method'] = meas_var_info[2]
+                measurement_df = measurement_df.append(row, ignore_index=True)
+
+                meas_var_info = sensor['max_theta']
+                meas_var_info = meas_var_info.split(',')
+                row = dict()
+                row['name'] = 'max_theta'
+                row['norm_value'] = float(meas_var_info[1])
+                row['norm_method'] = meas_var_info[2]
+                measurement_df = measurement_df.append(row, ignore_index=True)
+
+                tmp_sensor = Sensors.ProcessedLidar(base_range=float(sensor['base_range']),base_theta=float(sensor['base_theta']),
+                                       name=name,measurement_norm_df=measurement_df,mover_owner_name=sensor['install_on'],
+                                       n_nearest=int(sensor.get('n_nearest', 1)))
+
+                for mover_name, mover in self.mover_dict.items():
+                    if mover_name == tmp_sensor.mover_owner_name:
+                        mover.add_sensor(tmp_sensor)
 
-                else:
-                    raise ValueError('Sensor not currently supported')
-        except:
-            pass
+            else:
+                raise ValueError('Sensor not currently supported')
 
     def add_entities(self):
         """
@@ -919,7 +1316,7 @@ class Environment(ABC):
         loss = settings['loss']
         n_batches = settings['n_batches']
         batch_size = settings['batch_size']
-        device = 'cuda'
+        device = self.device
 
         if settings['name'] == 'DQN':
             activation = settings['activation']
@@ -985,24 +1382,24 @@ class Environment(ABC):
         self.evaluation_info = evaluation_info
         self.n_evaluations = len(evaluation_info)
 
-        # create the files for saveing evaluation information
-        file_name = 'Output//' + str(self.h_params['scenario']['experiment_set']) + '//' + str(
-            self.h_params['scenario']['trial_num']) + '//Progress//Data//evaluation.csv'
-        with open(file_name, 'w') as f:
-            f.write("EpNum,SetNum,isSuccess,isCrashed,minDst,cumReward,simTime\n")
-
-        file_name = 'Output//' + str(self.h_params['scenario']['experiment_set']) + '//' + str(
-            self.h_params['scenario']['trial_num']) + '//Progress//Data//evaluation_average.csv'
-        with open(file_name, 'w') as f:
-            f.write("EpNum,successRate,crashRate,avgMinDst,avgCumReward,simTime\n")
-
     def run_evaluation_set(self, ep_num, reset_to_max_power):
         """
         runs a set of evaluation simulations. The simulations are a deterministic set with a fixed group of initial
         conditions. These are used for a fixed measuring stick for performance of the agent's learning. The initial
         conditions are outlined in the input file.
+
+        With scenario.n_evaluation_workers above 0 the set is split across a pool of RolloutWorkers.EvaluationWorkers
+        processes that use a frozen copy of the current weights. Each evaluation episode seeds its own random numbers,
+        so the results do not depend on the number of workers.
         :return:
         """
+        n_evaluation_workers = self.h_params['scenario'].get('n_evaluation_workers', 0)
+        if n_evaluation_workers > 0:
+            if self.evaluation_workers is None:
+                self.evaluation_workers = RolloutWorkers.EvaluationWorkers(Environment(self.h_params), n_evaluation_workers)
+            evaluation_results = self.evaluation_workers.run(ep_num, self.agent.get_policy_weights(), self.n_evaluations)
+        else:
+            evaluation_results = [self.run_evaluation_episode(ep_num, i, reset_to_max_power) for i in range(self.n_evaluations)]
 
         crash_set = []
         success_set = []
@@ -1011,8 +1408,7 @@ class Environment(ABC):
         time_to_completion_set = []
         for i in range(self.n_evaluations):
 
-            # run the simulation in evaluation mode
-            cumulative_reward, is_crashed, is_success, min_dst, total_episode_time = self.run_simulation(ep_num,is_evaluation=True,reset_to_max_power=reset_to_max_power,evaluation_number=i)
+            cumulative_reward, is_crashed, is_success, min_dst, total_episode_time = evaluation_results[i]
 
             print("Evaluation Episode Number={}\tSet Number={}\tSuccess={}\tCrash={}\tProximity={:.3f}\tReward={:.3f}".format(ep_num,i,is_success,is_crashed,min_dst,cumulative_reward))
 
@@ -1023,9 +1419,6 @@ class Environment(ABC):
             cum_reward_set.append(cumulative_reward)
             time_to_completion_set.append(total_episode_time)
 
-            # write episode history out to a file
-            self.write_history(ep_num, is_evaluation=True, eval_num=i)
-
             file_name = 'Output//' + str(self.h_params['scenario']['experiment_set']) + '//' + str(
                 self.h_params['scenario']['trial_num']) + '//Progress//Data//evaluation.csv'
             with open(file_name,'a') as f:
@@ -1067,6 +1460,40 @@ class Environment(ABC):
 
             f.write(str_to_write)
 
+    def run_evaluation_episode(self, ep_num, evaluation_number, reset_to_max_power):
+        """
+        runs one episode of the evaluation set and writes its history. The random numbers are seeded from the scenario
+        seed and the row of the evaluation set, and the random state of the training is restored afterwards, so an
+        evaluation episode gives the same result no matter which process runs it or what ran before it.
+
+        :param ep_num: the episode number in the training
+        :param evaluation_number: the row of the evaluation set
+        :param reset_to_max_power: if the boats start at their maximum power
+        :return: the results of the episode as returned from run_simulation
+        """
+        training_random_state = np.random.get_state()
+        np.random.seed([int(self.h_params['scenario'].get('seed', 0)), evaluation_number])
+        try:
+            # run the simulation in evaluation mode
+            episode_results = self.run_simulation(ep_num,is_evaluation=True,reset_to_max_power=reset_to_max_power,evaluation_number=evaluation_number)
+        finally:
+            np.random.set_state(training_random_state)
+
+        # write episode history out to a file
+        self.write_history(ep_num, is_evaluation=True, eval_num=evaluation_number)
+
+        return episode_results
+
+    def close_evaluation_workers(self):
+        """
+        stops the evaluation worker processes if they were started
+
+        :return:
+        """
+        if self.evaluation_workers is not None:
+            self.evaluation_workers.close()
+            self.evaluation_workers = None
+
     def save_hparams(self):
         """
         saves a copy of the hyperparameters used in the simulation for documentation and reference later. The parameters
@@ -1080,6 +1507,17 @@ class Environment(ABC):
 
         self.save_training_data = self.h_params['scenario']['save_training_telemetry']
         self.save_freq = self.h_params['scenario']['save_freq']
+        # skip the per step histories of training episodes that are not saved
+        self.headless = self.h_params['scenario'].get('headless', True)
+
+    def is_training_history_saved(self, ep_num):
+        """
+        checks if the history of a training episode is written out
+
+        :param ep_num: the episode number in the training
+        :return: true if the history is saved
+        """
+        return self.save_training_data and ep_num % self.save_freq == 0
 
     @staticmethod
     def create_environment(file_name):
@@ -110,7 +110,7 @@ class ActorNetwork(nn.Module):
         #
         self.out_active = torch.nn.Tanh()
 
-        self.max_action = ReplayMemory.convert_numpy_to_tensor('cuda',max_action)
+        self.max_action = ReplayMemory.convert_numpy_to_tensor(device,max_action)
 
     def forward(self, z):
         """
@@ -216,6 +216,8 @@ class LearningAlgorithms:
         self.gamma = h_params['learning_algorithm']['gamma']
         self.device = device
         self.optimizer = None
+        self.policy_network_names = []  # attributes of the networks that are used to select actions
+        self.n_updates = 0  # total number of gradient steps taken
 
         #self.output_history = []
 
@@ -227,6 +229,29 @@ class LearningAlgorithms:
         #self.output_history = []
         #pass
 
+    def get_policy_weights(self):
+        """
+        gets a copy of the weights of the networks used to select actions. The weights are on the cpu so they can be
+        sent to another process.
+
+        :return: dictionary of the network name to its state dictionary
+        """
+        weights = dict()
+        for name in self.policy_network_names:
+            state_dict = getattr(self, name).state_dict()
+            weights[name] = {key: value.detach().cpu().clone() for key, value in state_dict.items()}
+        return weights
+
+    def set_policy_weights(self, weights):
+        """
+        loads weights from get_policy_weights into the networks used to select actions
+
+        :param weights: dictionary of the network name to its state dictionary
+        :return:
+        """
+        for name, state_dict in weights.items():
+            getattr(self, name).load_state_dict(state_dict)
+
     @abstractmethod
     def save_networks(self, ep_num, file_path):
         pass
@@ -259,6 +284,7 @@ class DQN(LearningAlgorithms):
 
         # create the target network
         self.target_network = QNetwork(action_size, h_params, layer_numbers, state_size, device)
+        self.policy_network_names = ['network']
 
         # create the optimizer
         self.optimizer = Optimizer.get_optimizer(self.network.parameters(), optimizer_settings)
@@ -279,15 +305,32 @@ class DQN(LearningAlgorithms):
                 out = self.network.forward(torch.Tensor(inp))
                 return out, out
 
-    def train_agent(self, replay_storage):
+    def get_batch_output(self, inp):
+        """
+        get the output from the network for several observations with one forward pass
+
+        :param inp: list of input lists, one row per observation
+        :return: the q values as both the raw outputs and the critic values, one row per observation
+        """
+        inp = torch.tensor(np.asarray(inp, dtype=float), device=self.device, dtype=torch.float)
+        with torch.no_grad():
+            out = self.network.forward(inp)
+        return out, out
+
+    def train_agent(self, replay_storage, n_batches=None):
         """
         train the networks with the available data
+
+        :param replay_storage: the replay storage the batches are sampled from
+        :param n_batches: the number of gradient steps. The n_batches of the agent if None
         :return:
         """
+        if n_batches is None:
+            n_batches = self.n_batches
 
         loss = None
         c = 0
-        while c < self.n_batches:
+        while c < n_batches:
 
             transitions = replay_storage.sample(self.batch_size)
             if transitions is None:
@@ -331,6 +374,7 @@ class DQN(LearningAlgorithms):
             self.optimizer.step()
 
             c += 1
+            self.n_updates += 1
 
         return loss
 
@@ -377,6 +421,7 @@ class DDPG(LearningAlgorithms):
         self.critic_target_net = CriticNetwork(action_size, h_params, critic_layer_numbers, state_size, device)
         self.critic_target_net.load_state_dict(self.critic_net.state_dict())
         self.critic_target_net.eval()
+        self.policy_network_names = ['actor_policy_net', 'critic_net']
 
         # create the optimizer
         self.actor_optimizer = Optimizer.get_optimizer(self.actor_policy_net.parameters(), optimizer_settings)
@@ -415,15 +460,33 @@ class DDPG(LearningAlgorithms):
                 critic_values = self.critic_net(sa)
                 return out, critic_values
 
-    def train_agent(self, replay_storage):
+    def get_batch_output(self, inp):
+        """
+        get the output from the actor and critic for several observations with one forward pass of each network
+
+        :param inp: list of input lists, one row per observation
+        :return: the actor outputs and the critic values, one row per observation
+        """
+        inp_tensor = torch.tensor(np.asarray(inp, dtype=float), device=self.device, dtype=torch.float)
+        with torch.no_grad():
+            out = self.actor_policy_net(inp_tensor)
+            critic_values = self.critic_net(torch.cat([inp_tensor, out], dim=1))
+        return out, critic_values
+
+    def train_agent(self, replay_storage, n_batches=None):
         """
         train the networks with the available data
+
+        :param replay_storage: the replay storage the batches are sampled from
+        :param n_batches: the number of gradient steps. The n_batches of the agent if None
         :return:
         """
+        if n_batches is None:
+            n_batches = self.n_batches
 
         loss = None
         c = 0
-        while c < self.n_batches:
+        while c < n_batches:
 
             transitions = replay_storage.sample(self.batch_size)
             if transitions is None:
@@ -469,6 +532,7 @@ class DDPG(LearningAlgorithms):
             self.update_target_network()
 
             c += 1
+            self.n_updates += 1
 
         return loss
 
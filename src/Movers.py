@@ -5,22 +5,658 @@ at the river boat and obstacles that are not river boats.
 """
 
 from abc import ABC, abstractmethod
+import array
 from collections import namedtuple, OrderedDict
+import math
 import os
 
 import numpy as np
 import pandas as pd
 
+import src.Telemetry as Telemetry
+import src.ThrustSurface as ThrustSurface
+
+
+def solve_induced_velocity(v0, alpha_d, power, rho, area, v_guess=0.0, tol=1e-12, max_iterations=50):
+    """
+    solves the thrust equation for the smallest positive induced velocity of a propeller. The equation is solved in
+    non-dimensional form, x = v/vh, where the residual is
+
+        f(x) = x^2 (x^2 + 2 a s x + a^2) (x + a s)^2 - 1
+
+    with a = v0/vh and s = sin(alpha_d). Newton's method with the analytic derivative is started from v_guess, which
+    is typically the induced velocity of the previous step, and is kept inside a bracket that holds only the wanted
+    root. Steps that leave the bracket are replaced with bisection steps.
+
+    For s >= 0 the residual increases monotonically from -1 at zero and the root is in [0, 1]. For s < 0 the residual
+    returns to -1 at x = -a*s and increases monotonically after it. The hump before that point can only cross zero
+    when a^6*s^4/16 >= 1. Only then is the top of the hump searched for with a golden section search.
+
+    :param v0: magnitude of the velocity of the fluid flowing into the rotor disk not due to the rotor [m/s]
+    :param alpha_d: the effective angle of incidence of the fluid flowing into the rotor disk [rad]
+    :param power: the power applied to the rotor [watt]. Must be positive
+    :param rho: the density of the fluid the rotor is in [kg/m^3]
+    :param area: the disk area of the rotor [m^2]
+    :param v_guess: starting guess for the induced velocity [m/s]
+    :param tol: convergence tolerance on the non-dimensional induced velocity
+    :param max_iterations: the maximum number of Newton or bisection steps
+    :return:
+        v_induced - the induced velocity [m/s]
+        n_iterations - the number of Newton or bisection steps taken
+        n_fallbacks - the number of steps that fell back to bisection or the golden section search
+    """
+    vh = (power / (2.0 * rho * area)) ** (1.0 / 3.0)
+    a = v0 / vh
+    s = math.sin(alpha_d)
+    a_s = a * s
+    n_fallbacks = 0
+
+    # bracket on the monotone branch of the residual
+    lo = max(-a_s, 0.0)
+    hi = lo + 1.0
+
+    if lo > 0.0 and a ** 6 * s ** 4 >= 16.0:
+        # the hump before the dip may cross zero. Find its top with a golden section search
+        n_fallbacks += 1
+        inv_golden = (math.sqrt(5.0) - 1.0) / 2.0
+        left = 0.0
+        right = lo
+        while right - left > tol:
+            c = right - inv_golden * (right - left)
+            d = left + inv_golden * (right - left)
+            fc = c * c * (c * c + 2.0 * a_s * c + a * a) * (c + a_s) * (c + a_s)
+            fd = d * d * (d * d + 2.0 * a_s * d + a * a) * (d + a_s) * (d + a_s)
+            if fc > fd:
+                right = d
+            else:
+                left = c
+        x_peak = 0.5 * (left + right)
+        if x_peak * x_peak * (x_peak * x_peak + 2.0 * a_s * x_peak + a * a) * (x_peak + a_s) * (x_peak + a_s) >= 1.0:
+            # the first root is on the rising side of the hump
+            lo = 0.0
+            hi = x_peak
+
+    # warm start from the guess if it is inside of the bracket
+    x = v_guess / vh
+    if not lo < x < hi:
+        x = 0.5 * (lo + hi)
+
+    n_iterations = 0
+    while n_iterations < max_iterations:
+        n_iterations += 1
+
+        x_as = x + a_s
+        p1 = x * x * (x * x + 2.0 * a_s * x + a * a)
+        dp1 = x * (4.0 * x * x + 6.0 * a_s * x + 2.0 * a * a)
+        f = p1 * x_as * x_as - 1.0
+        df = dp1 * x_as * x_as + 2.0 * p1 * x_as
+
+        # the residual increases monotonically across the bracket
+        if f >= 0.0:
+            hi = x
+        else:
+            lo = x
+
+        if df > 0.0:
+            newton_step = f / df
+            if abs(newton_step) < tol:
+                # converged
+                x -= newton_step
+                break
+            x_new = x - newton_step
+        else:
+            x_new = lo - 1.0
+
+        if not lo < x_new < hi:
+            # newton left the bracket
+            x_new = 0.5 * (lo + hi)
+            n_fallbacks += 1
+            if hi - lo < tol:
+                x = x_new
+                break
+
+        x = x_new
+
+    return x * vh, n_iterations, n_fallbacks
+
+
+def aero_coeffs(x):
+    """
+    the analytic aerodynamic coefficients that act on the boat from the wind and the relative wind induced by motion.
+    Works for scalar and array inputs.
+
+    :param x: relative flow angle [rad]
+    :return:
+        cd (axial) - coefficient of axial flow
+        cs (side) - coefficient of lateratl flow
+        cy (moment) - coefficent for induced moment
+        cr (normal side) - coefficient for when flow is directly perpendicular
+    """
+
+    # drag coefficient
+    cd = 0.195738 + 0.518615 * np.abs(x) - 0.496029 * x * x + 0.0941925 * np.abs(x) ** 3 + \
+         1.86427 * np.sin(2.0 * np.pi * np.power(np.abs(x) / np.pi, 1.05)) * np.exp(
+        -2.17281 * np.power(np.abs(x) - np.pi / 2.0, 2.0))
+
+    # side force coefficient
+    cs = np.sign(x) * (12.3722 - 15.453 * np.abs(x) + 6.0261 * np.abs(x * x) - 0.532325 * np.abs(x) ** 3) * \
+         np.sin(np.abs(x)) * np.exp(-1.68668 * np.power(np.abs(x) - np.pi / 2.0, 2.0))  # - np.sign(x)*0.1
+
+    # yaw coefficient
+    cy = np.sign(x) * (0.710204 - 0.297196 * np.abs(x) + 0.0857296 * np.abs(x * x)) * np.sin(
+        np.pi * 2.0 * np.power(np.abs(x) / np.pi, 1.05))
+
+    # perpendicular side force coefficient
+    cr = 0.904313
+
+    return cd, cs, cy, cr
+
+
+def hydro_coeffs(x):
+    """
+    the analytic hydrodynamic coefficients that act on the boat from the water and the relative current induced by
+    motion. Works for scalar and array inputs.
+
+    :param x: relative flow angle [rad]
+    :return:
+        cd (axial) - coefficient of axial flow
+        cs (side) - coefficient of lateratl flow
+        cy (moment) - coefficent for induced moment
+        cr (normal side) - coefficient for when flow is directly perpendicular
+    """
+
+    # drag coefficient
+    cd = 0.245219 - 0.93044 * np.abs(x) + 0.745752 * np.abs(x * x) - 0.15915 * np.power(np.abs(x), 3.0) + \
+         2.79188 * np.sin(2.0 * np.abs(x)) * np.exp(-1.05667 * np.power(np.abs(x) - np.pi / 2.0, 2.0))
+
+    # side force coefficient
+    cs = np.sign(x) * (0.115554 + 3.09423 * np.abs(x) - 0.984923 * x * x) * np.sin(np.abs(x))
+
+    # yaw coefficient
+    cy = np.sign(x) * (0.322986 + 0.317964 * np.abs(x) - 0.1021844 * x * x) * np.sin(2.0 * np.abs(x))
+
+    # perpendicular side force coefficient
+    cr = 2.545759
+
+    return cd, cs, cy, cr
+
+
+def scalar_aero_coeffs(x):
+    """
+    math module version of aero_coeffs for a single flow angle. Avoids creating numpy scalars when stepping a single
+    boat.
+
+    :param x: relative flow angle [rad] as a float
+    :return: cd, cs, cy, cr
+    """
+    abs_x = abs(x)
+    sign_x = math.copysign(1.0, x) if x != 0.0 else 0.0
+    cd = 0.195738 + 0.518615 * abs_x - 0.496029 * x * x + 0.0941925 * abs_x ** 3 + \
+         1.86427 * math.sin(2.0 * math.pi * math.pow(abs_x / math.pi, 1.05)) * math.exp(
+        -2.17281 * math.pow(abs_x - math.pi / 2.0, 2.0))
+    cs = sign_x * (12.3722 - 15.453 * abs_x + 6.0261 * abs(x * x) - 0.532325 * abs_x ** 3) * \
+         math.sin(abs_x) * math.exp(-1.68668 * math.pow(abs_x - math.pi / 2.0, 2.0))
+    cy = sign_x * (0.710204 - 0.297196 * abs_x + 0.0857296 * abs(x * x)) * math.sin(
+        math.pi * 2.0 * math.pow(abs_x / math.pi, 1.05))
+    cr = 0.904313
+
+    return cd, cs, cy, cr
+
+
+def scalar_hydro_coeffs(x):
+    """
+    math module version of hydro_coeffs for a single flow angle. Avoids creating numpy scalars when stepping a single
+    boat.
+
+    :param x: relative flow angle [rad] as a float
+    :return: cd, cs, cy, cr
+    """
+    abs_x = abs(x)
+    sign_x = math.copysign(1.0, x) if x != 0.0 else 0.0
+    cd = 0.245219 - 0.93044 * abs_x + 0.745752 * abs(x * x) - 0.15915 * math.pow(abs_x, 3.0) + \
+         2.79188 * math.sin(2.0 * abs_x) * math.exp(-1.05667 * math.pow(abs_x - math.pi / 2.0, 2.0))
+    cs = sign_x * (0.115554 + 3.09423 * abs_x - 0.984923 * x * x) * math.sin(abs_x)
+    cy = sign_x * (0.322986 + 0.317964 * abs_x - 0.1021844 * x * x) * math.sin(2.0 * abs_x)
+    cr = 2.545759
+
+    return cd, cs, cy, cr
+
+
+class CoefficientTable:
+
+    def __init__(self, coeff_func, n_intervals=720, method='cubic'):
+        """
+        a table of the cd, cs, and cy coefficients returned by coeff_func tabulated over flow angles of [-pi, pi]. The
+        table is built once and then interpolated so a lookup is a constant amount of work regardless of how
+        expensive the analytic form is. The grid is uniform with a node at zero so the kinks the absolute values put
+        in the analytic forms fall on nodes and not inside of an interval.
+
+        Each interval stores the coefficients of a polynomial in the offset from its left node. Linear interpolation
+        uses the end values. Cubic interpolation passes through the end values and two interior points of the
+        interval. Both are continuous across nodes and neither smooths over a kink at a node.
+
+        :param coeff_func: function that takes a flow angle [rad] and returns cd, cs, cy, and cr. cr must be constant
+        :param n_intervals: number of intervals across [-pi, pi]. Must be even and positive
+        :param method: interpolation method. Either linear or cubic
+        """
+        if n_intervals <= 0 or n_intervals % 2 != 0:
+            raise ValueError('The number of intervals in a coefficient table must be even and positive')
+        if method not in ('linear', 'cubic'):
+            raise ValueError('Unsupported coefficient table interpolation method ' + str(method))
+
+        self.coeff_func = coeff_func
+        self.n_intervals = n_intervals
+        self.method = method
+        self.x_min = -np.pi
+        self.dx = 2.0 * np.pi / n_intervals
+        self.inv_dx = 1.0 / self.dx
+
+        nodes = np.linspace(-np.pi, np.pi, n_intervals + 1)
+        nodes[n_intervals // 2] = 0.0
+        values = np.array(coeff_func(nodes)[:3])  # shape (3, n_intervals+1)
+        self.cr = float(coeff_func(0.0)[3])
+
+        y0 = values[:, :-1]
+        y1 = values[:, 1:]
+        if method == 'linear':
+            self.poly = np.stack([y0, (y1 - y0) * self.inv_dx], axis=-1)
+        else:
+            # cubic through the ends and two interior points of each interval, in powers of the offset u*dx
+            u = np.array([0.0, 1.0 / 3.0, 2.0 / 3.0, 1.0])
+            x0 = nodes[:-1]
+            y_third = np.array(coeff_func(x0 + self.dx / 3.0)[:3])
+            y_two_thirds = np.array(coeff_func(x0 + 2.0 * self.dx / 3.0)[:3])
+            samples = np.stack([y0, y_third, y_two_thirds, y1], axis=-1)
+            to_poly = np.linalg.inv(np.vander(u, 4, increasing=True)) / np.power(self.dx, np.arange(4))[:, np.newaxis]
+            self.poly = np.einsum('kj,cij->cik', to_poly, samples)
+
+        # shape (n_intervals, 3, n_poly) for array lookups and nested lists for scalar lookups
+        self.poly = np.ascontiguousarray(np.transpose(self.poly, (1, 0, 2)))
+        self.poly_list = self.poly.tolist()
+
+    def __call__(self, x):
+        """
+        interpolates the coefficients at a flow angle. Scalar inputs are evaluated without numpy so a single lookup
+        stays cheap, and array inputs are evaluated element wise.
+
+        :param x: relative flow angle [rad]. Scalar or array. Angles outside of [-pi, pi] are clipped
+        :return:
+            cd (axial) - coefficient of axial flow
+            cs (side) - coefficient of lateratl flow
+            cy (moment) - coefficent for induced moment
+            cr (normal side) - coefficient for when flow is directly perpendicular
+        """
+        if isinstance(x, (float, int)):
+            return self.evaluate_scalar(x)
+        return self.evaluate_array(x)
+
+    def evaluate_scalar(self, x):
+        """
+        interpolates the coefficients at a single flow angle
+
+        :param x: relative flow angle [rad]
+        :return: cd, cs, cy, cr
+        """
+        t = (x - self.x_min) * self.inv_dx
+        if t <= 0.0:
+            i = 0
+            t = 0.0
+        elif t >= self.n_intervals:
+            i = self.n_intervals - 1
+            t = self.dx
+        else:
+            i = int(t)
+            if i == self.n_intervals:
+                i -= 1
+            t = (t - i) * self.dx
+        p_cd, p_cs, p_cy = self.poly_list[i]
+        if self.method == 'linear':
+            return p_cd[0] + t * p_cd[1], p_cs[0] + t * p_cs[1], p_cy[0] + t * p_cy[1], self.cr
+        return p_cd[0] + t * (p_cd[1] + t * (p_cd[2] + t * p_cd[3])), \
+            p_cs[0] + t * (p_cs[1] + t * (p_cs[2] + t * p_cs[3])), \
+            p_cy[0] + t * (p_cy[1] + t * (p_cy[2] + t * p_cy[3])), self.cr
+
+    def evaluate_array(self, x):
+        """
+        interpolates the coefficients at an array of flow angles
+
+        :param x: relative flow angles [rad]
+        :return: cd, cs, cy as arrays the shape of x, and cr as a float
+        """
+        x = np.clip(np.asarray(x, dtype=float), -np.pi, np.pi)
+        t = (x - self.x_min) * self.inv_dx
+        i = np.minimum(t.astype(int), self.n_intervals - 1)
+        t = (t - i) * self.dx
+        poly = self.poly[i]  # shape x.shape + (3, n_poly)
+        t = t[..., np.newaxis]
+        if self.method == 'linear':
+            y = poly[..., 0] + t * poly[..., 1]
+        else:
+            y = poly[..., 0] + t * (poly[..., 1] + t * (poly[..., 2] + t * poly[..., 3]))
+        return y[..., 0], y[..., 1], y[..., 2], self.cr
+
+    def max_error(self, n_samples=100001):
+        """
+        compares the table to the analytic forms it was built from on a dense grid of flow angles
+
+        :param n_samples: number of flow angles sampled across [-pi, pi]
+        :return: dictionary of the maximum absolute error for cd, cs, and cy
+        """
+        x = np.linspace(-np.pi, np.pi, n_samples)
+        exact = self.coeff_func(x)
+        table = self.evaluate_array(x)
+        return OrderedDict((name, float(np.max(np.abs(table[j] - exact[j]))))
+                           for j, name in enumerate(('cd', 'cs', 'cy')))
+
+
+# integration schemes supported by RiverBoat.step
+INTEGRATORS = ('euler', 'semi_implicit_euler', 'rk4', 'rk45')
+
+# thrust, forces, and moments logged for a step. These are the values at the start of the step
+LOGGED_FORCE_FIELDS = ('thrust', 'alpha', 'v_x_eff_air', 'v_y_eff_air', 'psi_eff_air', 'v_x_eff_water',
+                       'v_y_eff_water', 'psi_eff_water', 'f_d_air', 'f_s_air', 'm_air', 'f_d_water', 'f_s_water',
+                       'm_water', 'fx_p', 'fy_p', 'my_p', 'mr')
+
+# Dormand-Prince 5(4) coefficients. Rows of the stages after the first, and the difference between the fifth and
+# fourth order weights used as the error estimate. The last stage is at the fifth order solution
+DORMAND_PRINCE_A = ((1.0 / 5.0,),
+                    (3.0 / 40.0, 9.0 / 40.0),
+                    (44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0),
+                    (19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0, -212.0 / 729.0),
+                    (9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0, 49.0 / 176.0, -5103.0 / 18656.0),
+                    (35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0, -2187.0 / 6784.0, 11.0 / 84.0))
+DORMAND_PRINCE_E = (71.0 / 57600.0, 0.0, -71.0 / 16695.0, 71.0 / 1920.0, -17253.0 / 339200.0, 22.0 / 525.0,
+                    -1.0 / 40.0)
+
+# bounds of the adaptive rk45 integrator. The internal step may not shrink below this fraction of the time step, and one
+# call to step may not try more internal steps than this
+RK45_MIN_STEP_FRACTION = 1.0e-12
+RK45_MAX_ITERATIONS = 10000
+
+
+class MoverState:
+
+    def __init__(self, fields, pair_fields=None):
+        """
+        the state of a mover with a fixed set of numeric fields. The numeric fields are held in one array of doubles,
+        data, in the order of fields, so hot code can index it with constants, and resetting or saving a snapshot of the
+        state is one copy of the array.
+
+        The state also works like the state dictionary it replaces. Indexing with a field name reads or writes the
+        array. Pair fields, such as the bounds of the propeller angle, are two neighbouring fields that are read and
+        written as a tuple under one name. Any other key, such as the name of the mover, is held in an ordinary
+        dictionary.
+
+        :param fields: names of the numeric fields
+        :param pair_fields: dictionary of the name of a pair to the names of the two fields it is made of
+        """
+        self.fields = tuple(fields)
+        self.index = dict((name, i) for i, name in enumerate(self.fields))
+        self.pair_fields = OrderedDict()
+        if pair_fields is not None:
+            for name, (field_0, field_1) in pair_fields.items():
+                self.pair_fields[name] = (self.index[field_0], self.index[field_1])
+        self.data = array.array('d', bytes(8 * len(self.fields)))
+        self.objects = OrderedDict()
+
+    def __getitem__(self, key):
+        i = self.index.get(key)
+        if i is not None:
+            return self.data[i]
+        pair = self.pair_fields.get(key)
+        if pair is not None:
+            return self.data[pair[0]], self.data[pair[1]]
+        return self.objects[key]
+
+    def __setitem__(self, key, value):
+        i = self.index.get(key)
+        if i is not None:
+            self.data[i] = value
+            return
+        pair = self.pair_fields.get(key)
+        if pair is not None:
+            self.data[pair[0]] = value[0]
+            self.data[pair[1]] = value[1]
+            return
+        self.objects[key] = value
+
+    def __contains__(self, key):
+        return key in self.index or key in self.pair_fields or key in self.objects
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        """
+        gets the value of a key like dict.get
+
+        :param key: name of the field
+        :param default: value returned if the key is not in the state
+        :return: the value
+        """
+        if key in self:
+            return self[key]
+        return default
+
+    def keys(self):
+        """
+        gets the names that can be indexed. Fields that are part of a pair are only listed under the name of the pair
+
+        :return: list of names
+        """
+        in_pair = set(i for pair in self.pair_fields.values() for i in pair)
+        return [name for i, name in enumerate(self.fields) if i not in in_pair] + list(self.pair_fields) + \
+            list(self.objects)
+
+    def items(self):
+        """
+        gets the names and values of the state like dict.items
+
+        :return: list of (name, value) tuples
+        """
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        """
+        gets the values of the state like dict.values
+
+        :return: list of values
+        """
+        return [self[key] for key in self.keys()]
+
+    def update(self, other=(), **kwargs):
+        """
+        sets several values at once like dict.update
+
+        :param other: dictionary or iterable of (name, value) pairs
+        :param kwargs: more names and values
+        :return:
+        """
+        if hasattr(other, 'keys'):
+            other = [(key, other[key]) for key in other.keys()]
+        for key, value in other:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def copy(self):
+        """
+        creates an independent copy of the state with the same layout
+
+        :return: the copied state
+        """
+        state = MoverState.__new__(MoverState)
+        state.fields = self.fields
+        state.index = self.index
+        state.pair_fields = self.pair_fields
+        state.data = array.array('d', self.data)
+        state.objects = OrderedDict(self.objects)
+        return state
+
+    def to_dict(self):
+        """
+        converts the state into an ordinary dictionary
+
+        :return: ordered dictionary of every name and value
+        """
+        return OrderedDict(self.items())
+
+    def snapshot(self):
+        """
+        copies the numeric fields of the state
+
+        :return: array of the numeric fields
+        """
+        return array.array('d', self.data)
+
+    def restore(self, snapshot):
+        """
+        sets the numeric fields back to a snapshot taken with snapshot
+
+        :param snapshot: array of the numeric fields
+        :return:
+        """
+        self.data[:] = snapshot
+
+    def reset(self, template):
+        """
+        sets the state to a template state with the same fields
+
+        :param template: the MoverState to copy
+        :return:
+        """
+        self.data[:] = template.data
+        self.objects.clear()
+        self.objects.update(template.objects)
+
+
+# numeric state of a river boat. Each group mirrors a section of the boat's state
+RIVER_BOAT_FIELDS = (
+    # simulation time [s]
+    'time',
+    # position in the global reference frame [m]
+    'x_pos', 'y_pos',
+    # geometric data. angle of attack of the propeller disk [rad], propeller angle relative to the longitudinal axis
+    # of the boat [rad], hull angle to the positive x axis in the global frame [rad], mass [kg], projected air and
+    # water areas [m^2], distance to the destination [m], moment of inertia [kg m^2], angle to the destination relative
+    # to the longitudinal axis [rad], hull length and width [m], propeller disk area [m^2], effective angles of
+    # incidence of the air and water [rad], and the angle between the boat and the destination [rad]
+    'alpha', 'delta', 'psi', 'mass', 'area_air', 'area_water', 'dest_dist', 'moi', 'mu', 'hull_length', 'hull_width',
+    'prop_area', 'psi_eff_air', 'psi_eff_water', 'theta',
+    # velocities. local and global [m/s], rotational [rad/s], and the effective air and water velocities [m/s]
+    'v_xp', 'v_yp', 'v_x', 'v_y', 'psi_dot', 'v_x_eff_air', 'v_y_eff_air', 'v_x_eff_water', 'v_y_eff_water',
+    # accelerations. local and global [m/s^2], and rotational [rad/s^2]
+    'acc_xp', 'acc_yp', 'acc_x', 'acc_y', 'psi_double_dot',
+    # propeller. power [watt], thrust [N], induced velocity used to warm start the thrust solver [m/s], and figure of
+    # merit
+    'power', 'thrust', 'v_induced', 'fom',
+    # simulation data. time step [s], wind and current velocity [m/s]
+    'delta_t', 'v_wind_x', 'v_wind_y', 'v_current_x', 'v_current_y',
+    # forces [N] and moments [N-m] from the air, water, propeller, and the hull rotating in the water
+    'f_d_air', 'f_s_air', 'f_s_water', 'f_d_water', 'fx_p', 'fy_p', 'm_air', 'm_water', 'mr', 'my_p',
+    # fuel and propulsion limits. brake specific fuel consumption [kg/w-s], propeller angle bounds [rad], densities
+    # [kg/m^3], fuel and fuel capacity [kg], and maximum power [watt]
+    'bsfc', 'delta_max_min', 'delta_max_max', 'density_air', 'density_water', 'fuel', 'fuel_capacity', 'power_max')
+
+# river boat state entries that hold a pair of values
+RIVER_BOAT_PAIR_FIELDS = OrderedDict([('delta_max', ('delta_max_min', 'delta_max_max')),
+                                      ('v_wind', ('v_wind_x', 'v_wind_y')),
+                                      ('v_current', ('v_current_x', 'v_current_y'))])
+
+# fields logged in the history of a river boat, in the order of the history columns
+RIVER_BOAT_TELEMETRY_FIELDS = ('x_pos', 'y_pos', 'alpha', 'delta', 'psi', 'mass', 'area_air', 'area_water',
+                               'dest_dist', 'moi', 'mu', 'hull_length', 'hull_width', 'prop_area', 'psi_eff_air',
+                               'psi_eff_water', 'theta', 'v_xp', 'v_yp', 'v_x', 'v_y', 'psi_dot', 'v_x_eff_air',
+                               'v_y_eff_air', 'v_x_eff_water', 'v_y_eff_water', 'acc_xp', 'acc_yp', 'acc_x', 'acc_y',
+                               'psi_double_dot', 'power', 'thrust', 'fom', 'delta_t', 'v_wind_x', 'v_wind_y',
+                               'v_current_x', 'v_current_y', 'f_d_air', 'f_s_air', 'f_s_water', 'f_d_water', 'fx_p',
+                               'fy_p', 'm_air', 'm_water', 'mr', 'my_p', 'time', 'bsfc', 'delta_max_min',
+                               'delta_max_max', 'density_air', 'density_water', 'fuel', 'fuel_capacity', 'power_max')
+RIVER_BOAT_TELEMETRY_INDEX = tuple(RIVER_BOAT_FIELDS.index(name) for name in RIVER_BOAT_TELEMETRY_FIELDS)
+TELEMETRY_INDEX_ARRAY = np.asarray(RIVER_BOAT_TELEMETRY_INDEX, dtype=np.intp)
+N_TELEMETRY = len(RIVER_BOAT_TELEMETRY_FIELDS)
+
+# index of the river boat fields used by the physics
+RB_TIME = RIVER_BOAT_FIELDS.index('time')
+RB_X_POS = RIVER_BOAT_FIELDS.index('x_pos')
+RB_Y_POS = RIVER_BOAT_FIELDS.index('y_pos')
+RB_ALPHA = RIVER_BOAT_FIELDS.index('alpha')
+RB_DELTA = RIVER_BOAT_FIELDS.index('delta')
+RB_PSI = RIVER_BOAT_FIELDS.index('psi')
+RB_MASS = RIVER_BOAT_FIELDS.index('mass')
+RB_AREA_AIR = RIVER_BOAT_FIELDS.index('area_air')
+RB_AREA_WATER = RIVER_BOAT_FIELDS.index('area_water')
+RB_DEST_DIST = RIVER_BOAT_FIELDS.index('dest_dist')
+RB_MOI = RIVER_BOAT_FIELDS.index('moi')
+RB_MU = RIVER_BOAT_FIELDS.index('mu')
+RB_HULL_LENGTH = RIVER_BOAT_FIELDS.index('hull_length')
+RB_PROP_AREA = RIVER_BOAT_FIELDS.index('prop_area')
+RB_PSI_EFF_AIR = RIVER_BOAT_FIELDS.index('psi_eff_air')
+RB_PSI_EFF_WATER = RIVER_BOAT_FIELDS.index('psi_eff_water')
+RB_THETA = RIVER_BOAT_FIELDS.index('theta')
+RB_V_XP = RIVER_BOAT_FIELDS.index('v_xp')
+RB_V_YP = RIVER_BOAT_FIELDS.index('v_yp')
+RB_V_X = RIVER_BOAT_FIELDS.index('v_x')
+RB_V_Y = RIVER_BOAT_FIELDS.index('v_y')
+RB_PSI_DOT = RIVER_BOAT_FIELDS.index('psi_dot')
+RB_V_X_EFF_AIR = RIVER_BOAT_FIELDS.index('v_x_eff_air')
+RB_V_Y_EFF_AIR = RIVER_BOAT_FIELDS.index('v_y_eff_air')
+RB_V_X_EFF_WATER = RIVER_BOAT_FIELDS.index('v_x_eff_water')
+RB_V_Y_EFF_WATER = RIVER_BOAT_FIELDS.index('v_y_eff_water')
+RB_ACC_XP = RIVER_BOAT_FIELDS.index('acc_xp')
+RB_ACC_YP = RIVER_BOAT_FIELDS.index('acc_yp')
+RB_ACC_X = RIVER_BOAT_FIELDS.index('acc_x')
+RB_ACC_Y = RIVER_BOAT_FIELDS.index('acc_y')
+RB_PSI_DOUBLE_DOT = RIVER_BOAT_FIELDS.index('psi_double_dot')
+RB_POWER = RIVER_BOAT_FIELDS.index('power')
+RB_THRUST = RIVER_BOAT_FIELDS.index('thrust')
+RB_V_INDUCED = RIVER_BOAT_FIELDS.index('v_induced')
+RB_DELTA_T = RIVER_BOAT_FIELDS.index('delta_t')
+RB_V_WIND_X = RIVER_BOAT_FIELDS.index('v_wind_x')
+RB_V_WIND_Y = RIVER_BOAT_FIELDS.index('v_wind_y')
+RB_V_CURRENT_X = RIVER_BOAT_FIELDS.index('v_current_x')
+RB_V_CURRENT_Y = RIVER_BOAT_FIELDS.index('v_current_y')
+RB_F_D_AIR = RIVER_BOAT_FIELDS.index('f_d_air')
+RB_F_S_AIR = RIVER_BOAT_FIELDS.index('f_s_air')
+RB_F_S_WATER = RIVER_BOAT_FIELDS.index('f_s_water')
+RB_F_D_WATER = RIVER_BOAT_FIELDS.index('f_d_water')
+RB_FX_P = RIVER_BOAT_FIELDS.index('fx_p')
+RB_FY_P = RIVER_BOAT_FIELDS.index('fy_p')
+RB_M_AIR = RIVER_BOAT_FIELDS.index('m_air')
+RB_M_WATER = RIVER_BOAT_FIELDS.index('m_water')
+RB_MR = RIVER_BOAT_FIELDS.index('mr')
+RB_MY_P = RIVER_BOAT_FIELDS.index('my_p')
+RB_BSFC = RIVER_BOAT_FIELDS.index('bsfc')
+RB_DELTA_MAX_MIN = RIVER_BOAT_FIELDS.index('delta_max_min')
+RB_DELTA_MAX_MAX = RIVER_BOAT_FIELDS.index('delta_max_max')
+RB_DENSITY_AIR = RIVER_BOAT_FIELDS.index('density_air')
+RB_DENSITY_WATER = RIVER_BOAT_FIELDS.index('density_water')
+RB_FUEL = RIVER_BOAT_FIELDS.index('fuel')
+RB_POWER_MAX = RIVER_BOAT_FIELDS.index('power_max')
+
+# numeric state of a circle obstacle
+STATIC_CIRCLE_FIELDS = ('x_pos', 'y_pos', 'x_pos_norm', 'y_pos_norm', 'radius')
+
 
 class Mover(ABC):
 
-    def __init__(self,name):
+    def __init__(self, name, fields=(), pair_fields=None):
+        """
+        base class for everything that moves or sits in the simulation
 
-        self.state_dict = OrderedDict()
+        :param name: string name of the mover
+        :param fields: names of the numeric fields of the mover's state
+        :param pair_fields: dictionary of the names of state entries that hold a pair of fields
+        """
+        self.state_dict = MoverState(fields, pair_fields)
         self.state_dict['name'] = name
         self.sensors = []
-        self.history = pd.DataFrame()
+        self.history = None  # Telemetry.TelemetryBuffer of the state at every step
         self.can_learn = False
+        self.is_static = False  # true for movers that only move when the environment is reset
         self.observation_keys = []
         self.observation_df = pd.DataFrame
 
@@ -67,6 +703,14 @@ class Mover(ABC):
                 return True
         return False
 
+    def reset_sensors(self, mover_dict):
+        """
+        lets each sensor prepare for a new episode after the movers have been placed
+        :return:
+        """
+        for sensor in self.sensors:
+            sensor.reset(mover_dict)
+
     def update_sensors(self, mover_dict):
         """
         loops over each sensor in the mover and updates the measurements for each sensor.
@@ -105,7 +749,7 @@ class Mover(ABC):
         :param step_num:
         :return:
         """
-        self.history.drop(range(step_num, len(self.history)), inplace=True)
+        self.history.trim(step_num)
 
 
 class StaticCircleObstacle(Mover,ABC):
@@ -118,13 +762,15 @@ class StaticCircleObstacle(Mover,ABC):
         :param radius: the radius of the circular obstacle in meters
         """
         # instantiate mover
-        super().__init__(name)
+        super().__init__(name, STATIC_CIRCLE_FIELDS)
 
         self.state_dict['x_pos'] = 0.0  # sets the x position of the circle
         self.state_dict['y_pos'] = 0.0  # sets the y position of the circle
         self.state_dict['x_pos_norm'] = 0.0  # initial normalized arbitrary value for the x position of the circle
         self.state_dict['y_pos_norm'] = 0.0  # initial normalized arbitrary value for the y position of the circle
-        self.state_dict['radius'] = radius  # radius in meters of the obstacle
+        if radius is not None:
+            self.state_dict['radius'] = radius  # radius in meters of the obstacle
+        self.is_static = True
         #self.set_domain(domain)
 
     def step(self, time):
@@ -136,19 +782,18 @@ class StaticCircleObstacle(Mover,ABC):
         return 0
 
     def add_step_history(self, step_num):
-        self.history.iloc[step_num] = [self.state_dict['x_pos'], self.state_dict['y_pos']]
+        self.history.write(step_num, (self.state_dict['x_pos'], self.state_dict['y_pos']))
 
     def reset_history(self, num_steps):
         """
-        sets all of the history to zero
+        empties the history for a new episode
         :param num_steps:
         :return:
         """
-        empty_data = np.zeros((num_steps, 2))
-        self.history = pd.DataFrame(data=empty_data, columns=[self.state_dict['name']+'_x',self.state_dict['name']+'_y'])
-
-    def trim_history(self, step_num):
-        self.history.drop(range(step_num, len(self.history)), inplace=True)
+        columns = [self.state_dict['name']+'_x',self.state_dict['name']+'_y']
+        if self.history is None or self.history.columns != columns:
+            self.history = Telemetry.TelemetryBuffer(columns)
+        self.history.reset(num_steps)
 
     def get_history(self):
         pass
@@ -184,11 +829,11 @@ class RiverBoat(Mover,ABC):
     def __init__(self, name, area_air, area_water, bsfc, delta, delta_max, delta_t, density_air, density_water, fom,
                  fuel, fuel_capacity, hull_len, hull_width, mass, moi, power, power_max, psi, prop_diam):
         # instantiate mover
-        super().__init__(name)
+        super().__init__(name, RIVER_BOAT_FIELDS, RIVER_BOAT_PAIR_FIELDS)
 
-        # save the passed in parameters that are wiped in initialize in state dict method. This allows the boat to be
-        # easily reset for each simulation
-        self.init_state_dict = OrderedDict()
+        # save the passed in parameters as the template the state is reset to for each simulation. Every other field
+        # of the template is zero
+        self.init_state_dict = MoverState(RIVER_BOAT_FIELDS, RIVER_BOAT_PAIR_FIELDS)
         self.init_state_dict['time'] = 0.0
         self.init_state_dict['name'] = name
         self.init_state_dict['alpha'] = 0.0
@@ -215,9 +860,30 @@ class RiverBoat(Mover,ABC):
         # initialize the boat
         self.initalize_in_state_dict()
 
+        # interpolated coefficient tables. The analytic coefficients are used when these are None
+        self.aero_table = None
+        self.hydro_table = None
+
+        # precomputed induced velocity surface. When strict, calc_thrust always uses the exact solver
+        self.thrust_surface = None
+        self.thrust_surface_settings = None
+        self.strict_thrust = False
+
+        # integration scheme used by step
+        self.integrator = 'euler'
+        self.integrator_substeps = 1
+        self.rk45_rtol = 1.0e-6
+        self.rk45_atol = 1.0e-8
+        self.integrator_stats = None
+        self.reset_integrator_stats()
+
+        # iteration counts of the induced velocity solver used in calc_thrust
+        self.thrust_solver_stats = None
+        self.reset_thrust_solver_stats()
+
         # telemetry
         # self.telemetry = pd.DataFrame(self.state_dict.values(),columns=self.state_dict.keys())
-        self.telemetry = pd.DataFrame([self.state_dict])
+        self.telemetry = pd.DataFrame([self.state_dict.to_dict()])
         # get the history header
         self.history_header = list(self.get_telemetry().keys())
 
@@ -226,218 +892,34 @@ class RiverBoat(Mover,ABC):
         gets the selected state variables for logging
         :return:
         """
-        return {'name': 'river_boat_0', 'x_pos': self.state_dict['x_pos'],
-                               'y_pos': self.state_dict['y_pos'], 'alpha': self.state_dict['alpha'],
-                               'delta': self.state_dict['delta'], 'psi': self.state_dict['psi'],
-                               'mass': self.state_dict['mass'], 'area_air': self.state_dict['area_air'],
-                               'area_water': self.state_dict['area_water'], 'dest_dist': self.state_dict['dest_dist'],
-                               'moi': self.state_dict['moi'], 'mu': self.state_dict['mu'],
-                               'hull_length': self.state_dict['hull_length'],
-                               'hull_width': self.state_dict['hull_width'], 'prop_area': self.state_dict['prop_area'],
-                               'psi_eff_air': self.state_dict['psi_eff_air'],
-                               'psi_eff_water': self.state_dict['psi_eff_water'], 'theta': self.state_dict['theta'],
-                               'v_xp': self.state_dict['v_xp'], 'v_yp': self.state_dict['v_yp'],
-                               'v_x': self.state_dict['v_x'], 'v_y': self.state_dict['v_y'],
-                               'psi_dot': self.state_dict['psi_dot'], 'v_x_eff_air': self.state_dict['v_x_eff_air'],
-                               'v_y_eff_air': self.state_dict['v_y_eff_air'],
-                               'v_x_eff_water': self.state_dict['v_x_eff_water'],
-                               'v_y_eff_water': self.state_dict['v_y_eff_water'],
-                               'acc_xp': self.state_dict['acc_xp'], 'acc_yp': self.state_dict['acc_yp'],
-                               'acc_x': self.state_dict['acc_x'], 'acc_y': self.state_dict['acc_y'],
-                               'psi_double_dot': self.state_dict['psi_double_dot'], 'power': self.state_dict['power'],
-                               'thrust': self.state_dict['thrust'], 'fom': self.state_dict['fom'],
-                               'delta_t': self.state_dict['delta_t'],
-                               'v_wind_x': self.state_dict['v_wind'][0], 'v_wind_y': self.state_dict['v_wind'][1],
-                               'v_current_x': self.state_dict['v_current'][0],
-                               'v_current_y': self.state_dict['v_current'][1],
-                               'f_d_air': self.state_dict['f_d_air'], 'f_s_air': self.state_dict['f_s_air'],
-                               'f_s_water': self.state_dict['f_s_water'], 'f_d_water': self.state_dict['f_d_water'],
-                               'fx_p': self.state_dict['fx_p'], 'fy_p': self.state_dict['fy_p'],
-                               'm_air': self.state_dict['m_air'], 'm_water': self.state_dict['m_water'],
-                               'mr': self.state_dict['mr'], 'my_p': self.state_dict['my_p'],
-                               'time': self.state_dict['time'], 'bsfc': self.state_dict['bsfc'],
-                               'delta_max_min':self.state_dict['delta_max'][0],
-                               'delta_max_max':self.state_dict['delta_max'][1],
-                               'density_air': self.state_dict['density_air'],
-                               'density_water': self.state_dict['density_water'], 'fuel':self.state_dict['fuel'],
-                               'fuel_capacity': self.state_dict['fuel_capacity'],
-                               'power_max': self.state_dict['power_max']}
+        data = self.state_dict.data
+        telemetry = {'name': 'river_boat_0'}
+        telemetry.update(zip(RIVER_BOAT_TELEMETRY_FIELDS, [data[i] for i in RIVER_BOAT_TELEMETRY_INDEX]))
+        return telemetry
 
     def initalize_in_state_dict(self):
         """
-        Initialize the state of the boat to a default state
+        Initialize the state of the boat to its initial state. The state is copied from the template of the initial
+        state in one step. The template holds the parameters the boat was built with and any modifications from the
+        input file, and every other field is zero.
         :return:
         """
-        # --------------------------------------------------------------------------------------------------------------
-        # position data
-        # --------------------------------------------------------------------------------------------------------------
-        # x position in the global reference frame
-        self.state_dict['x_pos'] = 0.0
-        # y position in the global reference frame
-        self.state_dict['y_pos'] = 0.0
-
-        # --------------------------------------------------------------------------------------------------------------
-        # geometric data
-        # --------------------------------------------------------------------------------------------------------------
-        # relative angle of attack of the propeller disk [deg]
-        self.state_dict['alpha'] = 0.0
-        # angle [rad] of the propeller relative to the longitudinal axis of the boat
-        self.state_dict['delta'] = 0.0
-        # angle of the boat hull in the global reference frame where positive x is where the angle is measured too
-        self.state_dict['psi'] = 0.0
-        # the total mass of the boat [kg]
-        self.state_dict['mass'] = 0.0
-        # air projected area [m^2]
-        self.state_dict['area_air'] = 0.0
-        # water projected area [m^2]
-        self.state_dict['area_water'] = 0.0
-        # distance to the destination [m]
-        self.state_dict['dest_dist'] = 0.0
-        # moment of interia of the boat []
-        self.state_dict['moi'] = 0.0
-        # angle to the destiation relative to the boats longitudnal axis [rad]
-        self.state_dict['mu'] = 0.0
-        # lenght of the hull of the boat
-        self.state_dict['hull_length'] = 0.0
-        # the widest width of the hull of the boat
-        self.state_dict['hull_width'] = 0.0
-        # the disk area of the propeller excluding the aread of the spinner
-        self.state_dict['prop_area'] = 0.0
-        # effective angle of incidence of the air
-        self.state_dict['psi_eff_air'] = 0.0
-        # effective angle of incidence of the water
-        self.state_dict['psi_eff_water'] = 0.0
-        # angle between the boat and the destination [rad]
-        self.state_dict['theta'] = 0.0
-
-        # --------------------------------------------------------------------------------------------------------------
-        # velocity data
-        # --------------------------------------------------------------------------------------------------------------
-        # x (longitudinal/surge) velocity [m/s] in the boats local frame
-        self.state_dict['v_xp'] = 0.0
-        # y (lateral/sway) velocity [m/s] in the boats local frame
-        self.state_dict['v_yp'] = 0.0
-        # x velocity [m/s] in the global frame
-        self.state_dict['v_x'] = 0.0
-        # y velocity [m/s] in the global frame
-        self.state_dict['v_y'] = 0.0
-        # rotational velocity
-        self.state_dict['psi_dot'] = 0.0
-        # effective longitudinal velocity of the air
-        self.state_dict['v_x_eff_air'] = 0.0
-        # effective lateral velocity of the air
-        self.state_dict['v_y_eff_air'] = 0.0
-        # effective longitudinal velocity of the water
-        self.state_dict['v_x_eff_water'] = 0.0
-        # effective lateral velocity of the water
-        self.state_dict['v_y_eff_water'] = 0.0
+        self.state_dict.reset(self.init_state_dict)
 
-        # --------------------------------------------------------------------------------------------------------------
-        # acceleration data
-        # --------------------------------------------------------------------------------------------------------------
-        # x (longitudinal/surge) acceleration [m/s^2] in the boats local frame
-        self.state_dict['acc_xp'] = 0.0
-        # y (lateral/sway) acceleration [m/s^2] in the boats local frame
-        self.state_dict['acc_yp'] = 0.0
-        # x acceleration [m/s^2] in the global reference frame
-        self.state_dict['acc_x'] = 0.0
-        # y acceleration [m/s^2] in the global reference frane
-        self.state_dict['acc_y'] = 0.0
-        # rotational acceleration
-        self.state_dict['psi_double_dot'] = 0.0
+        # the adaptive integrator starts each episode from a full step
+        self.rk45_h = None
 
-        # --------------------------------------------------------------------------------------------------------------
-        # other data
-        # --------------------------------------------------------------------------------------------------------------
-        # the power [watt] that is deliverd to the propeller
-        self.state_dict['power'] = 0.0
-        # the thrust [N] that is produce by the propeller at a given power level
-        self.state_dict['thrust'] = 0.0
-        # the figure of merit for the propeller
-        self.state_dict['fom'] = 0.0
-
-        # --------------------------------------------------------------------------------------------------------------
-        # simulation data
-        # --------------------------------------------------------------------------------------------------------------
-        # time step of the simulation [s]
-        self.state_dict['delta_t'] = 0.0
-        # the name of this boat
-        self.state_dict['name'] = ''
-        # wind velocity [m/s]
-        self.state_dict['v_wind'] = np.array([0.0, 0.0])
-        # current velocity [m/s]
-        self.state_dict['v_current'] = np.array([0.0, 0.0])
-
-        # --------------------------------------------------------------------------------------------------------------
-        # forces and moments
-        # --------------------------------------------------------------------------------------------------------------
-        # axial air force
-        self.state_dict['f_d_air'] = 0.0
-        # lateral air force
-        self.state_dict['f_s_air'] = 0.0
-        # lateral water force
-        self.state_dict['f_s_water'] = 0.0
-        # axial water force
-        self.state_dict['f_d_water'] = 0.0
-        # longitudinal force of propeller in boats reference frame
-        self.state_dict['fx_p'] = 0.0
-        # lateral force of propeller in boats reference frame
-        self.state_dict['fy_p'] = 0.0
-        # moment induced by the air
-        self.state_dict['m_air'] = 0.0
-        # moment indueced by the water
-        self.state_dict['m_water'] = 0.0
-        # moment at 90 [deg] (pure moment?) need to describe this better
-        self.state_dict['mr'] = 0.0
-        # moment induce by the propeller
-        self.state_dict['my_p'] = 0.0
+    def set_parameter(self, name, value):
+        """
+        sets a parameter of the boat in both its current state and the template it is reset to, so the change is kept
+        across simulations
 
-        # --------------------------------------------------------------------------------------------------------------
-        # set the values of the boat
-        # time of the simulation
-        self.state_dict['time'] = self.init_state_dict['time']
-        # name of the boat
-        self.state_dict['name'] = self.init_state_dict['name']
-        # angle of attack of the propeller disk [rad]
-        self.state_dict['alpha'] = self.init_state_dict['alpha']
-        # cross sectional area of the part of the boat in the air [m^2]
-        self.state_dict['area_air'] = self.init_state_dict['area_air']
-        # cross sectional area of the part of the boat in the water [m^2]
-        self.state_dict['area_water'] = self.init_state_dict['area_water']
-        # sets the brake specific fuel consumption [kg/w-s]
-        self.state_dict['bsfc'] = self.init_state_dict['bsfc']
-        # propeller angle [rad]
-        self.state_dict['delta'] = self.init_state_dict['delta']
-        # set bounds for the propeller angle
-        self.state_dict['delta_max'] = self.init_state_dict['delta_max']
-        # time step of the simulation
-        self.state_dict['delta_t'] = self.init_state_dict['delta_t']
-        # air density [kg/m^3]
-        self.state_dict['density_air'] = self.init_state_dict['density_air']
-        # water density [kg/m^3]
-        self.state_dict['density_water'] = self.init_state_dict['density_water']
-        # figure of merit of the propeller
-        self.state_dict['fom'] = self.init_state_dict['fom']
-        # sets the current level of fuel on the boat [kg]
-        self.state_dict['fuel'] = self.init_state_dict['fuel']
-        # sets the maximum amount of fuel the boat can have [kg]
-        self.state_dict['fuel_capacity'] = self.init_state_dict['fuel_capacity']
-        # the length of the hull [m]
-        self.state_dict['hull_length'] = self.init_state_dict['hull_length']
-        # the length of the hull [m]
-        self.state_dict['hull_width'] = self.init_state_dict['hull_width']
-        # the total mass of the boat
-        self.state_dict['mass'] = self.init_state_dict['mass']
-        # set the moment of inertia of the boat [kg m^2]
-        self.state_dict['moi'] = self.init_state_dict['moi']
-        # current power level of the propeller [watt]
-        self.state_dict['power'] = self.init_state_dict['power']
-        # maximum power level of the propeller [watt]
-        self.state_dict['power_max'] = self.init_state_dict['power_max']
-        # angle of the hull to the positive x axis in the global frame [rad]
-        self.state_dict['psi'] = self.init_state_dict['psi']
-        # sets the disk area of the propeller counting the area of the spinner in the disk area [m]
-        self.state_dict['prop_area'] = self.init_state_dict['prop_area']
+        :param name: name of the state entry
+        :param value: the new value
+        :return:
+        """
+        self.state_dict[name] = value
+        self.init_state_dict[name] = value
 
     def set_control(self, power, propeller_angle):
         """
@@ -447,79 +929,83 @@ class RiverBoat(Mover,ABC):
         :param propeller_angle: the angle of the propeller relative to the longitudinal axis of the boat [rad]
         :return: void
         """
+        data = self.state_dict.data
 
         # check for bounds
-        if power > self.state_dict['power_max']:
-            self.state_dict['power'] = self.state_dict['power_max']
+        if power > data[RB_POWER_MAX]:
+            data[RB_POWER] = data[RB_POWER_MAX]
         elif power < 0.0:
-            self.state_dict['power'] = 0.0
+            data[RB_POWER] = 0.0
         else:
-            self.state_dict['power'] = power
+            data[RB_POWER] = power
 
         # check for bounds of the propeller angle
-        if propeller_angle < self.state_dict['delta_max'][0]:
-            self.state_dict['delta'] = self.state_dict['delta_max'][0]
-        elif propeller_angle > self.state_dict['delta_max'][1]:
-            self.state_dict['delta'] = self.state_dict['delta_max'][1]
+        if propeller_angle < data[RB_DELTA_MAX_MIN]:
+            data[RB_DELTA] = data[RB_DELTA_MAX_MIN]
+        elif propeller_angle > data[RB_DELTA_MAX_MAX]:
+            data[RB_DELTA] = data[RB_DELTA_MAX_MAX]
         else:
-            self.state_dict['delta'] = propeller_angle
+            data[RB_DELTA] = propeller_angle
 
     def get_aero_coeffs(self, x):
         """
-        get the aerodynamic coefficients that act on the boat from the wind and the relative wind induced by motion
+        get the aerodynamic coefficients that act on the boat from the wind and the relative wind induced by motion. The
+        coefficient table is interpolated if one is in use, otherwise the analytic forms are evaluated.
 
-        :param x: relative flow angle [deg]
+        :param x: relative flow angle [rad]. Scalar or array
         :return:
             axial - coefficient of axial flow
             side - coefficient of lateratl flow
             moment - coefficent for induced moment
             normal side - coefficient for when flow is directly perpendicular
         """
-
-        # drag coefficient
-        cd = 0.195738 + 0.518615 * np.abs(x) - 0.496029 * x * x + 0.0941925 * np.abs(x) ** 3 + \
-             1.86427 * np.sin(2.0 * np.pi * np.power(np.abs(x) / np.pi, 1.05)) * np.exp(
-            -2.17281 * np.power(np.abs(x) - np.pi / 2.0, 2.0))
-
-        # side force coefficient
-        cs = np.sign(x) * (12.3722 - 15.453 * np.abs(x) + 6.0261 * np.abs(x * x) - 0.532325 * np.abs(x) ** 3) * \
-             np.sin(np.abs(x)) * np.exp(-1.68668 * np.power(np.abs(x) - np.pi / 2.0, 2.0))  # - np.sign(x)*0.1
-
-        # yaw coefficient
-        cy = np.sign(x) * (0.710204 - 0.297196 * np.abs(x) + 0.0857296 * np.abs(x * x)) * np.sin(
-            np.pi * 2.0 * np.power(np.abs(x) / np.pi, 1.05))
-
-        # perpendicular side force coefficient
-        cr = 0.904313
-
-        return cd, cs, cy, cr
+        if self.aero_table is not None:
+            return self.aero_table(x)
+        if isinstance(x, float):
+            return scalar_aero_coeffs(x)
+        return aero_coeffs(x)
 
     def get_hydro_coeffs(self, x):
         """
-        get the hydrodynamic coefficients that act on the boat from the water and the relative current induced by motion
+        get the hydrodynamic coefficients that act on the boat from the water and the relative current induced by
+        motion. The coefficient table is interpolated if one is in use, otherwise the analytic forms are evaluated.
 
-        :param x: relative flow angle [deg]
+        :param x: relative flow angle [rad]. Scalar or array
         :return:
             cd (axial) - coefficient of axial flow
             cs (side) - coefficient of lateratl flow
             cy (moment) - coefficent for induced moment
             cr (normal side) - coefficient for when flow is directly perpendicular
         """
+        if self.hydro_table is not None:
+            return self.hydro_table(x)
+        if isinstance(x, float):
+            return scalar_hydro_coeffs(x)
+        return hydro_coeffs(x)
 
-        # drag coefficient
-        cd = 0.245219 - 0.93044 * np.abs(x) + 0.745752 * np.abs(x * x) - 0.15915 * np.power(np.abs(x), 3.0) + \
-             2.79188 * np.sin(2.0 * np.abs(x)) * np.exp(-1.05667 * np.power(np.abs(x) - np.pi / 2.0, 2.0))
-
-        # side force coefficient
-        cs = np.sign(x) * (0.115554 + 3.09423 * np.abs(x) - 0.984923 * x * x) * np.sin(np.abs(x))
+    def use_coefficient_tables(self, n_intervals=720, method='cubic'):
+        """
+        switches the aerodynamic and hydrodynamic coefficients to interpolated tables. Passing None for n_intervals
+        switches back to the analytic forms.
 
-        # yaw coefficient
-        cy = np.sign(x) * (0.322986 + 0.317964 * np.abs(x) - 0.1021844 * x * x) * np.sin(2.0 * np.abs(x))
+        :param n_intervals: number of intervals across [-pi, pi] for each table. Must be even
+        :param method: interpolation method. Either linear or cubic
+        :return: dictionary of the maximum absolute error of each table against its analytic form. Empty if the
+            analytic forms are used
+        """
+        if n_intervals is None:
+            self.aero_table = None
+            self.hydro_table = None
+            return OrderedDict()
 
-        # perpendicular side force coefficient
-        cr = 2.545759
+        self.aero_table = CoefficientTable(aero_coeffs, n_intervals, method)
+        self.hydro_table = CoefficientTable(hydro_coeffs, n_intervals, method)
 
-        return cd, cs, cy, cr
+        errors = OrderedDict()
+        for prefix, table in (('aero', self.aero_table), ('hydro', self.hydro_table)):
+            for coeff_name, error in table.max_error().items():
+                errors[prefix + '_' + coeff_name] = error
+        return errors
 
     def get_moment_hull(self, cr, vy):
         """
@@ -529,117 +1015,343 @@ class RiverBoat(Mover,ABC):
         :param vy: effective transverse velocity
         :return:
         """
-
-        l = self.state_dict['hull_length']
-        omega = self.state_dict['psi_dot']
+        data = self.state_dict.data
+        l = data[RB_HULL_LENGTH]
+        omega = data[RB_PSI_DOT]
         # if np.abs(omega) < 1e-3:
         #    omega = 0.0
-        alpha = cr * self.state_dict['area_water'] * self.state_dict['density_water'] / (l / 2.0)
+        alpha = cr * data[RB_AREA_WATER] * data[RB_DENSITY_WATER] / (l / 2.0)
 
         # forward porition
         mrf = l * l * alpha / 192.0 * (3 * l * l * omega * omega + 16.0 * l * omega * vy + 24.0 * vy * vy)
 
-        if np.abs(vy) >= np.abs(omega * l / 2.0):
+        if abs(vy) >= abs(omega * l / 2.0):
             mrb = -l * l * alpha / 192.0 * (3.0 * l * l * omega * omega - 16.0 * l * omega * vy + 24.0 * vy * vy)
         else:
-            mrb = alpha / (192.0 * omega * omega) * (
-                        np.power(l * omega - 2.0 * vy, 3.0) * (3.0 * l * omega + 2 * vy) - 16.0 * np.power(vy, 4.0))
+            # products instead of math.pow so an unstable step overflows to inf rather than raising
+            d = l * omega - 2.0 * vy
+            mrb = alpha / (192.0 * omega * omega) * (d * d * d * (3.0 * l * omega + 2 * vy) - 16.0 * vy * vy * vy * vy)
 
         mr = mrf + mrb
 
         # adjust the direction of the moment based on the rate of rotation
-        if self.state_dict['psi_dot'] < 0:
-            mr = np.abs(mr)
+        if omega < 0:
+            mr = abs(mr)
         else:
-            mr = -np.abs(mr)
+            mr = -abs(mr)
 
         return mr
 
     def step(self, time):
         """
-        steps the boat forward in time using an Euler integration scheme. The control (power and propeller angle)
-        should be set ahead of calling this function. The forces, and moments of the boat are calculated and these
+        steps the boat forward in time by delta_t using the selected integrator. The step is split into substeps of
+        equal length if sub stepping is used. The control (power and propeller angle) should be set ahead of calling
+        this function and is held constant over the step. The forces, and moments of the boat are calculated and these
         are used to update the state of the boat
 
         :param time: the time [s] of the simulation. Only used for data logging
         :return:
         """
+        dt = self.state_dict['delta_t'] / self.integrator_substeps
+        for _ in range(self.integrator_substeps):
+            if self.integrator == 'euler':
+                self.euler_step(dt)
+            elif self.integrator == 'semi_implicit_euler':
+                self.semi_implicit_euler_step(dt)
+            elif self.integrator == 'rk4':
+                self.rk4_step(dt)
+            else:
+                self.rk45_step(dt)
+
+        self.state_dict['time'] = time
+
+        # log telemetry
+        #tmp_df = pd.DataFrame([self.state_dict])
+        #self.telemetry = pd.concat([self.telemetry, tmp_df], ignore_index=True)
+
+    def euler_step(self, dt):
+        """
+        steps the boat forward in time using an Euler integration scheme. Positions and heading include the second
+        order acceleration term of a constant acceleration over the step.
+
+        :param dt: time step [s]
+        :return:
+        """
+        data = self.state_dict.data
+
         # correct power if there is no fuel
-        # correct power if there is no fuel
-        if self.state_dict['fuel'] <= 0.0:
-            self.state_dict['power'] = 0.0
-            self.state_dict['thrust'] = 0.0
+        if data[RB_FUEL] <= 0.0:
+            data[RB_POWER] = 0.0
+            data[RB_THRUST] = 0.0
         else:
             # get the thrust the propeller is currently outputing
-            self.state_dict['thrust'] = self.calc_thrust([self.state_dict['v_xp'], self.state_dict['v_yp']],
-                                                         self.state_dict['psi_dot'])
+            data[RB_THRUST] = self.calc_thrust([data[RB_V_XP], data[RB_V_YP]], data[RB_PSI_DOT])
         # update v_x and v_y. Needed for first step. Look to place this somewhere else
-        self.state_dict['v_x'] = self.state_dict['v_xp'] * np.cos(-self.state_dict['psi']) + self.state_dict[
-            'v_yp'] * np.sin(-self.state_dict['psi'])
-        self.state_dict['v_y'] = -self.state_dict['v_xp'] * np.sin(-self.state_dict['psi']) + self.state_dict[
-            'v_yp'] * np.cos(-self.state_dict['psi'])
+        cos_psi = math.cos(-data[RB_PSI])
+        sin_psi = math.sin(-data[RB_PSI])
+        data[RB_V_X] = data[RB_V_XP] * cos_psi + data[RB_V_YP] * sin_psi
+        data[RB_V_Y] = -data[RB_V_XP] * sin_psi + data[RB_V_YP] * cos_psi
 
         # get the forces and moments of the boat. save them for telemetry later
-        self.calc_forces_and_moments(self.state_dict['thrust'])
+        self.calc_forces_and_moments(data[RB_THRUST])
 
-        fx_p = self.state_dict['f_d_air'] + self.state_dict['f_d_water'] + self.state_dict['fx_p']
-        delta_xp = self.state_dict['v_xp'] * self.state_dict['delta_t'] + 0.5 * fx_p / self.state_dict['mass'] * \
-                   self.state_dict['delta_t'] * self.state_dict['delta_t']
+        mass = data[RB_MASS]
+        fx_p = data[RB_F_D_AIR] + data[RB_F_D_WATER] + data[RB_FX_P]
+        delta_xp = data[RB_V_XP] * dt + 0.5 * fx_p / mass * dt * dt
 
-        fy_p = self.state_dict['f_s_air'] + self.state_dict['f_s_water'] + self.state_dict['fy_p']
-        delta_yp = self.state_dict['v_yp'] * self.state_dict['delta_t'] + 0.5 * fy_p / self.state_dict['mass'] * \
-                   self.state_dict['delta_t'] * self.state_dict['delta_t']
+        fy_p = data[RB_F_S_AIR] + data[RB_F_S_WATER] + data[RB_FY_P]
+        delta_yp = data[RB_V_YP] * dt + 0.5 * fy_p / mass * dt * dt
 
-        mom = self.state_dict['m_air'] + self.state_dict['m_water'] + self.state_dict['my_p'] + self.state_dict['mr']
-        delta_psi = self.state_dict['psi_dot'] * self.state_dict['delta_t'] + 0.5 * mom * (
-                    self.state_dict['hull_length'] / 2.0) / self.state_dict['moi'] * self.state_dict['delta_t'] * \
-                    self.state_dict['delta_t']
+        mom = data[RB_M_AIR] + data[RB_M_WATER] + data[RB_MY_P] + data[RB_MR]
+        delta_psi = data[RB_PSI_DOT] * dt + 0.5 * mom * (data[RB_HULL_LENGTH] / 2.0) / data[RB_MOI] * dt * dt
 
-        self.state_dict['psi'] = self.state_dict['psi'] + delta_psi
-        if self.state_dict['psi'] > 2.0 * np.pi:
-            self.state_dict['psi'] -= 2.0 * np.pi
-        elif self.state_dict['psi'] < 0.0:
-            self.state_dict['psi'] += 2.0 * np.pi
+        psi = data[RB_PSI] + delta_psi
+        if psi > 2.0 * math.pi:
+            psi -= 2.0 * math.pi
+        elif psi < 0.0:
+            psi += 2.0 * math.pi
+        data[RB_PSI] = psi
 
         # convert change in position to global frame
-        delta_x = delta_xp * np.cos(-self.state_dict['psi']) + delta_yp * np.sin(-self.state_dict['psi'])
-        delta_y = -delta_xp * np.sin(-self.state_dict['psi']) + delta_yp * np.cos(-self.state_dict['psi'])
+        cos_psi = math.cos(-psi)
+        sin_psi = math.sin(-psi)
+        data[RB_X_POS] += delta_xp * cos_psi + delta_yp * sin_psi
+        data[RB_Y_POS] += -delta_xp * sin_psi + delta_yp * cos_psi
+
+        data[RB_V_XP] += fx_p / mass * dt
+        data[RB_V_YP] += fy_p / mass * dt
+        data[RB_PSI_DOT] += mom / data[RB_MOI] * dt
+
+        self.finish_step(fx_p / mass, fy_p / mass, mom / data[RB_MOI], dt)
+
+    def get_state_derivative(self, y):
+        """
+        evaluates the equations of motion of the boat at a state. The state is written into the state dictionary and
+        the thrust, forces, and moments are found for it with the current control.
+
+        :param y: list of x position, y position, heading, local x velocity, local y velocity, and angular velocity
+        :return: the time derivative of y as a list
+        """
+        data = self.state_dict.data
+        data[RB_X_POS], data[RB_Y_POS], data[RB_PSI], data[RB_V_XP], data[RB_V_YP], data[RB_PSI_DOT] = y
+
+        if data[RB_FUEL] <= 0.0:
+            data[RB_POWER] = 0.0
+            data[RB_THRUST] = 0.0
+        else:
+            data[RB_THRUST] = self.calc_thrust([y[3], y[4]], y[5])
+
+        cos_psi = math.cos(-y[2])
+        sin_psi = math.sin(-y[2])
+        data[RB_V_X] = y[3] * cos_psi + y[4] * sin_psi
+        data[RB_V_Y] = -y[3] * sin_psi + y[4] * cos_psi
+
+        self.calc_forces_and_moments(data[RB_THRUST])
+
+        fx_p = data[RB_F_D_AIR] + data[RB_F_D_WATER] + data[RB_FX_P]
+        fy_p = data[RB_F_S_AIR] + data[RB_F_S_WATER] + data[RB_FY_P]
+        mom = data[RB_M_AIR] + data[RB_M_WATER] + data[RB_MY_P] + data[RB_MR]
+
+        self.integrator_stats['n_evaluations'] += 1
+
+        return [data[RB_V_X], data[RB_V_Y], y[5], fx_p / data[RB_MASS], fy_p / data[RB_MASS], mom / data[RB_MOI]]
+
+    def get_integration_state(self):
+        """
+        gets the integrated part of the state of the boat
+
+        :return: list of x position, y position, heading, local x velocity, local y velocity, and angular velocity
+        """
+        data = self.state_dict.data
+        return [data[RB_X_POS], data[RB_Y_POS], data[RB_PSI], data[RB_V_XP], data[RB_V_YP], data[RB_PSI_DOT]]
+
+    def save_logged_forces(self):
+        """
+        copies the thrust, forces, and moments found at the start of a step. Higher order integrators evaluate the
+        forces at several states within the step and these are written back after it so the logged forces are those at
+        the start of the step, the same as the Euler integrator.
+
+        :return: dictionary of the logged values
+        """
+        return dict((key, self.state_dict[key]) for key in LOGGED_FORCE_FIELDS)
+
+    def semi_implicit_euler_step(self, dt):
+        """
+        steps the boat forward in time using a semi implicit (symplectic) Euler scheme. The velocities are updated
+        first and the updated velocities move the boat.
+
+        :param dt: time step [s]
+        :return:
+        """
+        y = self.get_integration_state()
+        dy = self.get_state_derivative(y)
+
+        v_xp = y[3] + dy[3] * dt
+        v_yp = y[4] + dy[4] * dt
+        psi_dot = y[5] + dy[5] * dt
+        psi = y[2] + psi_dot * dt
+        cos_psi = math.cos(-psi)
+        sin_psi = math.sin(-psi)
+        x_pos = y[0] + (v_xp * cos_psi + v_yp * sin_psi) * dt
+        y_pos = y[1] + (-v_xp * sin_psi + v_yp * cos_psi) * dt
+
+        self.set_integration_state([x_pos, y_pos, psi, v_xp, v_yp, psi_dot])
+        self.finish_step(dy[3], dy[4], dy[5], dt)
+
+    def rk4_step(self, dt):
+        """
+        steps the boat forward in time using the classic fourth order Runge-Kutta scheme
+
+        :param dt: time step [s]
+        :return:
+        """
+        y = self.get_integration_state()
+        k1 = self.get_state_derivative(y)
+        logged = self.save_logged_forces()
+        k2 = self.get_state_derivative([y[i] + 0.5 * dt * k1[i] for i in range(6)])
+        k3 = self.get_state_derivative([y[i] + 0.5 * dt * k2[i] for i in range(6)])
+        k4 = self.get_state_derivative([y[i] + dt * k3[i] for i in range(6)])
+
+        self.set_integration_state([y[i] + dt / 6.0 * (k1[i] + 2.0 * k2[i] + 2.0 * k3[i] + k4[i]) for i in range(6)])
+        self.state_dict.update(logged)
+        self.finish_step(k1[3], k1[4], k1[5], dt)
+
+    def rk45_step(self, dt):
+        """
+        steps the boat forward in time using the adaptive Dormand-Prince Runge-Kutta 5(4) scheme. The step is covered
+        with as many internal steps as the error control needs. The internal step size is kept between calls so the
+        next step starts from the last accepted size. A ValueError is raised if the error estimate or the state is not
+        finite, or if the error control cannot cover the step within RK45_MIN_STEP_FRACTION and RK45_MAX_ITERATIONS.
+
+        :param dt: time step [s]
+        :return:
+        """
+        y = self.get_integration_state()
+        k1 = self.get_state_derivative(y)
+        logged = self.save_logged_forces()
+        accel = (k1[3], k1[4], k1[5])
+
+        t = 0.0
+        h = dt if self.rk45_h is None else min(self.rk45_h, dt)
+        h_min = RK45_MIN_STEP_FRACTION * dt
+        n_iterations = 0
+        while t < dt:
+            if n_iterations >= RK45_MAX_ITERATIONS:
+                raise ValueError('The rk45 integrator did not cover the time step in ' + str(RK45_MAX_ITERATIONS) +
+                                 ' internal steps')
+            n_iterations += 1
+
+            h = min(h, dt - t)
+            k = [k1]
+            for a_row in DORMAND_PRINCE_A:
+                k.append(self.get_state_derivative([y[i] + h * sum(a * k_j[i] for a, k_j in zip(a_row, k))
+                                                    for i in range(6)]))
+            # the last stage is at the fifth order solution
+            y_new = self.get_integration_state()
+
+            err = 0.0
+            for i in range(6):
+                err_i = h * sum(e * k_j[i] for e, k_j in zip(DORMAND_PRINCE_E, k))
+                scale = self.rk45_atol + self.rk45_rtol * max(abs(y[i]), abs(y_new[i]))
+                err += (err_i / scale) * (err_i / scale)
+            err = math.sqrt(err / 6.0)
+            if not math.isfinite(err) or not all(math.isfinite(v) for v in y_new):
+                raise ValueError('The rk45 integrator found an error estimate or a state that is not finite at ' +
+                                 str(t) + ' [s] into the step. Check the controls and the state of the boat for nan '
+                                 'values, and the tolerances for values too small to scale the error by')
+
+            if err <= 1.0:
+                t += h
+                y = y_new
+                k1 = k[-1]
+            else:
+                self.integrator_stats['n_rejected'] += 1
 
-        self.state_dict['x_pos'] = self.state_dict['x_pos'] + delta_x
-        self.state_dict['y_pos'] = self.state_dict['y_pos'] + delta_y
+            if err == 0.0:
+                h *= 5.0
+            else:
+                h *= min(5.0, max(0.2, 0.9 * err ** -0.2))
+                if err > 1.0 and h < h_min:
+                    raise ValueError('The rk45 integrator needs an internal step smaller than ' + str(h_min) +
+                                     ' [s] to meet its tolerance')
+            self.rk45_h = h
 
-        self.state_dict['v_xp'] = self.state_dict['v_xp'] + fx_p / self.state_dict['mass'] * self.state_dict['delta_t']
-        self.state_dict['v_yp'] = self.state_dict['v_yp'] + fy_p / self.state_dict['mass'] * self.state_dict['delta_t']
-        self.state_dict['psi_dot'] = self.state_dict['psi_dot'] + mom / self.state_dict['moi'] * self.state_dict[
-            'delta_t']
+        self.set_integration_state(y)
+        self.state_dict.update(logged)
+        self.finish_step(accel[0], accel[1], accel[2], dt)
 
-        self.state_dict['v_x'] = self.state_dict['v_xp'] * np.cos(-self.state_dict['psi']) + self.state_dict[
-            'v_yp'] * np.sin(-self.state_dict['psi'])
-        self.state_dict['v_y'] = -self.state_dict['v_xp'] * np.sin(-self.state_dict['psi']) + self.state_dict[
-            'v_yp'] * np.cos(-self.state_dict['psi'])
+    def set_integration_state(self, y):
+        """
+        writes the integrated part of the state back into the state dictionary. The heading is wrapped to be between
+        0 and 2 pi.
 
-        self.state_dict['acc_xp'] = fx_p / self.state_dict['mass']
-        self.state_dict['acc_yp'] = fy_p / self.state_dict['mass']
-        self.state_dict['psi_double_dot'] = mom / self.state_dict['moi']
+        :param y: list of x position, y position, heading, local x velocity, local y velocity, and angular velocity
+        :return:
+        """
+        data = self.state_dict.data
+        data[RB_X_POS], data[RB_Y_POS], data[RB_PSI], data[RB_V_XP], data[RB_V_YP], data[RB_PSI_DOT] = y
+        if data[RB_PSI] > 2.0 * math.pi:
+            data[RB_PSI] -= 2.0 * math.pi
+        elif data[RB_PSI] < 0.0:
+            data[RB_PSI] += 2.0 * math.pi
+
+    def finish_step(self, acc_xp, acc_yp, psi_double_dot, dt):
+        """
+        updates the derived velocities, the logged accelerations, and the fuel at the end of a step
+
+        :param acc_xp: acceleration in the local x direction at the start of the step [m/s^2]
+        :param acc_yp: acceleration in the local y direction at the start of the step [m/s^2]
+        :param psi_double_dot: angular acceleration at the start of the step [rad/s^2]
+        :param dt: time step [s]
+        :return:
+        """
+        data = self.state_dict.data
+        cos_psi = math.cos(-data[RB_PSI])
+        sin_psi = math.sin(-data[RB_PSI])
+        data[RB_V_X] = data[RB_V_XP] * cos_psi + data[RB_V_YP] * sin_psi
+        data[RB_V_Y] = -data[RB_V_XP] * sin_psi + data[RB_V_YP] * cos_psi
+
+        data[RB_ACC_XP] = acc_xp
+        data[RB_ACC_YP] = acc_yp
+        data[RB_PSI_DOUBLE_DOT] = psi_double_dot
 
         # convert acceleration to global reference plane
-        self.state_dict['acc_x'] = self.state_dict['acc_xp'] * np.cos(-self.state_dict['psi']) + self.state_dict[
-            'acc_yp'] * np.sin(-self.state_dict['psi'])
-        self.state_dict['acc_y'] = -self.state_dict['acc_xp'] * np.sin(-self.state_dict['psi']) + self.state_dict[
-            'acc_yp'] * np.cos(-self.state_dict['psi'])
+        data[RB_ACC_X] = acc_xp * cos_psi + acc_yp * sin_psi
+        data[RB_ACC_Y] = -acc_xp * sin_psi + acc_yp * cos_psi
 
         # calculate the fuel used in the simulation
-        fuel_used = self.state_dict['power'] * self.state_dict['bsfc'] * self.state_dict['delta_t']  # [kg of fuel]
-        self.state_dict['fuel'] -= fuel_used
+        fuel_used = data[RB_POWER] * data[RB_BSFC] * dt  # [kg of fuel]
+        data[RB_FUEL] -= fuel_used
 
-        if self.state_dict['fuel'] < 0:
-            self.state_dict['fuel'] = 0.0
+        if data[RB_FUEL] < 0:
+            data[RB_FUEL] = 0.0
 
-        self.state_dict['time'] = time
+    def set_integrator(self, name='euler', substeps=1, rtol=1.0e-6, atol=1.0e-8):
+        """
+        selects the integration scheme used by step
 
-        # log telemetry
-        #tmp_df = pd.DataFrame([self.state_dict])
-        #self.telemetry = pd.concat([self.telemetry, tmp_df], ignore_index=True)
+        :param name: one of euler, semi_implicit_euler, rk4, or rk45
+        :param substeps: number of equal substeps each call to step is split into
+        :param rtol: relative error tolerance of the rk45 integrator
+        :param atol: absolute error tolerance of the rk45 integrator
+        :return:
+        """
+        if name not in INTEGRATORS:
+            raise ValueError('Unsupported integrator ' + str(name) + '. Use one of ' + ', '.join(INTEGRATORS))
+        if int(substeps) < 1:
+            raise ValueError('The number of substeps must be at least one')
+        self.integrator = name
+        self.integrator_substeps = int(substeps)
+        self.rk45_rtol = rtol
+        self.rk45_atol = atol
+        self.rk45_h = None
+
+    def reset_integrator_stats(self):
+        """
+        sets the number of equation of motion evaluations and rejected rk45 steps back to zero
+        :return:
+        """
+        self.integrator_stats = {'n_evaluations': 0, 'n_rejected': 0}
 
     def calc_forces_and_moments(self, thrust):
         """
@@ -648,6 +1360,87 @@ class RiverBoat(Mover,ABC):
         found from the rotational component of the boat. Forces and moments induced on the boat from the propeller
         are also found.
 
+        This is the scalar kernel used when stepping a single boat. It only uses floats and the math module so no numpy
+        temporaries are created. It matches calc_forces_and_moments_reference to within 1e-12 relative.
+
+        :param thrust: the amount of thrust [N]. This is also a function of state
+        :return:
+        """
+        data = self.state_dict.data
+        rho_air = data[RB_DENSITY_AIR]
+        rho_water = data[RB_DENSITY_WATER]
+        hull_length = data[RB_HULL_LENGTH]
+        v_x = data[RB_V_X]
+        v_y = data[RB_V_Y]
+
+        # rotation from the global frame into the boat's frame
+        cos_rot = math.cos(-data[RB_PSI])
+        sin_rot = math.sin(-data[RB_PSI])
+
+        # air forces and moments. Effective velocities are in global coordinates
+        v_x_eff_air = data[RB_V_WIND_X] - v_x
+        v_y_eff_air = data[RB_V_WIND_Y] - v_y
+        v_x_air_local = cos_rot * v_x_eff_air - sin_rot * v_y_eff_air
+        v_y_air_local = sin_rot * v_x_eff_air + cos_rot * v_y_eff_air
+        phi_eff_air_local = math.atan2(v_y_air_local, v_x_air_local)
+        q_air = 0.5 * rho_air * (v_x_air_local * v_x_air_local + v_y_air_local * v_y_air_local)
+
+        cd_aero, cs_aero, cy_aero, cr_aero = self.get_aero_coeffs(phi_eff_air_local)
+
+        area_air = data[RB_AREA_AIR]
+        f_d_air = q_air * area_air * cd_aero
+        f_s_air = q_air * area_air * cs_aero
+        m_air = -q_air * cy_aero * area_air * hull_length
+
+        # water forces and moments
+        v_x_eff_water = data[RB_V_CURRENT_X] - v_x
+        v_y_eff_water = data[RB_V_CURRENT_Y] - v_y
+        v_x_water_local = cos_rot * v_x_eff_water - sin_rot * v_y_eff_water
+        v_y_water_local = sin_rot * v_x_eff_water + cos_rot * v_y_eff_water
+        phi_eff_water_local = math.atan2(v_y_water_local, v_x_water_local)
+        v_water_sq = v_x_water_local * v_x_water_local + v_y_water_local * v_y_water_local
+
+        cd_hydro, cs_hydro, cy_hydro, cr_hydro = self.get_hydro_coeffs(phi_eff_water_local)
+
+        area_water = data[RB_AREA_WATER]
+        f_d_hydro = 0.5 * rho_water * v_water_sq * area_water * cd_hydro
+        f_s_hydro = 0.5 * rho_water * v_water_sq * area_water * cs_hydro
+        m_hydro = -0.5 * cy_hydro * area_water * hull_length * rho_air * v_water_sq
+
+        mr = self.get_moment_hull(cr_hydro, data[RB_V_YP])
+
+        # propulsion forces
+        fx_p = thrust * math.cos(data[RB_DELTA])
+        fy_p = thrust * math.sin(data[RB_DELTA])
+        my_p = -fy_p * hull_length / 2.0
+
+        # save all of the forces and moments
+        data[RB_V_X_EFF_AIR] = v_x_eff_air
+        data[RB_V_Y_EFF_AIR] = v_y_eff_air
+        data[RB_PSI_EFF_AIR] = phi_eff_air_local
+        data[RB_V_X_EFF_WATER] = v_x_eff_water
+        data[RB_V_Y_EFF_WATER] = v_y_eff_water
+        data[RB_PSI_EFF_WATER] = phi_eff_water_local
+        data[RB_F_D_AIR] = f_d_air
+        data[RB_F_S_AIR] = f_s_air
+        data[RB_M_AIR] = m_air
+        data[RB_F_D_WATER] = f_d_hydro
+        data[RB_F_S_WATER] = f_s_hydro
+        data[RB_M_WATER] = m_hydro
+        data[RB_FX_P] = fx_p
+        data[RB_FY_P] = fy_p
+        data[RB_MY_P] = my_p
+        data[RB_MR] = mr
+
+    def calc_forces_and_moments_reference(self, thrust):
+        """
+        reference numpy implementation of calc_forces_and_moments. Kept to check the scalar kernel against.
+
+        given the state of the boat and the current thrust level, determine the forces abd moments from the air, water,
+        and the propeller. axial, transverse, and moments are found for both air and water. An additional moment is
+        found from the rotational component of the boat. Forces and moments induced on the boat from the propeller
+        are also found.
+
         :param state: a vector of x position, local x velocity, y position, local y velocity, angle, angular velocity
         :param thrust: the amount of thrust [N]. This is also a function of state
         :return:
@@ -667,7 +1460,7 @@ class RiverBoat(Mover,ABC):
         rho_water = self.state_dict['density_water']
 
         # in global coordinates
-        v_eff_air = self.state_dict['v_wind'] - [self.state_dict['v_x'], self.state_dict['v_y']]
+        v_eff_air = np.array(self.state_dict['v_wind']) - [self.state_dict['v_x'], self.state_dict['v_y']]
         self.state_dict['v_x_eff_air'] = v_eff_air[0]
         self.state_dict['v_y_eff_air'] = v_eff_air[1]
         rot_angle = -self.state_dict['psi']
@@ -692,7 +1485,7 @@ class RiverBoat(Mover,ABC):
 
         # --------------------------------------------------------------------------------------------------------------
         # water forces
-        v_eff_water = self.state_dict['v_current'] - [self.state_dict['v_x'], self.state_dict['v_y']]
+        v_eff_water = np.array(self.state_dict['v_current']) - [self.state_dict['v_x'], self.state_dict['v_y']]
         self.state_dict['v_x_eff_water'] = v_eff_water[0]
         self.state_dict['v_y_eff_water'] = v_eff_water[1]
         rot_angle = -self.state_dict['psi']
@@ -741,16 +1534,19 @@ class RiverBoat(Mover,ABC):
         :param psi_dot: the rotational velocity of the boat [rad/s]
         :return: the angle of attack of the flow to the propeller disk
         """
+        data = self.state_dict.data
 
         # lateral velocity induced at the propeller from the boat yawing
-        v_rot = self.state_dict['hull_length'] / 2.0 * psi_dot
-        v_local = np.array(v_local) * -1.0
+        v_rot = data[RB_HULL_LENGTH] / 2.0 * psi_dot
+        v_flow_x = v_local[0] * -1.0
+        v_flow_y = v_rot + v_local[1] * -1.0
 
-        propeller_axial = np.array(
-            [np.cos(self.state_dict['delta'] + np.pi / 2.0), np.sin(self.state_dict['delta'] + np.pi / 2.0)])
-        alpha = self.get_angle_between_vectors(propeller_axial, [v_local[0], v_rot + v_local[1]], True)
+        # signed angle between the propeller axis and the flow
+        axial_x = math.cos(data[RB_DELTA] + math.pi / 2.0)
+        axial_y = math.sin(data[RB_DELTA] + math.pi / 2.0)
+        alpha = math.atan2(v_flow_y * axial_x - v_flow_x * axial_y, axial_x * v_flow_x + axial_y * v_flow_y)
 
-        self.state_dict['alpha'] = alpha
+        data[RB_ALPHA] = alpha
 
         return alpha
 
@@ -774,125 +1570,105 @@ class RiverBoat(Mover,ABC):
 
     def calc_thrust(self, v_local, psi_dot):
         """
-        calculates the thrust delivered to the propeller based on the controlled power
+        calculates the thrust delivered to the propeller based on the controlled power. The induced velocity is
+        interpolated from the thrust surface if one is in use and strict mode is off. Otherwise, or when the inflow is
+        outside of the surface, it is solved with a Newton solver that is warm started from the induced velocity of the
+        previous call.
 
         :param v_local: the velocity of the boat in its local reference frame
         :param psi_dot: the angular velocity of boat
         :return: the current thrust output of the propeller given a fixed power level
         """
+        data = self.state_dict.data
 
-        v_mag = np.linalg.norm(v_local)
+        v_mag = math.sqrt(v_local[0] * v_local[0] + v_local[1] * v_local[1])
 
         alpha_d = self.get_alpha(v_local, psi_dot)
 
-        # Line search for inflecion point
-        eps = 1e-3
+        power = data[RB_POWER]
+        if power <= 0.0:
+            # no power is delivered so there is no induced velocity
+            data[RB_V_INDUCED] = 0.0
+            return 0.0
 
-        step = 0.1
-        v_guess = 0.0
-        f_eval_old = self.thrust_helper(v_guess, v_mag, alpha_d, self.state_dict['power'],
-                                        self.state_dict['density_water'], self.state_dict['prop_area'])
-        early_break = False
-        while np.abs(step) > eps:
+        v_induced = None
+        if self.thrust_surface is not None and not self.strict_thrust:
+            v_induced = self.thrust_surface.lookup(v_mag, alpha_d, power, data[RB_DENSITY_WATER], data[RB_PROP_AREA])
+            if v_induced is not None:
+                self.thrust_solver_stats['n_surface_lookups'] += 1
 
-            v_guess += step
-            f_eval_new = self.thrust_helper(v_guess, v_mag, alpha_d, self.state_dict['power'],
-                                            self.state_dict['density_water'], self.state_dict['prop_area'])
+        if v_induced is None:
+            v_induced, n_iterations, n_fallbacks = solve_induced_velocity(v_mag, alpha_d, power,
+                                                                          data[RB_DENSITY_WATER], data[RB_PROP_AREA],
+                                                                          v_guess=data[RB_V_INDUCED])
 
-            if f_eval_new < f_eval_old:
-                # inflection point has been passed
-                v_guess -= 2.0 * step
-                step /= 10.0
+            # log the effort of the solver
+            self.thrust_solver_stats['n_solves'] += 1
+            self.thrust_solver_stats['n_iterations'] += n_iterations
+            self.thrust_solver_stats['n_fallbacks'] += n_fallbacks
+            if n_iterations > self.thrust_solver_stats['max_iterations']:
+                self.thrust_solver_stats['max_iterations'] = n_iterations
 
-            if np.sign(f_eval_new) != np.sign(f_eval_old):
-                # a root has been crossed, and the loop can prematureing be broken
-                early_break = True
-                break
+        data[RB_V_INDUCED] = v_induced
 
-            f_eval_old = f_eval_new
+        thrust = power / (v_mag + v_induced)  # 2.0*self.state_dict['density_water']*self.state_dict['prop_area']*v_induced*v_induced*np.sign(v_induced)
 
-        if early_break:
-            # use bisect to solve for root as it has cross the x-axis
+        return thrust
 
-            a = 0
-            fa = self.thrust_helper(a, v_mag, alpha_d, self.state_dict['power'], self.state_dict['density_water'],
-                                    self.state_dict['prop_area'])
-            b = v_guess
-            error = 1.0
-            eps = 1e-6
-            while error > eps:
+    def use_thrust_surface(self, max_speed=10.0, min_power_fraction=0.05, n_a=256, n_s=256, tol=1.0e-4,
+                           cache_dir=os.path.join('Output', 'ThrustSurfaces')):
+        """
+        switches calc_thrust to interpolating the induced velocity from a precomputed surface. The surface is loaded
+        from disk if one was already built for the same propeller, water density, and power range. Passing None for
+        max_speed switches back to always solving for the induced velocity.
+
+        :param max_speed: the largest inflow speed the surface covers [m/s]
+        :param min_power_fraction: the smallest power the surface covers as a fraction of the maximum power
+        :param n_a: number of intervals across the non-dimensional inflow speed
+        :param n_s: number of intervals across the sine of the inflow angle
+        :param tol: largest allowed interpolation error relative to the total flow through the disk
+        :param cache_dir: folder the surfaces are saved in. None to not cache the surface
+        :return:
+        """
+        if max_speed is None:
+            self.thrust_surface = None
+            return
 
-                c = (a + b) / 2.0
-                fc = self.thrust_helper(c, v_mag, alpha_d, self.state_dict['power'], self.state_dict['density_water'],
-                                        self.state_dict['prop_area'])
+        self.thrust_surface = ThrustSurface.ThrustSurface.create_for_boat(self.state_dict, max_speed,
+                                                                          min_power_fraction, n_a, n_s, tol, cache_dir)
 
-                if np.sign(fa) == np.sign(fc):
-                    a = c
-                    fa = fc
-                else:
-                    b = c
+    def set_strict_thrust(self, is_strict):
+        """
+        sets if the thrust is always solved exactly even when a thrust surface is in use. Evaluation episodes are run
+        in strict mode so their results do not depend on the interpolation.
 
-                error = (b - a) / 2.0
+        :param is_strict: boolean for if the exact solver is always used
+        :return:
+        """
+        self.strict_thrust = is_strict
 
-            v_induced = c
+    def reset_thrust_solver_stats(self):
+        """
+        sets the iteration counts of the induced velocity solver back to zero
+        :return:
+        """
+        self.thrust_solver_stats = {'n_solves': 0, 'n_iterations': 0, 'n_fallbacks': 0, 'max_iterations': 0,
+                                    'n_surface_lookups': 0}
 
-        else:
-            # inflection point has not reached x axis
-
-            # golden section search for root bounds
-            # line search for bounds
-            v_tmp = 1e-6  # initial guess
-            k = 1
-            GOLDEN_RATIO = 1.61803
-            guess = [v_tmp]
-            error = self.thrust_helper(v_tmp, v_mag, alpha_d, self.state_dict['power'],
-                                       self.state_dict['density_water'], self.state_dict['prop_area'])
-            errors = [error]
-            delta = 0.1
-            while True:
-
-                v_tmp = v_tmp + delta * np.power(GOLDEN_RATIO, k)
-                guess.append(v_tmp)
-                error = self.thrust_helper(v_tmp, v_mag, alpha_d, self.state_dict['power'],
-                                           self.state_dict['density_water'], self.state_dict['prop_area'])
-                errors.append(error)
-
-                if np.sign(errors[k - 1]) != np.sign(errors[k]):
-                    break
-
-                if v_tmp > 100.0:
-                    # the search has failed. Assume induced velocity is zero
-                    break
-
-                k += 1
-
-            # bisect search for root
-            error = 1.0
-            eps = 1e-3
-            a = guess[k - 1]
-            b = guess[k]
-            fa = self.thrust_helper(a, v_mag, alpha_d, self.state_dict['power'], self.state_dict['density_water'],
-                                    self.state_dict['prop_area'])
-            while error > eps:
-
-                c = (a + b) / 2.0
-                fc = self.thrust_helper(c, v_mag, alpha_d, self.state_dict['power'], self.state_dict['density_water'],
-                                        self.state_dict['prop_area'])
-
-                if np.sign(fc) == np.sign(fa):
-                    a = c
-                    fa = fc
-                else:
-                    b = c
-
-                error = (b - a) / 2.0
-
-            v_induced = c
-
-        thrust = self.state_dict['power'] / (
-                    v_mag + v_induced)  # 2.0*self.state_dict['density_water']*self.state_dict['prop_area']*v_induced*v_induced*np.sign(v_induced)
+    def get_thrust_solver_stats(self):
+        """
+        gets the iteration counts of the induced velocity solver since the last reset
 
-        return thrust
+        :return: a dictionary with the number of solves, the total, mean, and maximum number of iterations, the
+            number of steps that fell back to bisection or the golden section search, and the number of induced
+            velocities interpolated from the thrust surface instead of solved
+        """
+        stats = dict(self.thrust_solver_stats)
+        if stats['n_solves'] > 0:
+            stats['mean_iterations'] = stats['n_iterations'] / stats['n_solves']
+        else:
+            stats['mean_iterations'] = 0.0
+        return stats
 
     def thrust_helper(self, v, v0, alpha_d, power, rho, area):
         """
@@ -950,12 +1726,12 @@ class RiverBoat(Mover,ABC):
                     if rb.state_dict.get(mod_name,None) is None:
                         raise ValueError('Cannot modify a non existent boat parameter '+ str(mod_name))
 
-                    rb.state_dict[mod_name] = modification
+                    rb.set_parameter(mod_name, modification)
 
             elif key == 'use_default':
                 # use the default riverboat.
                 rb = RiverBoat.get_default(delta_t) # default time step to be overwritten by the caller
-                rb.state_dict['name'] = name
+                rb.set_parameter('name', name)
             elif key == 'state':
                 # state not processed here
                 observation = pd.DataFrame(columns=['name','norm_value','norm_method'])
@@ -977,9 +1753,28 @@ class RiverBoat(Mover,ABC):
                 rb.observation_df = observation
             elif key == 'is_agent':
                 rb.can_learn = True
+            elif key == 'thrust_surface':
+                # interpolate the induced velocity of the propeller from a surface cached on disk
+                if rb is None:
+                    raise ValueError('A boat must be created before a thrust surface can be used. Please call use_default first in the input yaml file.')
+                rb.thrust_surface_settings = value
+            elif key == 'integrator':
+                # select the integration scheme and the number of substeps per step
+                if rb is None:
+                    raise ValueError('A boat must be created before its integrator can be set. Please call use_default first in the input yaml file.')
+                rb.set_integrator(**value)
+            elif key == 'coefficient_tables':
+                # interpolate the aero and hydro coefficients from tables instead of the analytic forms
+                if rb is None:
+                    raise ValueError('A boat must be created before coefficient tables can be used. Please call use_default first in the input yaml file.')
+                rb.use_coefficient_tables(value.get('n_intervals', 720), value.get('method', 'cubic'))
             else:
                 raise ValueError('Unsupported input value')
 
+        # the surface is built last so it is for the boat after all of its modifications
+        if rb is not None and rb.thrust_surface_settings is not None:
+            rb.use_thrust_surface(**rb.thrust_surface_settings)
+
         return rb
 
     #def action_to_command(self):
@@ -992,22 +1787,29 @@ class RiverBoat(Mover,ABC):
         :param step_num: The step number in the simulation
         :return:
         """
-        telemetry = self.get_telemetry()
+        row = self.history.get_row(step_num)
+        row[:N_TELEMETRY] = np.frombuffer(self.state_dict.data, dtype=float)[TELEMETRY_INDEX_ARRAY]
         # get the sensors information and add it to the state
+        i = N_TELEMETRY
         for sensor in self.sensors:
-            tmp_state = sensor.get_raw_measurements()
-            telemetry = {**telemetry, **tmp_state}
-        self.history.iloc[step_num] = list(telemetry.values())
+            sensor.write_raw_measurements(row[i:i + sensor.n_measurements])
+            i += sensor.n_measurements
 
     def reset_history(self, num_steps):
         """
+        empties the history for a new episode. The columns are the logged state followed by the raw measurements of
+        the sensors. The measurement columns are prefixed with the name of the boat, like river_boat_0_lidar_1_theta
 
         :param num_steps:
         :return:
         """
-        empty_data = np.zeros((num_steps, len(self.history_header)))
-        self.history = pd.DataFrame(data=empty_data,
-                                    columns=self.history_header)
+        telemetry = self.get_telemetry()
+        columns = list(telemetry.keys())
+        for sensor in self.sensors:
+            columns.extend(self.state_dict['name'] + '_' + key for key in sensor.get_raw_measurements().keys())
+        if self.history is None or self.history.columns != columns:
+            self.history = Telemetry.TelemetryBuffer(columns, constant_columns={'name': telemetry['name']})
+        self.history.reset(num_steps)
 
     def derived_measurements(self, destination):
         """
@@ -1016,22 +1818,23 @@ class RiverBoat(Mover,ABC):
         :param destination: goal state of the boat. (x,y) pair of points [m]
         :return:
         """
-        self.state_dict['dest_dist'] = np.sqrt(
-            (self.state_dict['x_pos'] - destination[0]) * (self.state_dict['x_pos'] - destination[0]) + (self.state_dict['y_pos'] - destination[1]) * (
-                    self.state_dict['y_pos'] - destination[1]))
-        delta_x = destination[0] - self.state_dict['x_pos']
-        delta_y = destination[1] - self.state_dict['y_pos']
+        data = self.state_dict.data
+        delta_x = destination[0] - data[RB_X_POS]
+        delta_y = destination[1] - data[RB_Y_POS]
+        data[RB_DEST_DIST] = math.sqrt(delta_x * delta_x + delta_y * delta_y)
 
-        self.state_dict['theta'] = np.arctan2(delta_y, delta_x)
+        data[RB_THETA] = math.atan2(delta_y, delta_x)
 
-        mu1 = self.state_dict['theta'] - self.state_dict['psi']
+        mu1 = data[RB_THETA] - data[RB_PSI]
         if mu1 >= 0:
             mu2 = np.pi * 2.0 - mu1  # explementary angle
         else:
             mu2 = np.pi * 2.0 + mu1  # explementary angle
-        mu_v = [mu1, mu2]
-        ind = np.argmin(np.abs(mu_v))
-        self.state_dict['mu'] = mu_v[ind]
+        # the angle with the smaller magnitude. The first is kept on a tie
+        if abs(mu2) < abs(mu1):
+            data[RB_MU] = mu2
+        else:
+            data[RB_MU] = mu1
 
     @staticmethod
     def get_default(delta_t):
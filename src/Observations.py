@@ -0,0 +1,123 @@
+"""
+Compiled observations of a learning mover. The names, normalization values, and normalization methods in the mover's
+observation data frame are turned once into an index array into the mover's state, a vector of normalization values,
+and method codes. Each step the observation is written into a preallocated float32 buffer without touching the data
+frame or building dictionaries.
+
+"""
+
+# native packages
+
+# 3rd party packages
+import numpy as np
+
+# own packages
+
+
+# normalization methods of an observation
+NORM_LINEAR = 0  # divided by the normalization value
+NORM_CLIP = 1  # divided by the normalization value and clipped to [-1, 1]
+NORM_NONE = 2  # the value is used as is
+NORM_METHODS = {'linear': NORM_LINEAR, 'clip': NORM_CLIP, 'none': NORM_NONE}
+
+
+class ObservationSpec:
+
+    def __init__(self, names, state_index, norm_values, norm_methods, sensors, n_observations):
+        """
+        the compiled layout of an observation. The state observations come first in the order of the observation data
+        frame, followed by the normalized measurements of each sensor in the order the sensors were added to the mover.
+
+        :param names: names of every observation
+        :param state_index: array of the index of each state observation in the numeric fields of the mover state
+        :param norm_values: array of the normalization value of each state observation
+        :param norm_methods: array of the normalization method code of each state observation
+        :param sensors: list of the sensors of the mover
+        :param n_observations: total number of observations
+        """
+        self.names = list(names)
+        self.state_index = state_index
+        self.norm_values = norm_values
+        self.norm_methods = norm_methods
+        self.clip_index = np.flatnonzero(norm_methods == NORM_CLIP)
+        self.n_state = len(state_index)
+        self.n_observations = n_observations
+
+        # the buffers the observations before and after a step are written into
+        self.state_buffer = np.zeros(n_observations, dtype=np.float32)
+        self.next_state_buffer = np.zeros(n_observations, dtype=np.float32)
+
+        # the slice of the buffers each sensor writes its measurements into
+        self.sensor_slices = []
+        start = self.n_state
+        for sensor in sensors:
+            self.sensor_slices.append((sensor, slice(start, start + sensor.n_measurements)))
+            start += sensor.n_measurements
+
+    @staticmethod
+    def compile(mover):
+        """
+        compiles the observation of a learning mover from its observation data frame and sensors
+
+        :param mover: a mover with an observation_df and a MoverState state
+        :return: the observation spec
+        """
+        names = []
+        state_index = []
+        norm_values = []
+        norm_methods = []
+        index = mover.state_dict.index
+        for name, norm_value, norm_method in zip(mover.observation_df['name'], mover.observation_df['norm_value'],
+                                                 mover.observation_df['norm_method']):
+            i = index.get(name)
+            if i is None:
+                raise ValueError('The observation ' + str(name) + ' is not a numeric field of the state of the mover')
+            method = NORM_METHODS.get(str(norm_method).strip())
+            if method is None:
+                raise ValueError('Invalid normalization method ' + str(norm_method) + ' for ' + str(name) +
+                                 '. Only ' + ', '.join('\'' + m + '\'' for m in NORM_METHODS) + ' are allowed')
+            if method == NORM_NONE:
+                norm_value = 1.0
+            elif float(norm_value) == 0.0:
+                raise ValueError('The normalization value of ' + str(name) + ' cannot be zero')
+            names.append(name)
+            state_index.append(i)
+            norm_values.append(float(norm_value))
+            norm_methods.append(method)
+
+        n_observations = len(names)
+        for sensor in mover.sensors:
+            names.extend(sensor.get_norm_measurements().keys())
+            n_observations += sensor.n_measurements
+
+        return ObservationSpec(names, np.asarray(state_index, dtype=np.intp), np.asarray(norm_values, dtype=float),
+                               np.asarray(norm_methods, dtype=np.int8), mover.sensors, n_observations)
+
+    def extract(self, mover, out):
+        """
+        writes the normalized observation of the mover into a buffer. The sensors must already have been updated.
+
+        :param mover: the mover the spec was compiled for
+        :param out: float32 array the observation is written into, normally state_buffer or next_state_buffer
+        :return: out
+        """
+        state = np.frombuffer(mover.state_dict.data, dtype=float)
+        values = out[:self.n_state]
+        np.divide(state[self.state_index], self.norm_values, out=values, casting='same_kind')
+        if len(self.clip_index) > 0:
+            values[self.clip_index] = np.clip(values[self.clip_index], -1.0, 1.0)
+
+        # add the normalized sensor measurements
+        for sensor, sensor_slice in self.sensor_slices:
+            sensor.write_norm_measurements(out[sensor_slice])
+
+        return out
+
+    def swap_buffers(self):
+        """
+        swaps the state and next state buffers, so the observation after a step becomes the observation before the
+        next step without being computed again
+
+        :return:
+        """
+        self.state_buffer, self.next_state_buffer = self.next_state_buffer, self.state_buffer
@@ -0,0 +1,156 @@
+"""
+Distances between the movers of a simulation, shared by the sensors and the reward functions. The movers that can move
+are compared to each other once per physics step in one array operation, which gives their distance matrix and their
+penetration matrix. A positive penetration means the two movers overlap. Static movers only move when the environment
+is reset, so they are put into a SpatialIndex.GridIndex then, and the nearest, in range, and collision queries only look
+at the static movers in the cells around the query instead of every one of them.
+
+"""
+
+# native packages
+
+# 3rd party packages
+import numpy as np
+
+# own packages
+import src.SpatialIndex as SpatialIndex
+
+
+class ProximityService:
+
+    def __init__(self):
+        """
+        the shared distances of the movers. reset must be called after the movers are placed, and update after every
+        physics step.
+        """
+        self.names = []  # names of every mover, in the order of the columns
+        self.index = dict()  # name of a mover to its column
+        self.rows = dict()  # name of a mover that can move to its row
+        self.positions = np.empty((0, 2))  # (x,y) of every mover [m]
+        self.radii = np.empty(0)  # radius of every mover, zero for movers without one [m]
+        self.dynamic_columns = np.empty(0, dtype=np.intp)  # columns of the movers that can move
+        self.static_columns = np.empty(0, dtype=np.intp)  # columns of the static movers
+        self.static_index = SpatialIndex.GridIndex(np.empty((0, 2)))  # grid of the static movers, in static_columns order
+        self.max_static_radius = 0.0  # largest radius of the static movers [m]
+
+        # results of the last update. Rows and columns are the movers that can move
+        self.offsets = np.empty((0, 0, 2))  # position of the column mover relative to the row mover [m]
+        self.distances = np.empty((0, 0))  # distance between the centers, infinite for a mover and itself [m]
+        self.penetration = np.empty((0, 0))  # sum of the radii minus the distance [m]
+
+    def reset(self, mover_dict):
+        """
+        gathers the movers and their radii, builds the grid index of the static movers from where they were placed for
+        the episode, and computes the distances of the movers that can move
+
+        :param mover_dict: ordered dictionary that has all of the movers in the simulation
+        :return:
+        """
+        self.names = list(mover_dict.keys())
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        self.positions = np.array([(mover.state_dict['x_pos'], mover.state_dict['y_pos'])
+                                   for mover in mover_dict.values()], dtype=float).reshape(-1, 2)
+        self.radii = np.array([mover.state_dict['radius'] if 'radius' in mover.state_dict else 0.0
+                               for mover in mover_dict.values()], dtype=float)
+
+        dynamic_names = [name for name, mover in mover_dict.items() if not mover.is_static]
+        self.rows = dict((name, i) for i, name in enumerate(dynamic_names))
+        self.dynamic_columns = np.array([self.index[name] for name in dynamic_names], dtype=np.intp)
+        self.static_columns = np.array([self.index[name] for name, mover in mover_dict.items() if mover.is_static],
+                                       dtype=np.intp)
+        self.static_index = SpatialIndex.GridIndex(self.positions[self.static_columns])
+        self.max_static_radius = float(self.radii[self.static_columns].max()) if len(self.static_columns) > 0 else 0.0
+
+        self.update(mover_dict)
+
+    def update(self, mover_dict):
+        """
+        refreshes the positions of the movers that can move, and computes their distances and penetrations to each
+        other
+
+        :param mover_dict: ordered dictionary that has all of the movers in the simulation
+        :return:
+        """
+        for name, row in self.rows.items():
+            state_dict = mover_dict[name].state_dict
+            column = self.dynamic_columns[row]
+            self.positions[column, 0] = state_dict['x_pos']
+            self.positions[column, 1] = state_dict['y_pos']
+
+        dynamic_positions = self.positions[self.dynamic_columns]
+        dynamic_radii = self.radii[self.dynamic_columns]
+        self.offsets = dynamic_positions[np.newaxis, :, :] - dynamic_positions[:, np.newaxis, :]
+        self.distances = np.hypot(self.offsets[..., 0], self.offsets[..., 1])
+        # a mover is not near itself
+        np.fill_diagonal(self.distances, np.inf)
+        self.penetration = dynamic_radii[:, np.newaxis] + dynamic_radii[np.newaxis, :] - self.distances
+
+    def get_in_range(self, name, max_range):
+        """
+        gets every mover within a distance of a mover that can move
+
+        :param name: name of a mover that can move
+        :param max_range: the search distance [m]. Movers exactly at the distance are included
+        :return: array of the columns of the movers, and array of their distances, both sorted by the distance
+        """
+        row = self.rows[name]
+        idx, static_dst = self.static_index.query_radius(self.positions[self.dynamic_columns[row]], max_range)
+
+        dynamic_dst = self.distances[row]
+        is_inside = dynamic_dst <= max_range
+        return self.merge(self.static_columns[idx], static_dst, self.dynamic_columns[is_inside],
+                          dynamic_dst[is_inside])
+
+    def get_nearest(self, name, k, max_range=np.inf):
+        """
+        gets the nearest movers to a mover that can move
+
+        :param name: name of a mover that can move
+        :param k: the most movers that are returned
+        :param max_range: movers further than this are not returned [m]
+        :return: array of the columns of the movers, and array of their distances, both sorted by the distance
+        """
+        row = self.rows[name]
+        idx, static_dst = self.static_index.query_nearest(self.positions[self.dynamic_columns[row]], k, max_range)
+
+        dynamic_dst = self.distances[row]
+        is_inside = dynamic_dst <= max_range
+        columns, dst = self.merge(self.static_columns[idx], static_dst, self.dynamic_columns[is_inside],
+                                  dynamic_dst[is_inside])
+        return columns[:k], dst[:k]
+
+    def is_colliding(self, name):
+        """
+        checks if a mover that can move touches or overlaps any other mover
+
+        :param name: name of a mover that can move
+        :return: true if it collides
+        """
+        row = self.rows[name]
+        penetration = self.penetration[row]
+        if len(penetration) > 0 and penetration.max() >= 0.0:
+            return True
+
+        # only the static movers closer than the two largest radii can touch it
+        radius = self.radii[self.dynamic_columns[row]]
+        idx, dst = self.static_index.query_radius(self.positions[self.dynamic_columns[row]],
+                                                  radius + self.max_static_radius)
+        return bool(np.any(radius + self.radii[self.static_columns[idx]] - dst >= 0.0))
+
+    @staticmethod
+    def merge(static_columns, static_dst, dynamic_columns, dynamic_dst):
+        """
+        joins the movers found in the grid index with the movers that can move, sorted by the distance
+
+        :param static_columns: columns of static movers
+        :param static_dst: their distances [m]
+        :param dynamic_columns: columns of movers that can move
+        :param dynamic_dst: their distances [m]
+        :return: array of the columns of the movers, and array of their distances, both sorted by the distance
+        """
+        if len(dynamic_columns) == 0:
+            return static_columns, static_dst
+        columns = np.concatenate([static_columns, dynamic_columns])
+        dst = np.concatenate([static_dst, dynamic_dst])
+        sort_idx = np.argsort(dst, kind='stable')
+        return columns[sort_idx], dst[sort_idx]
@@ -0,0 +1,327 @@
+"""
+Reachable zones of a river boat. A sweep over propeller angle, power, initial speed, and initial heading is simulated as
+one batch with the vectorized engine, and the end points are turned into the polygons of the area the boat can reach
+within a time horizon. Sweeps are cached on disk so planners and figures query them instead of re-simulating.
+
+"""
+
+# native packages
+import copy
+import hashlib
+import os
+
+# 3rd party packages
+import numpy as np
+
+# own packages
+import src.VectorizedMovers as VectorizedMovers
+
+
+# sweeps with fewer boats than this are stepped one scalar boat at a time. The per step overhead of the vectorized engine
+# only pays off from about this many boats, see benchmarks/PhysicsBenchmark.py
+MIN_VECTORIZED_BOATS = 32
+
+
+class ReachableSet:
+
+    def __init__(self, start, speeds, headings, propeller_angles, powers, horizon, delta_t, end_points):
+        """
+        the end points of a sweep of constant controls from a start point. The sweep is the full grid of initial
+        speeds, initial headings, propeller angles, and powers.
+
+        :param start: the (x,y) start point of every boat [m]
+        :param speeds: initial speeds along the longitudinal axis of the boat [m/s]
+        :param headings: initial headings [rad]
+        :param propeller_angles: propeller angles held over the horizon [rad]
+        :param powers: powers held over the horizon [watt]
+        :param horizon: time the boats are simulated for [s]
+        :param delta_t: time step of the simulation [s]
+        :param end_points: array of shape (n_speeds, n_headings, n_angles, n_powers, 2) of the end positions [m]
+        """
+        self.start = np.asarray(start, dtype=float)
+        self.speeds = np.asarray(speeds, dtype=float)
+        self.headings = np.asarray(headings, dtype=float)
+        self.propeller_angles = np.asarray(propeller_angles, dtype=float)
+        self.powers = np.asarray(powers, dtype=float)
+        self.horizon = float(horizon)
+        self.delta_t = float(delta_t)
+        self.end_points = end_points
+
+    @staticmethod
+    def compute(boat, start=(0.0, 0.0), speeds=(0.0,), headings=(0.0,), propeller_angles=None, powers=None,
+                horizon=10.0, delta_t=None):
+        """
+        simulates every combination of the sweep at once with VectorizedMovers.VectorizedRiverBoat, or one boat at a time
+        if the sweep has fewer than MIN_VECTORIZED_BOATS combinations. Every boat starts
+        as a copy of the given boat at the start point, with its speed and heading from the sweep and no sideways or
+        rotational velocity, and holds its propeller angle and power for the whole horizon.
+
+        :param boat: the Movers.RiverBoat that is swept. Its current state is used for everything not in the sweep
+        :param start: the (x,y) start point [m]
+        :param speeds: initial speeds along the longitudinal axis of the boat [m/s]
+        :param headings: initial headings [rad]
+        :param propeller_angles: propeller angles [rad]. 51 angles across the limits of the boat if None
+        :param powers: powers [watt]. The current power of the boat if None
+        :param horizon: time the boats are simulated for [s]
+        :param delta_t: time step [s]. The time step of the boat if None
+        :return: the reachable set
+        """
+        if propeller_angles is None:
+            propeller_angles = np.linspace(boat.state_dict['delta_max'][0], boat.state_dict['delta_max'][1], 51)
+        if powers is None:
+            powers = [boat.state_dict['power']]
+        if delta_t is None:
+            delta_t = boat.state_dict['delta_t']
+        n_steps = int(round(horizon / delta_t))
+        if n_steps <= 0:
+            raise ValueError('The horizon must be at least one time step long')
+
+        # one boat for every combination, in the order of the end point array
+        grid = np.meshgrid(np.asarray(speeds, dtype=float), np.asarray(headings, dtype=float),
+                           np.asarray(propeller_angles, dtype=float), np.asarray(powers, dtype=float), indexing='ij')
+        shape = grid[0].shape
+        speed, heading, propeller_angle, power = [g.ravel() for g in grid]
+
+        if speed.size < MIN_VECTORIZED_BOATS:
+            end_points = ReachableSet.simulate_scalar(boat, start, speed, heading, propeller_angle, power, n_steps,
+                                                      delta_t)
+        else:
+            end_points = ReachableSet.simulate_vectorized(boat, start, speed, heading, propeller_angle, power,
+                                                          n_steps, delta_t)
+
+        end_points = end_points.reshape(shape + (2,))
+        return ReachableSet(start, speeds, headings, propeller_angles, powers, n_steps * delta_t, delta_t, end_points)
+
+    @staticmethod
+    def simulate_vectorized(boat, start, speed, heading, propeller_angle, power, n_steps, delta_t):
+        """
+        steps every boat of a flattened sweep together with VectorizedMovers.VectorizedRiverBoat
+
+        :param boat: the Movers.RiverBoat that is swept
+        :param start: the (x,y) start point [m]
+        :param speed: initial speed of every boat [m/s]
+        :param heading: initial heading of every boat [rad]
+        :param propeller_angle: propeller angle of every boat [rad]
+        :param power: power of every boat [watt]
+        :param n_steps: number of time steps
+        :param delta_t: time step [s]
+        :return: array of shape (n_boats, 2) of the end positions [m]
+        """
+        vrb = VectorizedMovers.VectorizedRiverBoat(boat, speed.size)
+        vrb['delta_t'] = delta_t
+        vrb['x_pos'] = start[0]
+        vrb['y_pos'] = start[1]
+        vrb['psi'] = heading
+        vrb['v_xp'] = speed
+        vrb['v_yp'] = 0.0
+        vrb['psi_dot'] = 0.0
+        vrb['v_x'] = speed * np.cos(heading)
+        vrb['v_y'] = speed * np.sin(heading)
+        vrb.set_control(power, propeller_angle)
+
+        for i in range(n_steps):
+            vrb.step(i * delta_t)
+
+        return np.stack([vrb['x_pos'], vrb['y_pos']], axis=-1)
+
+    @staticmethod
+    def simulate_scalar(boat, start, speed, heading, propeller_angle, power, n_steps, delta_t):
+        """
+        steps the boats of a flattened sweep one at a time on a copy of the boat. The copy uses the exact thrust solver
+        and the euler integrator without sub stepping so the end points match simulate_vectorized to round off.
+
+        :param boat: the Movers.RiverBoat that is swept
+        :param start: the (x,y) start point [m]
+        :param speed: initial speed of every boat [m/s]
+        :param heading: initial heading of every boat [rad]
+        :param propeller_angle: propeller angle of every boat [rad]
+        :param power: power of every boat [watt]
+        :param n_steps: number of time steps
+        :param delta_t: time step [s]
+        :return: array of shape (n_boats, 2) of the end positions [m]
+        """
+        rb = copy.deepcopy(boat)
+        rb.strict_thrust = True
+        rb.set_integrator('euler')
+        init_state = rb.state_dict.copy()
+
+        end_points = np.zeros((speed.size, 2))
+        for j in range(speed.size):
+            rb.state_dict.reset(init_state)
+            rb.state_dict['delta_t'] = delta_t
+            rb.state_dict['x_pos'] = start[0]
+            rb.state_dict['y_pos'] = start[1]
+            rb.state_dict['psi'] = heading[j]
+            rb.state_dict['v_xp'] = speed[j]
+            rb.state_dict['v_yp'] = 0.0
+            rb.state_dict['psi_dot'] = 0.0
+            rb.state_dict['v_x'] = speed[j] * np.cos(heading[j])
+            rb.state_dict['v_y'] = speed[j] * np.sin(heading[j])
+            rb.set_control(power[j], propeller_angle[j])
+
+            for i in range(n_steps):
+                rb.step(i * delta_t)
+
+            end_points[j] = rb.state_dict['x_pos'], rb.state_dict['y_pos']
+
+        return end_points
+
+    def get_end_points(self, speed_idx=0, heading_idx=0):
+        """
+        gets the end points of one initial speed and heading
+
+        :param speed_idx: index of the initial speed
+        :param heading_idx: index of the initial heading
+        :return: array of shape (n_angles, n_powers, 2) [m]
+        """
+        return self.end_points[speed_idx, heading_idx]
+
+    def get_polygon(self, speed_idx=0, heading_idx=0, include_start=False):
+        """
+        gets the outline of the zone the boat reaches at the end of the horizon for one initial speed and heading. The
+        end points are a continuous map of the (propeller angle, power) grid, so walking around the edge of the grid
+        walks around the zone. With one power the outline is the arc of end points across the propeller angles.
+
+        :param speed_idx: index of the initial speed
+        :param heading_idx: index of the initial heading
+        :param include_start: if true the start point is added so the zone includes the whole path from the start
+        :return: array of shape (n_vertices, 2) of the vertices in order [m]
+        """
+        points = self.end_points[speed_idx, heading_idx]
+        if points.shape[1] == 1:
+            outline = points[:, 0]
+        else:
+            # largest power across the angles, the last angle down the powers, the smallest power back across the
+            # angles, and the first angle up the powers
+            outline = np.concatenate([points[:, -1], points[-1, -2::-1], points[-2::-1, 0], points[0, 1:-1]])
+        if include_start:
+            outline = np.vstack([outline, self.start])
+        return outline
+
+    def contains(self, point, speed_idx=0, heading_idx=0, include_start=False):
+        """
+        checks if points are inside of a reachable zone with the even-odd rule
+
+        :param point: an (x,y) point, or an array of shape (n, 2) of points [m]
+        :param speed_idx: index of the initial speed
+        :param heading_idx: index of the initial heading
+        :param include_start: if true the zone includes the start point, see get_polygon
+        :return: bool, or an array of shape (n,) of bools
+        """
+        point = np.asarray(point, dtype=float)
+        xy = np.atleast_2d(point)
+        polygon = self.get_polygon(speed_idx, heading_idx, include_start)
+        x0 = polygon[:, 0][np.newaxis, :]
+        y0 = polygon[:, 1][np.newaxis, :]
+        x1 = np.roll(polygon[:, 0], -1)[np.newaxis, :]
+        y1 = np.roll(polygon[:, 1], -1)[np.newaxis, :]
+        px = xy[:, 0][:, np.newaxis]
+        py = xy[:, 1][:, np.newaxis]
+
+        # count the edges a ray in the positive x direction crosses
+        straddles = (y0 > py) != (y1 > py)
+        dy = np.where(y1 == y0, 1.0, y1 - y0)
+        x_cross = x0 + (py - y0) * (x1 - x0) / dy
+        inside = np.sum(straddles & (px < x_cross), axis=1) % 2 == 1
+
+        if point.ndim == 1:
+            return bool(inside[0])
+        return inside
+
+    def get_max_distance(self, speed_idx=0, heading_idx=0):
+        """
+        gets the largest distance from the start point that is reached for one initial speed and heading
+
+        :param speed_idx: index of the initial speed
+        :param heading_idx: index of the initial heading
+        :return: the distance [m]
+        """
+        delta = self.end_points[speed_idx, heading_idx] - self.start
+        return float(np.max(np.hypot(delta[..., 0], delta[..., 1])))
+
+    def save(self, file_name):
+        """
+        saves the reachable set to a numpy archive
+
+        :param file_name: path of the archive
+        :return:
+        """
+        np.savez(file_name, start=self.start, speeds=self.speeds, headings=self.headings,
+                 propeller_angles=self.propeller_angles, powers=self.powers, horizon=self.horizon,
+                 delta_t=self.delta_t, end_points=self.end_points)
+
+    @staticmethod
+    def load(file_name):
+        """
+        loads a reachable set saved with save
+
+        :param file_name: path of the archive
+        :return: the reachable set
+        """
+        data = np.load(file_name)
+        return ReachableSet(data['start'], data['speeds'], data['headings'], data['propeller_angles'],
+                            data['powers'], float(data['horizon']), float(data['delta_t']), data['end_points'])
+
+    @staticmethod
+    def get_cache_key(boat, start, speeds, headings, propeller_angles, powers, horizon, delta_t):
+        """
+        builds a key for a cached reachable set from the boat's state and the sweep. The same boat and sweep always give
+        the same key.
+
+        :param boat: the Movers.RiverBoat that is swept
+        :param start: the (x,y) start point [m]
+        :param speeds: initial speeds [m/s]
+        :param headings: initial headings [rad]
+        :param propeller_angles: propeller angles [rad]
+        :param powers: powers [watt]
+        :param horizon: time the boats are simulated for [s]
+        :param delta_t: time step [s]
+        :return: a hex string
+        """
+        key = hashlib.sha1()
+        key.update(VectorizedMovers.VectorizedRiverBoat.get_column(boat.state_dict).tobytes())
+        for values in (start, speeds, headings, propeller_angles, powers, (horizon, delta_t)):
+            key.update(np.asarray(values, dtype=float).tobytes())
+            key.update(b'|')
+        return key.hexdigest()[:16]
+
+    @staticmethod
+    def create(boat, start=(0.0, 0.0), speeds=(0.0,), headings=(0.0,), propeller_angles=None, powers=None,
+               horizon=10.0, delta_t=None, cache_dir=os.path.join('Output', 'ReachableSets')):
+        """
+        gets the reachable set of a sweep. It is loaded from cache_dir if the same boat and sweep has already been
+        simulated, otherwise it is computed and saved there. See compute for the parameters of the sweep.
+
+        :param boat: the Movers.RiverBoat that is swept
+        :param start: the (x,y) start point [m]
+        :param speeds: initial speeds along the longitudinal axis of the boat [m/s]
+        :param headings: initial headings [rad]
+        :param propeller_angles: propeller angles [rad]. 51 angles across the limits of the boat if None
+        :param powers: powers [watt]. The current power of the boat if None
+        :param horizon: time the boats are simulated for [s]
+        :param delta_t: time step [s]. The time step of the boat if None
+        :param cache_dir: folder the reachable sets are saved in. None to not cache the set
+        :return: the reachable set
+        """
+        if propeller_angles is None:
+            propeller_angles = np.linspace(boat.state_dict['delta_max'][0], boat.state_dict['delta_max'][1], 51)
+        if powers is None:
+            powers = [boat.state_dict['power']]
+        if delta_t is None:
+            delta_t = boat.state_dict['delta_t']
+
+        if cache_dir is None:
+            return ReachableSet.compute(boat, start, speeds, headings, propeller_angles, powers, horizon, delta_t)
+
+        key = ReachableSet.get_cache_key(boat, start, speeds, headings, propeller_angles, powers, horizon, delta_t)
+        file_name = os.path.join(cache_dir, 'reachable_set_' + key + '.npz')
+        if os.path.exists(file_name):
+            return ReachableSet.load(file_name)
+
+        rs = ReachableSet.compute(boat, start, speeds, headings, propeller_angles, powers, horizon, delta_t)
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file first so another process never loads a partially written set
+        tmp_file_name = os.path.join(cache_dir, 'reachable_set_' + key + '_' + str(os.getpid()) + '.tmp.npz')
+        rs.save(tmp_file_name)
+        os.replace(tmp_file_name, file_name)
+        return rs
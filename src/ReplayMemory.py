@@ -6,6 +6,7 @@ Class that stores the experience tuples captured by the agent during training.
 # native modules
 from collections import namedtuple
 import random
+import threading
 
 # 3rd party modules
 import numpy as np
@@ -19,7 +20,7 @@ def convert_numpy_to_tensor(device, arr):
     :param arr:
     :return:
     """
-    tmp = torch.tensor([arr], device=device, dtype=torch.float)
+    tmp = torch.tensor(np.asarray([arr], dtype=np.float32), device=device)
     return tmp.view(tmp.size(), -1)
 
 
@@ -45,6 +46,10 @@ class ReplayStorage:
         # initialize the replay buffers
         self.buffers = dict()
         self.interim_buffer = None
+        self.slot_buffers = dict()  # interim buffers of each slot of a vectorized environment
+        # guards the replay buffers so a learner thread can sample while episodes are sorted into them
+        self.lock = threading.Lock()
+        self.n_transitions = 0  # total number of transitions that have been sorted into the replay buffers
         self.strategy_initializer(self.transition)
 
     def set_transition(self, extra_fields):
@@ -134,59 +139,99 @@ class ReplayStorage:
         """
         self.interim_buffer.push(*args)
 
-    def sort_data_into_buffers(self):
+    def push_batch(self, device, slots, transitions):
+        """
+        pushes the transitions of several slots of a vectorized environment at once. Each field is converted to one
+        tensor for all of the transitions, and the rows are pushed into the interim buffers of their slots. The rows
+        have the same shape as tensors from convert_numpy_to_tensor.
+
+        :param device: device the tensors are created on
+        :param slots: the slot of each transition
+        :param transitions: list of tuples of the state, action, next state, reward, is terminal, and the outcome as
+            lists and floats
+        :return:
+        """
+        if len(transitions) == 0:
+            return
+
+        states, actions, next_states, rewards, is_terminals, outcomes = zip(*transitions)
+        tensors = [torch.tensor(np.asarray(field, dtype=float), device=device, dtype=torch.float)
+                   for field in (states, actions, next_states)]
+        tensors.append(torch.tensor(np.asarray(rewards, dtype=float)[:, np.newaxis], device=device, dtype=torch.float))
+        tensors.append(torch.tensor(np.asarray(is_terminals, dtype=float)[:, np.newaxis], device=device, dtype=torch.float))
+
+        for i, slot in enumerate(slots):
+            if slot not in self.slot_buffers:
+                self.slot_buffers[slot] = ReplayMemory(self.capacity, self.transition, 'interim_' + str(slot))
+            row = [tensor[i:i + 1] for tensor in tensors]
+            if self.strategy == 'outcome':
+                row.append(outcomes[i])
+            self.slot_buffers[slot].push(*row)
+
+    def sort_data_into_buffers(self, slot=None):
         """
         The data that has been accumulated over the course of an episode is sorted into the correct replay buffers
         based on the storage strategy being used. It is assumed this function is called after the completion of an
         episode.
 
+        :param slot: the slot of a vectorized environment whose episode completed. None for the interim buffer
         :return:
         """
+        if slot is None:
+            interim_buffer = self.interim_buffer
+        else:
+            interim_buffer = self.slot_buffers.pop(slot, None)
+            if interim_buffer is None:
+                # the episode did not complete an agent step
+                return
+
+        with self.lock:
+            self.n_transitions += len(interim_buffer.memory)
+            if self.strategy == 'all_in_one':
+                for data in interim_buffer.memory:
+                    if len(self.buffers['only']) < self.capacity:
+                        self.buffers['only'].memory.append(None)
+                    self.buffers['only'].memory[self.position['only']] = data
+                    self.position['only'] = (self.position['only'] + 1) % self.capacity
+            elif self.strategy == 'proximity':
+
+                # get the proximity threshold from the hyper-parameters
+                prox_thresh = self.h_params['replay_data']['proximity_threshold']
+
+                # iterate through the data to sort it into the correct buffer
+                for data in interim_buffer.memory:
+
+                    # determine what buffer the data should be in
+                    if data.prox <= prox_thresh:
+                        tag = 'close'
+                    else:
+                        tag = 'far'
 
-        if self.strategy == 'all_in_one':
-            for data in self.interim_buffer.memory:
-                if len(self.buffers['only']) < self.capacity:
-                    self.buffers['only'].memory.append(None)
-                self.buffers['only'].memory[self.position['only']] = data
-                self.position['only'] = (self.position['only'] + 1) % self.capacity
-        elif self.strategy == 'proximity':
-
-            # get the proximity threshold from the hyper-parameters
-            prox_thresh = self.h_params['replay_data']['proximity_threshold']
-
-            # iterate through the data to sort it into the correct buffer
-            for data in self.interim_buffer.memory:
-
-                # determine what buffer the data should be in
-                if data.prox <= prox_thresh:
-                    tag = 'close'
-                else:
-                    tag = 'far'
-
-                # add the data point to the buffer
-                buffer = self.buffers[tag].memory
-                if len(buffer) < self.capacity:
-                    buffer.append(None)
-                buffer[self.position[tag]] = data
-                self.position[tag] = (self.position[tag] + 1) % self.capacity
+                    # add the data point to the buffer
+                    buffer = self.buffers[tag].memory
+                    if len(buffer) < self.capacity:
+                        buffer.append(None)
+                    buffer[self.position[tag]] = data
+                    self.position[tag] = (self.position[tag] + 1) % self.capacity
 
-        elif self.strategy == 'outcome':
+            elif self.strategy == 'outcome':
 
-            # get the last data point to determine the outcome
-            tag = self.interim_buffer.memory[-1].outcome
-            # iterate through the data to sort it into the correct buffer
+                # get the last data point to determine the outcome
+                tag = interim_buffer.memory[-1].outcome
+                # iterate through the data to sort it into the correct buffer
 
-            for data in self.interim_buffer.memory:
+                for data in interim_buffer.memory:
 
-                buffer = self.buffers[tag].memory
+                    buffer = self.buffers[tag].memory
 
-                # add the data point to the buffer
-                if len(buffer) < self.capacity:
-                    buffer.append(None)
-                buffer[self.position[tag]] = data
-                self.position[tag] = (self.position[tag] + 1) % self.capacity
+                    # add the data point to the buffer
+                    if len(buffer) < self.capacity:
+                        buffer.append(None)
+                    buffer[self.position[tag]] = data
+                    self.position[tag] = (self.position[tag] + 1) % self.capacity
 
-        self.reset_interim_buffer()
+        if slot is None:
+            self.reset_interim_buffer()
 
     def reset_interim_buffer(self):
         """
@@ -208,12 +253,25 @@ class ReplayStorage:
         :return:
         """
         # remove all data form each buffer
-        self.strategy_initializer(self.transition)
+        with self.lock:
+            self.strategy_initializer(self.transition)
+            self.slot_buffers = dict()
 
     def sample(self, batch_size):
         """
         given a request for the number of samples, a batch of data is taken from the replay buffers based on the
-        strategy. The distributions from each buffer are specified in the input file.
+        strategy. The distributions from each buffer are specified in the input file. The buffers are locked while the
+        batch is drawn, so the batch is a consistent snapshot even while another thread sorts data into them.
+
+        :param batch_size: the number of data tuples tp sample from the replay buffers to train over
+        :return:
+        """
+        with self.lock:
+            return self.sample_buffers(batch_size)
+
+    def sample_buffers(self, batch_size):
+        """
+        draws a batch from the replay buffers without locking them. See sample
 
         :param batch_size: the number of data tuples tp sample from the replay buffers to train over
         :return:
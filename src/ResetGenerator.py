@@ -0,0 +1,136 @@
+"""
+Draws the random initial conditions of training episodes in batches. The destination, the river boats, and the static
+circle obstacles of many episodes are placed at once. Candidate positions are drawn as arrays, and the spacing to the
+destination and to the movers that are already placed is checked with vectorized distances, so the cost of a reset does
+not grow with a python loop over every mover for every candidate. The episodes of a batch are handed out one at a time,
+and a new batch is drawn when they run out.
+
+"""
+
+# native packages
+
+# 3rd party packages
+import numpy as np
+
+# own packages
+
+
+class ResetGenerator:
+
+    def __init__(self, domain, batch_size=64, min_boat_distance=30.0, n_candidates=16, max_rounds=1000):
+        """
+        :param domain: length of the sides of the square the destination and the movers are placed in [m]
+        :param batch_size: the number of episodes that are drawn at once
+        :param min_boat_distance: the distance a boat must start beyond from the destination [m]
+        :param n_candidates: the number of candidate positions drawn per episode in one round of rejection sampling
+        :param max_rounds: the rounds of rejection sampling before the placement is given up on
+        """
+        if batch_size < 1:
+            raise ValueError('At least one reset must be drawn per batch')
+
+        self.domain = domain
+        self.batch_size = batch_size
+        self.min_boat_distance = min_boat_distance
+        self.n_candidates = n_candidates
+        self.max_rounds = max_rounds
+        self.resets = []  # the drawn resets that have not been used yet
+
+    def get_reset(self, mover_dict):
+        """
+        gets the initial conditions of the next episode, drawing a new batch when needed
+
+        :param mover_dict: the movers of the environment. Their names and radii decide what is drawn
+        :return: dictionary with the destination and a dictionary of initial values for each mover, see generate
+        """
+        if len(self.resets) == 0:
+            self.resets = self.generate(mover_dict, self.batch_size)
+            # hand the resets out in the order they were drawn
+            self.resets.reverse()
+        return self.resets.pop()
+
+    def generate(self, mover_dict, n_resets):
+        """
+        draws the initial conditions of several episodes. The destination is placed first, then every river boat is
+        placed further than min_boat_distance from the destination, then the static circles are placed one after
+        another further than twice their radius from the destination, the boats, and the circles placed before them.
+
+        Values of a boat that depend on its limits are drawn as fractions: delta_fraction in [-1, 1) of the largest
+        propeller angle and power_fraction in [0, 1) of the maximum power.
+
+        :param mover_dict: the movers of the environment
+        :param n_resets: the number of episodes
+        :return: list of dictionaries, one per episode, with 'destination' and a dictionary of values for each mover
+        """
+        boat_names = []
+        circle_names = []
+        for name, mover in mover_dict.items():
+            if 'river_boat' in name:
+                boat_names.append(name)
+            elif 'static_circle' in name:
+                circle_names.append(name)
+            else:
+                raise ValueError('Mover not currently supported')
+
+        destination = np.random.random((n_resets, 2)) * self.domain
+
+        # positions of the movers that have been placed, used to space out the movers placed after them
+        placed = np.empty((n_resets, 0, 2))
+
+        boats = dict()
+        for name in boat_names:
+            position = self.sample_positions(destination, placed, self.min_boat_distance, 0.0)
+            placed = np.concatenate([placed, position[:, np.newaxis, :]], axis=1)
+            draws = np.random.random((n_resets, 5))
+            boats[name] = {'x_pos': position[:, 0], 'y_pos': position[:, 1], 'psi': draws[:, 0] * 2.0 * np.pi,
+                           'delta_fraction': (draws[:, 1] - 0.5) * 2.0, 'v_xp': draws[:, 2],
+                           'v_yp': draws[:, 3] - 0.5, 'power_fraction': draws[:, 4]}
+
+        circles = dict()
+        for name in circle_names:
+            spacing = mover_dict[name].state_dict['radius'] * 2.0
+            position = self.sample_positions(destination, placed, spacing, spacing)
+            placed = np.concatenate([placed, position[:, np.newaxis, :]], axis=1)
+            circles[name] = {'x_pos': position[:, 0], 'y_pos': position[:, 1]}
+
+        resets = []
+        for i in range(n_resets):
+            reset = {'destination': [destination[i, 0], destination[i, 1]]}
+            for name, values in boats.items():
+                reset[name] = dict((key, value[i]) for key, value in values.items())
+            for name, values in circles.items():
+                reset[name] = dict((key, value[i]) for key, value in values.items())
+            resets.append(reset)
+        return resets
+
+    def sample_positions(self, destination, placed, destination_spacing, mover_spacing):
+        """
+        rejection samples one position per episode. Each round draws n_candidates positions for every episode that is
+        still unplaced and keeps the first one that is far enough from the destination and the placed movers.
+
+        :param destination: array of shape (n, 2) of the destination of each episode [m]
+        :param placed: array of shape (n, m, 2) of the movers already placed in each episode [m]
+        :param destination_spacing: a position must be further than this from the destination [m]
+        :param mover_spacing: a position must be further than this from every placed mover [m]
+        :return: array of shape (n, 2) of the positions [m]
+        """
+        positions = np.empty_like(destination)
+        remaining = np.arange(len(destination))
+        for _ in range(self.max_rounds):
+            candidates = np.random.random((len(remaining), self.n_candidates, 2)) * self.domain
+
+            delta = candidates - destination[remaining, np.newaxis, :]
+            is_valid = np.hypot(delta[..., 0], delta[..., 1]) > destination_spacing
+            if placed.shape[1] > 0 and mover_spacing > 0.0:
+                delta = candidates[:, :, np.newaxis, :] - placed[remaining, np.newaxis, :, :]
+                is_valid &= np.all(np.hypot(delta[..., 0], delta[..., 1]) > mover_spacing, axis=2)
+
+            is_placed = np.any(is_valid, axis=1)
+            first = np.argmax(is_valid, axis=1)
+            rows = np.flatnonzero(is_placed)
+            positions[remaining[rows]] = candidates[rows, first[rows]]
+            remaining = remaining[~is_placed]
+            if len(remaining) == 0:
+                return positions
+
+        raise ValueError('Could not place the movers apart from each other in the domain. The domain may be too small '
+                         'for the number and size of the obstacles')
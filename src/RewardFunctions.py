@@ -11,6 +11,7 @@ from abc import ABC, abstractmethod
 
 # own packages
 import numpy as np
+import src.Proximity as Proximity
 
 
 def select_reward_function(h_params, ao):
@@ -91,6 +92,8 @@ class RewardFunction(ABC):
         self.is_crashed = False  # boolean for if the mover has crashed
         self.is_success = False  # boolean for if destination has been reached
         self.goal_dist = goal_dist  # distance to destination that denotes success [m]
+        self.proximity = None  # Proximity.ProximityService shared with the environment, updated every step
+        self.private_proximity = None  # service owned by the reward function when none is shared. Rebuilt after reset
 
     @abstractmethod
     def get_reward(self, t, mover_dict):
@@ -112,6 +115,26 @@ class RewardFunction(ABC):
         """
         pass
 
+    def get_proximity(self, mover_dict):
+        """
+        gets the proximity service for the collision checks. The service shared by the environment is used when one is
+        attached, as the environment already updates it every step. Otherwise the reward function keeps a private
+        service that is built from the movers after a reset and updated here, so the reward function also works outside
+        of an environment.
+
+        :param mover_dict: dictionary containing all of the mover information
+        :return: the proximity service
+        """
+        if self.proximity is not None:
+            return self.proximity
+
+        if self.private_proximity is None:
+            self.private_proximity = Proximity.ProximityService()
+            self.private_proximity.reset(mover_dict)
+        else:
+            self.private_proximity.update(mover_dict)
+        return self.private_proximity
+
     def get_terminal(self):
         """
         returns a boolean for if the goal state has been reached
@@ -163,24 +186,12 @@ class InstantStepCrashSuccessReward(RewardFunction):
                     self.is_success = True
                     reward += self.success_reward
 
-                # check if crashed
-                min_dst = np.infty
-                for sensor in mover.sensors:
-                    raw = sensor.get_raw_measurements()
-                    raw_keys = raw.keys()
-                    dst_key = [key for key in raw_keys if 'dist' in key][0]
-                    if raw[dst_key] < min_dst:
-                        min_dst = raw[dst_key]
-
-                # check if minimum distance is less than size of any obstacles
-                for tmp_name, tmp_mover in mover_dict.items():
-                    if tmp_name != name:
-                        # not the same mover. Calculations currently only support circle obstacles
-                        if tmp_mover.state_dict['radius'] >= min_dst and min_dst >= 1e-3:
-                            # boat has crashed
-                            self.is_terminal = True
-                            self.is_crashed = True
-                            reward = self.crash_reward
+                # check if the boat overlaps any obstacle
+                if self.get_proximity(mover_dict).is_colliding(name):
+                    # boat has crashed
+                    self.is_terminal = True
+                    self.is_crashed = True
+                    reward = self.crash_reward
 
         # if the boat is over 300 meters away from the goal, end the simulation. It is assumed that if the boat goes
         # too far it will not return and this saves computation
@@ -205,6 +216,7 @@ class InstantStepCrashSuccessReward(RewardFunction):
         self.is_crashed = False
         self.is_success = False
         self.is_terminal = False
+        self.private_proximity = None
 
 
 class InstantStepHeadingCrashSuccessReward(RewardFunction):
@@ -267,24 +279,12 @@ class InstantStepHeadingCrashSuccessReward(RewardFunction):
                 #                np.pi - abs(mover.state_dict['mu'])) * self.heading_reward
                 self.heading_old = mover.state_dict['mu']
 
-                # check if crashed
-                min_dst = np.infty
-                for sensor in mover.sensors:
-                    raw = sensor.get_raw_measurements()
-                    raw_keys = raw.keys()
-                    dst_key = [key for key in raw_keys if 'dist' in key][0]
-                    if raw[dst_key] < min_dst:
-                        min_dst = raw[dst_key]
-
-                # check if minimum distance is less than size of any obstacles
-                for tmp_name, tmp_mover in mover_dict.items():
-                    if tmp_name != name:
-                        # not the same mover. Calculations currently only support circle obstacles
-                        if tmp_mover.state_dict['radius'] >= min_dst and min_dst >= 1e-3:
-                            # boat has crashed
-                            self.is_terminal = True
-                            self.is_crashed = True
-                            reward = self.crash_reward
+                # check if the boat overlaps any obstacle
+                if self.get_proximity(mover_dict).is_colliding(name):
+                    # boat has crashed
+                    self.is_terminal = True
+                    self.is_crashed = True
+                    reward = self.crash_reward
 
         # if the boat is over 300 meters away from the goal, end the simulation. It is assumed that if the boat goes
         # too far it will not return and this saves computation
@@ -310,6 +310,7 @@ class InstantStepHeadingCrashSuccessReward(RewardFunction):
         self.is_crashed = False
         self.is_success = False
         self.is_terminal = False
+        self.private_proximity = None
 
 
 class InstantSuccessReward(RewardFunction):
@@ -347,24 +348,12 @@ class InstantSuccessReward(RewardFunction):
                     self.is_success = True
                     reward += self.success_reward
 
-                # check if crashed
-                min_dst = np.infty
-                for sensor in mover.sensors:
-                    raw = sensor.get_raw_measurements()
-                    raw_keys = raw.keys()
-                    dst_key = [key for key in raw_keys if 'dist' in key][0]
-                    if raw[dst_key] < min_dst:
-                        min_dst = raw[dst_key]
-
-                # check if minimum distance is less than size of any obstacles
-                for tmp_name, tmp_mover in mover_dict.items():
-                    if tmp_name != name:
-                        # not the same mover. Calculations currently only support circle obstacles
-                        if tmp_mover.state_dict['radius'] >= min_dst:
-                            # boat has crashed
-                            self.is_terminal = True
-                            self.is_crashed = True
-                            reward += self.crash_reward
+                # check if the boat overlaps any obstacle
+                if self.get_proximity(mover_dict).is_colliding(name):
+                    # boat has crashed
+                    self.is_terminal = True
+                    self.is_crashed = True
+                    reward += self.crash_reward
 
 
         return reward / self.total_norm_factor
@@ -380,6 +369,7 @@ class InstantSuccessReward(RewardFunction):
         self.is_crashed = False
         self.is_success = False
         self.is_terminal = False
+        self.private_proximity = None
 
 
 class MultiStepReward(RewardFunction):
@@ -440,24 +430,12 @@ class MultiStepCrashSuccessCloserHeadingReward(MultiStepReward):
                     self.is_success = True
                     self.cumulative_reward += self.success_reward
 
-                # check if crashed
-                min_dst = np.infty
-                for sensor in mover.sensors:
-                    raw = sensor.get_raw_measurements()
-                    raw_keys = raw.keys()
-                    dst_key = [key for key in raw_keys if 'dist' in key][0]
-                    if raw[dst_key] < min_dst:
-                        min_dst = raw[dst_key]
-
-                # check if minimum distance is less than size of any obstacles
-                for tmp_name, tmp_mover in mover_dict.items():
-                    if tmp_name != name:
-                        # not the same mover. Calculations currently only support circle obstacles
-                        if tmp_mover.state_dict['radius'] >= min_dst:
-                            # boat has crashed
-                            self.is_terminal = True
-                            self.is_crashed = True
-                            self.cumulative_reward += self.crash_reward
+                # check if the boat overlaps any obstacle
+                if self.get_proximity(mover_dict).is_colliding(name):
+                    # boat has crashed
+                    self.is_terminal = True
+                    self.is_crashed = True
+                    self.cumulative_reward += self.crash_reward
 
 
         # check if the agent step has fully taken place
@@ -488,6 +466,7 @@ class MultiStepCrashSuccessCloserHeadingReward(MultiStepReward):
         self.is_crashed = False
         self.is_success = False
         self.is_terminal = False
+        self.private_proximity = None
         self.last_reward_time = 0.0
         self.cumulative_reward = 0.0
 
@@ -529,16 +508,12 @@ class MultiStepCrashSuccessReward(MultiStepReward):
                     self.is_success = True
                     self.cumulative_reward += self.success_reward
 
-                # check if minimum distance is less than size of any obstacles
-                for tmp_name, tmp_mover in mover_dict.items():
-                    if tmp_name != name:
-                        # not the same mover. Calculations currently only support circle obstacles
-                        tmp_dst = np.sqrt( (tmp_mover.state_dict['x_pos']-mover.state_dict['x_pos'])**2 + (tmp_mover.state_dict['y_pos']-mover.state_dict['y_pos'])**2)
-                        if tmp_mover.state_dict['radius'] >= tmp_dst:
-                            # boat has crashed
-                            self.is_terminal = True
-                            self.is_crashed = True
-                            self.cumulative_reward += self.crash_reward
+                # check if the boat overlaps any obstacle
+                if self.get_proximity(mover_dict).is_colliding(name):
+                    # boat has crashed
+                    self.is_terminal = True
+                    self.is_crashed = True
+                    self.cumulative_reward += self.crash_reward
 
 
         # check if the agent step has fully taken place
@@ -563,6 +538,7 @@ class MultiStepCrashSuccessReward(MultiStepReward):
         self.is_crashed = False
         self.is_success = False
         self.is_terminal = False
+        self.private_proximity = None
         self.last_reward_time = 0.0
         self.cumulative_reward = 0.0
 
@@ -602,24 +578,11 @@ class MultiStepSuccessReward(MultiStepReward):
                     self.is_success = True
                     self.cumulative_reward += self.success_reward
 
-                # check if crashed
-                min_dst = np.infty
-                for sensor in mover.sensors:
-                    raw = sensor.get_raw_measurements()
-                    raw_keys = raw.keys()
-                    dst_key = [key for key in raw_keys if 'dist' in key][0]
-                    if raw[dst_key] < min_dst:
-                        min_dst = raw[dst_key]
-
-                # check if minimum distance is less than size of any obstacles
-                for tmp_name, tmp_mover in mover_dict.items():
-                    if tmp_name != name:
-                        # not the same mover. Calculations currently only support circle obstacles
-                        if tmp_mover.state_dict['radius'] >= min_dst:
-                            # boat has crashed
-                            self.is_terminal = True
-                            self.is_crashed = True
-                            self.cumulative_reward += self.crash_reward
+                # check if the boat overlaps any obstacle
+                if self.get_proximity(mover_dict).is_colliding(name):
+                    # boat has crashed. This reward function has no crash reward, so the episode only ends
+                    self.is_terminal = True
+                    self.is_crashed = True
 
         # check if the agent step has fully taken place
         reward = 0.0
@@ -648,5 +611,6 @@ class MultiStepSuccessReward(MultiStepReward):
         self.is_crashed = False
         self.is_success = False
         self.is_terminal = False
+        self.private_proximity = None
         self.last_reward_time = 0.0
         self.cumulative_reward = 0.0
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""
+Rollout worker processes that collect training episodes for a central learner. Each worker builds its own copy of the
+environment from the hyperparameters and acts with a cpu copy of the policy networks. Finished episodes are sent to the
+learner through a queue as plain transition lists, and the learner sends new policy weights back. Worker i runs the
+training episodes i, i+n, i+2n, ... so the episode numbers that drive the exploration schedules in ActionOperation are
+the same as in a single process training. The evaluation set can be run by a separate pool of evaluation workers that
+split its rows between them.
+
+"""
+
+# native packages
+import multiprocessing
+import queue
+
+# 3rd party packages
+import numpy as np
+import torch
+
+# own packages
+
+
+def run_worker(env, worker_id, n_workers, num_episodes, weight_queue, episode_queue):
+    """
+    the loop of a rollout worker process. The first message from the learner is the policy weights. After that, newer
+    weights are loaded between episodes, and a None message stops the worker.
+
+    :param env: an Environment.Environment that has only been created from the hyperparameters
+    :param worker_id: index of the worker
+    :param n_workers: total number of workers
+    :param num_episodes: total number of training episodes
+    :param weight_queue: queue the learner puts the policy weights of this worker on
+    :param episode_queue: queue the finished episodes of every worker are put on
+    :return:
+    """
+    # the workers scale by running on separate cores, so each one uses a single thread
+    torch.set_num_threads(1)
+    seed = env.h_params['scenario'].get('seed', None)
+    if seed is None:
+        np.random.seed()
+    else:
+        np.random.seed(int(seed) + worker_id)
+
+    env.device = 'cpu'
+    reset_to_max_power = env.build_simulation()
+
+    weights = weight_queue.get()
+    if weights is None:
+        return
+    env.agent.set_policy_weights(weights)
+
+    ep_num = worker_id
+    while ep_num < num_episodes:
+
+        # use the newest weights from the learner
+        while True:
+            try:
+                weights = weight_queue.get_nowait()
+            except queue.Empty:
+                break
+            if weights is None:
+                return
+            env.agent.set_policy_weights(weights)
+
+        progress = env.begin_episode(ep_num, is_evaluation=False, reset_to_max_power=reset_to_max_power)
+        transitions = []
+        while not progress.is_done():
+            transitions.extend(env.advance(progress, progress.max_steps)[5])
+
+        episode_results = env.end_episode(progress)
+        env.write_history(ep_num, is_evaluation=False)
+
+        episode_queue.put((worker_id, ep_num, transitions, episode_results))
+        ep_num += n_workers
+
+    # let the learner know this worker has finished its episodes
+    episode_queue.put((worker_id, None, None, None))
+
+
+class RolloutWorkers:
+
+    def __init__(self, env, n_workers, num_episodes):
+        """
+        a pool of rollout worker processes. The processes are spawned rather than forked so a learner that uses cuda
+        can start them. Queues are used in both directions so neither side blocks on a send while the other is busy.
+
+        :param env: an Environment.Environment that has only been created from the hyperparameters. It is copied to
+            each worker
+        :param n_workers: number of worker processes
+        :param num_episodes: total number of training episodes
+        """
+        if n_workers < 1:
+            raise ValueError('At least one rollout worker is needed')
+
+        context = multiprocessing.get_context('spawn')
+        self.episode_queue = context.Queue()
+        self.weight_queues = []
+        self.processes = []
+        for worker_id in range(n_workers):
+            weight_queue = context.Queue()
+            process = context.Process(target=run_worker, args=(env, worker_id, n_workers, num_episodes, weight_queue,
+                                                               self.episode_queue), daemon=True)
+            self.weight_queues.append(weight_queue)
+            self.processes.append(process)
+        self.is_running = [True] * n_workers
+
+    def start(self, weights):
+        """
+        starts the workers and sends them the initial policy weights
+
+        :param weights: weights from LearningAlgorithms.get_policy_weights
+        :return:
+        """
+        for process in self.processes:
+            process.start()
+        self.send_weights(weights)
+
+    def send_weights(self, weights):
+        """
+        sends new policy weights to every worker that is still running
+
+        :param weights: weights from LearningAlgorithms.get_policy_weights
+        :return:
+        """
+        for worker_id, weight_queue in enumerate(self.weight_queues):
+            if self.is_running[worker_id]:
+                weight_queue.put(weights)
+
+    def get_episodes(self):
+        """
+        yields the episodes as the workers finish them, until every worker has finished
+
+        :return: generator of tuples of the worker id, the episode number, the transitions, and the episode results as
+            returned from Environment.run_simulation
+        """
+        while any(self.is_running):
+            try:
+                worker_id, ep_num, transitions, episode_results = self.episode_queue.get(timeout=1.0)
+            except queue.Empty:
+                for worker_id, process in enumerate(self.processes):
+                    if self.is_running[worker_id] and not process.is_alive():
+                        raise ValueError('Rollout worker {} stopped before finishing its episodes'.format(worker_id))
+                continue
+
+            if ep_num is None:
+                self.is_running[worker_id] = False
+            else:
+                yield worker_id, ep_num, transitions, episode_results
+
+    def close(self):
+        """
+        stops the workers
+
+        :return:
+        """
+        for worker_id, weight_queue in enumerate(self.weight_queues):
+            if self.processes[worker_id].is_alive():
+                weight_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=10.0)
+            if process.is_alive():
+                process.terminate()
+
+
+def run_evaluation_worker(env, task_queue, result_queue):
+    """
+    the loop of an evaluation worker process. Each task is the episode number, the policy weights, and the rows of the
+    evaluation set to run with them. A None task stops the worker.
+
+    :param env: an Environment.Environment that has only been created from the hyperparameters
+    :param task_queue: queue the tasks of this worker are put on
+    :param result_queue: queue the results of every worker are put on
+    :return:
+    """
+    # single threaded so the results are the same for any number of workers
+    torch.set_num_threads(1)
+
+    env.device = 'cpu'
+    reset_to_max_power = env.build_simulation()
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+        ep_num, weights, rows = task
+
+        env.agent.set_policy_weights(weights)
+        for row in rows:
+            episode_results = env.run_evaluation_episode(ep_num, row, reset_to_max_power)
+            result_queue.put((row, episode_results))
+
+
+class EvaluationWorkers:
+
+    def __init__(self, env, n_workers):
+        """
+        a pool of processes that run the evaluation set. The processes are started once and reused for every
+        evaluation, since building the environment is slow compared to an evaluation episode.
+
+        :param env: an Environment.Environment that has only been created from the hyperparameters. It is copied to
+            each worker
+        :param n_workers: number of worker processes
+        """
+        if n_workers < 1:
+            raise ValueError('At least one evaluation worker is needed')
+
+        context = multiprocessing.get_context('spawn')
+        self.result_queue = context.Queue()
+        self.task_queues = []
+        self.processes = []
+        for worker_id in range(n_workers):
+            task_queue = context.Queue()
+            process = context.Process(target=run_evaluation_worker, args=(env, task_queue, self.result_queue),
+                                      daemon=True)
+            process.start()
+            self.task_queues.append(task_queue)
+            self.processes.append(process)
+
+    def run(self, ep_num, weights, n_evaluations):
+        """
+        runs the evaluation set with frozen weights. The rows are dealt out to the workers in turn.
+
+        :param ep_num: the episode number in the training
+        :param weights: weights from LearningAlgorithms.get_policy_weights
+        :param n_evaluations: the number of rows in the evaluation set
+        :return: list of the results of each row as returned from Environment.run_simulation, in the order of the rows
+        """
+        n_workers = len(self.task_queues)
+        for worker_id, task_queue in enumerate(self.task_queues):
+            rows = list(range(worker_id, n_evaluations, n_workers))
+            if len(rows) > 0:
+                task_queue.put((ep_num, weights, rows))
+
+        evaluation_results = [None] * n_evaluations
+        n_received = 0
+        while n_received < n_evaluations:
+            try:
+                row, episode_results = self.result_queue.get(timeout=1.0)
+            except queue.Empty:
+                for worker_id, process in enumerate(self.processes):
+                    if not process.is_alive():
+                        raise ValueError('Evaluation worker {} stopped before finishing the evaluation set'.format(worker_id))
+                continue
+            evaluation_results[row] = episode_results
+            n_received += 1
+
+        return evaluation_results
+
+    def close(self):
+        """
+        stops the workers
+
+        :return:
+        """
+        for worker_id, task_queue in enumerate(self.task_queues):
+            if self.processes[worker_id].is_alive():
+                task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=10.0)
+            if process.is_alive():
+                process.terminate()
@@ -12,6 +12,7 @@ import numpy as np
 import pandas as pd
 
 # own packages
+import src.SpatialIndex as SpatialIndex
 
 
 class Sensor(ABC):
@@ -25,6 +26,7 @@ class Sensor(ABC):
         self.name = name
         self.mover_owner_name = mover_owner_name
         self.measurement_dict = OrderedDict()
+        self.proximity = None  # Proximity.ProximityService shared with the environment, if the sensor is in one
 
     @abstractmethod
     def init_measurement_dict(self):
@@ -34,6 +36,16 @@ class Sensor(ABC):
         """
         pass
 
+    def reset(self, mover_dict):
+        """
+        called when the environment is reset and the movers have been placed, before the first measurement of the
+        episode. Sensors override this to prepare data that only changes between episodes.
+
+        :param mover_dict: ordered dictionary that has all of the movers in the simulation
+        :return:
+        """
+        pass
+
     @abstractmethod
     def calc_measurements(self, mover_dict):
         """
@@ -61,24 +73,63 @@ class Sensor(ABC):
         """
         pass
 
+    def write_norm_measurements(self, out):
+        """
+        writes the current normalized measurements into a slice of an observation buffer, in the order of
+        get_norm_measurements. Sensors override this to skip building the dictionary.
+
+        :param out: array of length n_measurements
+        :return:
+        """
+        out[:] = list(self.get_norm_measurements().values())
+
+    def write_raw_measurements(self, out):
+        """
+        writes the current raw measurements into a slice of a history row, in the order of get_raw_measurements.
+        Sensors override this to skip building the dictionary.
+
+        :param out: array of length n_measurements
+        :return:
+        """
+        out[:] = list(self.get_raw_measurements().values())
+
 
 class ProcessedLidar(Sensor):
 
-    def __init__(self,base_range, base_theta,name, measurement_norm_df, mover_owner_name):
+    def __init__(self,base_range, base_theta,name, measurement_norm_df, mover_owner_name, n_nearest=1):
         """
         a sensor that observes the distance and angle of an object. It is assumed that beams would be used to get data
-        and the outout of the sensors is what some other processing is done to get the returned features.
+        and the outout of the sensors is what some other processing is done to get the returned features. The nearest
+        movers are reported, nearest first. They are found by the proximity service of the environment when there is
+        one, which keeps the static movers in a grid index. Otherwise the sensor builds its own grid index of the static
+        movers when it is reset, and the other movers are checked directly.
 
         :param base_range: the range returned if the sensor does not see an object
         :param base_theta: the angle to an obstacle that is returned if it does not see a mover
         :param name: a string for the name of the lidar sensor
         :param max_range: the maximum range of the sensor
         :param mover_owner_name:
+        :param n_nearest: the number of nearest movers that are reported
         """
         super().__init__(name, mover_owner_name)
+        if n_nearest < 1:
+            raise ValueError('A lidar must report at least one mover')
         self.measurement_norm_df = measurement_norm_df
         self.base_range = base_range
         self.base_theta = base_theta
+        self.n_nearest = n_nearest
+        # the normalization values looked up once instead of every measurement
+        self.max_range = measurement_norm_df[measurement_norm_df['name'] == 'max_range']['norm_value'].iloc[0]
+        self.max_theta = measurement_norm_df[measurement_norm_df['name'] == 'max_theta']['norm_value'].iloc[0]
+
+        # the suffix of the measurements of each of the nearest movers. One mover keeps the original names
+        if n_nearest == 1:
+            self.suffixes = ['']
+        else:
+            self.suffixes = ['_' + str(i) for i in range(n_nearest)]
+
+        self.static_index = None  # SpatialIndex.GridIndex of the static movers
+        self.dynamic_names = []  # names of the movers that are checked every measurement
 
         self.init_measurement_dict()
 
@@ -89,17 +140,41 @@ class ProcessedLidar(Sensor):
 
         :return:
         """
+        for suffix in self.suffixes:
+            self.measurement_dict['theta' + suffix] = 0.0  # [rad]
+            self.measurement_dict['theta_norm' + suffix] = 0.0  # [rad]
+            self.measurement_dict['dist' + suffix] = 0.0  # [m]
+            self.measurement_dict['dist_norm' + suffix] = 0.0  # [m]
+        self.n_measurements = 2 * self.n_nearest
+
+    def reset(self, mover_dict):
+        """
+        builds the grid index of the static movers from where they were placed for the episode. Not needed when the
+        distances come from a proximity service
+
+        :param mover_dict: ordered dictionary that has all of the movers in the simulation
+        :return:
+        """
+        if self.proximity is not None:
+            return
 
-        self.measurement_dict['theta'] = 0.0  # [rad]
-        self.measurement_dict['theta_norm'] = 0.0  # [rad]
-        self.measurement_dict['dist'] = 0.0  # [m]
-        self.measurement_dict['dist_norm'] = 0.0  # [m]
-        self.n_measurements = 2
+        points = []
+        self.dynamic_names = []
+        for name, mover in mover_dict.items():
+            if name == self.mover_owner_name:
+                # lidar does not obesrve it self
+                continue
+            if mover.is_static:
+                points.append((mover.state_dict['x_pos'], mover.state_dict['y_pos']))
+            else:
+                self.dynamic_names.append(name)
+
+        self.static_index = SpatialIndex.GridIndex(np.reshape(points, (-1, 2)))
 
     def calc_measurements(self, mover_dict):
         """
-        gets the angle and distance to all other movers in the simulation. All the measurements are relative to the
-        mover the sensor belongs too.
+        gets the angle and distance to the nearest other movers in the simulation. All the measurements are relative to
+        the mover the sensor belongs too.
 
         :param mover_dict: ordered dictionary that has all of the movers in the simulation
         :return: an ordered dictionary for the measurements the lidar taks
@@ -108,49 +183,259 @@ class ProcessedLidar(Sensor):
         x_own = own_mover.state_dict['x_pos']
         y_own = own_mover.state_dict['y_pos']
 
-        # dictionary of measured observations
+        if self.proximity is not None:
+            # the distances of this step are already computed
+            columns, dst = self.proximity.get_nearest(self.mover_owner_name, self.n_nearest, self.max_range)
+            points = self.proximity.positions[columns]
+        else:
+            if self.static_index is None:
+                self.reset(mover_dict)
+
+            # the nearest static movers in range
+            idx, dst = self.static_index.query_nearest((x_own, y_own), self.n_nearest, self.max_range)
+            points = self.static_index.points[idx]
+
+        if self.proximity is None and len(self.dynamic_names) > 0:
+            # add the movers that are not in the index, and keep the nearest of both
+            dynamic_points = np.array([(mover_dict[name].state_dict['x_pos'], mover_dict[name].state_dict['y_pos'])
+                                       for name in self.dynamic_names])
+            dynamic_dst = np.hypot(dynamic_points[:, 0] - x_own, dynamic_points[:, 1] - y_own)
+            points = np.concatenate([points, dynamic_points])
+            dst = np.concatenate([dst, dynamic_dst])
+            sort_idx = np.argsort(dst, kind='stable')
+            sort_idx = sort_idx[dst[sort_idx] <= self.max_range][:self.n_nearest]
+            points = points[sort_idx]
+            dst = dst[sort_idx]
+
+        for i, suffix in enumerate(self.suffixes):
+            if i < len(dst):
+                self.measurement_dict['theta' + suffix] = np.arctan2(points[i, 1] - y_own, points[i, 0] - x_own)
+                self.measurement_dict['dist' + suffix] = dst[i]
+            else:
+                self.measurement_dict['theta' + suffix] = self.base_theta
+                self.measurement_dict['dist' + suffix] = self.base_range
+
+            # normalize and save the normalized measurements
+            self.measurement_dict['theta_norm' + suffix] = self.measurement_dict['theta' + suffix]/self.max_theta
+            self.measurement_dict['dist_norm' + suffix] = self.measurement_dict['dist' + suffix]/self.max_range
 
-        for name, mover in mover_dict.items():
-            if name != self.mover_owner_name:
-                # lidar does not obesrve it self. Get the state information it wants
+    def get_raw_measurements(self):
+        """
+        gets the current measurements in their native units
+        :return:
+        """
+        raw = dict()
+        for suffix in self.suffixes:
+            raw[self.name + '_theta' + suffix] = self.measurement_dict['theta' + suffix]
+            raw[self.name + '_dist' + suffix] = self.measurement_dict['dist' + suffix]
+        return raw
+
+    def get_norm_measurements(self):
+        """
+        gets the current measurements in their native units
+        :return:
+        """
+        raw = dict()
+        for suffix in self.suffixes:
+            raw[self.name + '_theta' + suffix] = self.measurement_dict['theta_norm' + suffix]
+            raw[self.name + '_dst' + suffix] = self.measurement_dict['dist_norm' + suffix]
+        return raw
+
+    def write_norm_measurements(self, out):
+        """
+        writes the normalized angles and distances into a slice of an observation buffer
 
-                x_other = mover.state_dict['x_pos']
-                y_other = mover.state_dict['y_pos']
+        :param out: array of length n_measurements
+        :return:
+        """
+        for i, suffix in enumerate(self.suffixes):
+            out[2 * i] = self.measurement_dict['theta_norm' + suffix]
+            out[2 * i + 1] = self.measurement_dict['dist_norm' + suffix]
+
+
+class RayCastLidar(Sensor):
+
+    def __init__(self, name, measurement_norm_df, mover_owner_name, n_beams, field_of_view=2.0*np.pi):
+        """
+        a lidar that casts beams at evenly spaced angles around the heading of the mover and measures the range each
+        beam travels before it hits a circle obstacle. The beams of every circle are found and intersected with it in
+        one set of array operations, so the cost grows with the number of beams that hit something rather than with
+        the number of beams times the number of circles. A beam that hits nothing returns the maximum range.
 
-                theta = np.arctan2(y_other-y_own,x_other-x_own)
+        :param name: a string for the name of the lidar sensor
+        :param measurement_norm_df: data frame with the normalization value of 'max_range', which is also the longest
+            range a beam can measure
+        :param mover_owner_name: string name of the mover that the sensor is on
+        :param n_beams: the number of beams
+        :param field_of_view: the angle the beams are spread over, centered on the heading [rad]. A full circle spaces
+            the beams evenly all of the way around
+        """
+        super().__init__(name, mover_owner_name)
+        if n_beams < 1:
+            raise ValueError('A ray cast lidar needs at least one beam')
+        self.measurement_norm_df = measurement_norm_df
+        self.n_beams = n_beams
+        self.field_of_view = field_of_view
+        # the normalization values looked up once instead of every measurement
+        self.max_range = float(measurement_norm_df[measurement_norm_df['name'] == 'max_range']['norm_value'].iloc[0])
+        self.inv_max_range = 1.0 / self.max_range
+
+        # the beams are at first_angle + i * angle_step relative to the heading of the mover [rad]
+        self.is_full_circle = field_of_view >= 2.0 * np.pi
+        if self.is_full_circle:
+            self.first_angle = 0.0
+            self.angle_step = 2.0 * np.pi / n_beams
+        elif n_beams == 1:
+            self.first_angle = 0.0
+            self.angle_step = 2.0 * np.pi
+        else:
+            self.first_angle = -field_of_view / 2.0
+            self.angle_step = field_of_view / (n_beams - 1)
+        beam_angles = self.first_angle + self.angle_step * np.arange(n_beams)
+        self.cos_beams = np.cos(beam_angles)
+        self.sin_beams = np.sin(beam_angles)
+
+        self.x_circles = None  # centers of the circle obstacles [m]. None until the sensor is reset
+        self.y_circles = None
+        self.radii_sq = None  # squares of the radii of the circle obstacles [m^2]
+        self.is_circle_column = None  # if each column of a proximity service is a circle obstacle
+        self.max_circle_radius = 0.0  # largest radius of the circle obstacles [m]
+
+        self.raw_names = [self.name + '_range_' + str(i) for i in range(n_beams)]
+        self.init_measurement_dict()
 
-                dst = np.sqrt( (x_other-x_own)**2 + (y_other-y_own)**2 )
+    def init_measurement_dict(self):
+        """
+        initializes the measurement dictionary with the range of each beam and its normalized value
+
+        :return:
+        """
+        self.measurement_dict['range'] = np.full(self.n_beams, self.max_range)  # [m]
+        self.measurement_dict['range_norm'] = np.ones(self.n_beams)
+        self.n_measurements = self.n_beams
+
+    def reset(self, mover_dict):
+        """
+        gathers the centers and radii of the circle obstacles from where they were placed for the episode
+
+        :param mover_dict: ordered dictionary that has all of the movers in the simulation
+        :return:
+        """
+        circles = []
+        names = []
+        for name, mover in mover_dict.items():
+            if name != self.mover_owner_name and mover.is_static and 'radius' in mover.state_dict:
+                circles.append((mover.state_dict['x_pos'], mover.state_dict['y_pos'], mover.state_dict['radius']))
+                names.append(name)
+        circles = np.reshape(circles, (-1, 3)).astype(float)
+        if self.proximity is not None:
+            # the circles among the movers the proximity service finds
+            self.is_circle_column = np.zeros(len(self.proximity.names), dtype=bool)
+            self.is_circle_column[[self.proximity.index[name] for name in names]] = True
+        self.x_circles = circles[:, 0]
+        self.y_circles = circles[:, 1]
+        self.radii_sq = np.square(circles[:, 2])
+        self.max_circle_radius = float(circles[:, 2].max()) if len(circles) > 0 else 0.0
 
-                max_range_row = self.measurement_norm_df[self.measurement_norm_df['name'] == 'max_range']
-                if dst > max_range_row['norm_value'].iloc[0]:
-                    self.measurement_dict['theta'] = self.base_theta
-                    self.measurement_dict['dist'] = self.base_range
-                else:
+    def calc_measurements(self, mover_dict):
+        """
+        finds the range of every beam. A circle at distance d with radius r covers the beams within asin(r/d) of its
+        bearing. For those beam and circle pairs, a beam with direction u from the mover meets the circle with offset
+        p from the mover at the range t = u.p - sqrt((u.p)^2 - |p|^2 + r^2). Each beam keeps its nearest range. Every
+        beam measures zero when the mover is inside of a circle.
 
-                    self.measurement_dict['theta'] = theta
-                    self.measurement_dict['dist'] = dst
+        :param mover_dict: ordered dictionary that has all of the movers in the simulation
+        :return:
+        """
+        if self.x_circles is None:
+            self.reset(mover_dict)
 
-        # normalize and save the normalized measurements
-        #tmp = self.measurement_norm_df[self.measurement_norm_df['name']=='max_theta']['norm_value'].to_numpy()[0]
-        self.measurement_dict['theta_norm'] = self.measurement_dict['theta']/(self.measurement_norm_df[self.measurement_norm_df['name']=='max_theta']['norm_value'].to_numpy()[0])
-        self.measurement_dict['dist_norm'] = self.measurement_dict['dist']/(self.measurement_norm_df[self.measurement_norm_df['name']=='max_range']['norm_value'].to_numpy()[0])
+        own_mover = mover_dict[self.mover_owner_name]
+        psi = own_mover.state_dict['psi']
+        if self.proximity is not None:
+            # only circles that reach into the range of the beams can be hit. The service finds them in its grid index
+            columns, dst = self.proximity.get_in_range(self.mover_owner_name, self.max_range + self.max_circle_radius)
+            is_circle = self.is_circle_column[columns]
+            columns = columns[is_circle]
+            dx = self.proximity.positions[columns, 0] - own_mover.state_dict['x_pos']
+            dy = self.proximity.positions[columns, 1] - own_mover.state_dict['y_pos']
+            dst_sq = np.square(dst[is_circle])
+            radii_sq = np.square(self.proximity.radii[columns])
+        else:
+            dx = self.x_circles - own_mover.state_dict['x_pos']
+            dy = self.y_circles - own_mover.state_dict['y_pos']
+            dst_sq = dx * dx + dy * dy
+            radii_sq = self.radii_sq
+        c = dst_sq - radii_sq
+
+        ranges = self.measurement_dict['range']
+        ranges[:] = self.max_range
+        if len(c) > 0 and c.min() <= 0.0:
+            ranges[:] = 0.0
+        elif len(c) > 0:
+            # bearing of each circle relative to the first beam, and the half angle each circle covers
+            bearing = np.mod(np.arctan2(dy, dx) - psi + np.pi, 2.0 * np.pi) - np.pi - self.first_angle
+            half_angle = np.arcsin(np.sqrt(radii_sq / dst_sq))
+            circle = np.arange(len(c))
+            if not self.is_full_circle:
+                # a circle behind the mover can cover beams on either end of the field of view
+                bearing = np.concatenate([bearing, bearing + 2.0 * np.pi, bearing - 2.0 * np.pi])
+                half_angle = np.tile(half_angle, 3)
+                circle = np.tile(circle, 3)
+            first = np.ceil((bearing - half_angle) / self.angle_step).astype(np.intp)
+            last = np.floor((bearing + half_angle) / self.angle_step).astype(np.intp)
+            if self.is_full_circle:
+                last = np.minimum(last, first + self.n_beams - 1)
+            else:
+                first = np.maximum(first, 0)
+                last = np.minimum(last, self.n_beams - 1)
+            counts = np.maximum(last - first + 1, 0)
+
+            # every beam and circle pair that can hit
+            n_pairs = counts.sum()
+            if n_pairs > 0:
+                circle = np.repeat(circle, counts)
+                beam = np.arange(n_pairs) + np.repeat(first - (np.cumsum(counts) - counts), counts)
+                if self.is_full_circle:
+                    beam %= self.n_beams
+
+                cos_psi = np.cos(psi)
+                sin_psi = np.sin(psi)
+                b = (dx[circle] * (self.cos_beams[beam] * cos_psi - self.sin_beams[beam] * sin_psi) +
+                     dy[circle] * (self.sin_beams[beam] * cos_psi + self.cos_beams[beam] * sin_psi))
+                t = b - np.sqrt(np.maximum(b * b - c[circle], 0.0))
+                np.minimum.at(ranges, beam, t)
+
+        np.multiply(ranges, self.inv_max_range, out=self.measurement_dict['range_norm'])
 
     def get_raw_measurements(self):
         """
-        gets the current measurements in their native units
+        gets the current ranges of the beams in their native units
         :return:
         """
-        raw = dict((k, self.measurement_dict[k]) for k in ('theta', 'dist') if k in self.measurement_dict)
-        raw[self.name + '_theta'] = raw.pop('theta')
-        raw[self.name + '_dist'] = raw.pop('dist')
-        return raw
+        return dict(zip(self.raw_names, self.measurement_dict['range']))
 
     def get_norm_measurements(self):
         """
-        gets the current measurements in their native units
+        gets the current ranges of the beams divided by the maximum range
+        :return:
+        """
+        return dict(zip(self.raw_names, self.measurement_dict['range_norm']))
+
+    def write_norm_measurements(self, out):
+        """
+        writes the normalized ranges into a slice of an observation buffer
+
+        :param out: array of length n_beams
+        :return:
+        """
+        out[:] = self.measurement_dict['range_norm']
+
+    def write_raw_measurements(self, out):
+        """
+        writes the ranges into a slice of a history row
+
+        :param out: array of length n_beams
         :return:
         """
-        raw = dict((k, self.measurement_dict[k]) for k in ('theta_norm', 'dist_norm') if k in self.measurement_dict)
-        raw[self.name + '_theta'] = raw.pop('theta_norm')
-        raw[self.name + '_dst'] = raw.pop('dist_norm')
-        return raw
\ No newline at end of file
+        out[:] = self.measurement_dict['range']
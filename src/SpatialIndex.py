@@ -0,0 +1,130 @@
+"""
+A uniform grid over a fixed set of points in the plane for range and nearest neighbor queries. The points are sorted by
+the cell they fall in, so the points of a column of cells are one contiguous slice. A query only looks at the cells that
+overlap its search circle instead of every point, which keeps sensors fast over large fields of static obstacles.
+
+"""
+
+# native packages
+import math
+
+# 3rd party packages
+import numpy as np
+
+# own packages
+
+
+class GridIndex:
+
+    def __init__(self, points, cell_size=None):
+        """
+        builds the grid. The index does not follow the points if they move, so it must be built again.
+
+        :param points: array of shape (n, 2) of the (x,y) points [m]
+        :param cell_size: length of the sides of a cell [m]. If None, it is sized so a cell holds about two points
+        """
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        n_points = len(self.points)
+
+        if n_points == 0:
+            self.origin = np.zeros(2)
+            extent = np.zeros(2)
+        else:
+            self.origin = self.points.min(axis=0)
+            extent = self.points.max(axis=0) - self.origin
+
+        if cell_size is None:
+            area = extent[0] * extent[1]
+            if area > 0.0:
+                cell_size = np.sqrt(area * 2.0 / n_points)
+            else:
+                # the points are on a line or a single point
+                cell_size = max(extent[0], extent[1], 1.0) * 2.0 / max(n_points, 1)
+        if cell_size <= 0.0:
+            raise ValueError('The cell size of a grid index must be positive')
+        self.cell_size = float(cell_size)
+
+        cells = np.floor((self.points - self.origin) / self.cell_size).astype(np.intp)
+        self.n_cells = np.floor(extent / self.cell_size).astype(np.intp) + 1
+
+        # sort the points by cell, column by column
+        keys = cells[:, 0] * self.n_cells[1] + cells[:, 1]
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_points = self.points[self.order]
+        self.cell_starts = np.searchsorted(keys[self.order], np.arange(self.n_cells[0] * self.n_cells[1] + 1))
+
+        # the farthest a query can be from a corner of the grid and still miss a point
+        self.max_extent = np.hypot(extent[0], extent[1])
+
+        # the origin and the number of cells as python numbers for the scalar math of the queries
+        self.grid_shape = (float(self.origin[0]), float(self.origin[1]), int(self.n_cells[0]), int(self.n_cells[1]))
+
+    def __len__(self):
+        return len(self.points)
+
+    def query_radius(self, point, radius):
+        """
+        gets every point within a distance of a point
+
+        :param point: the (x,y) point that is searched around [m]
+        :param radius: the search distance [m]. Points exactly at the distance are included
+        :return: array of the indices of the points, and array of their distances, both sorted by the distance
+        """
+        if len(self.points) == 0 or radius < 0.0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        # the cells are found with scalar math, as a query usually only covers a few of them
+        x = float(point[0])
+        y = float(point[1])
+        radius = float(radius)
+        x_origin, y_origin, n_x, n_y = self.grid_shape
+        x_lower = max(int(math.floor((x - radius - x_origin) / self.cell_size)), 0)
+        x_upper = min(int(math.floor((x + radius - x_origin) / self.cell_size)), n_x - 1)
+        y_lower = max(int(math.floor((y - radius - y_origin) / self.cell_size)), 0)
+        y_upper = min(int(math.floor((y + radius - y_origin) / self.cell_size)), n_y - 1)
+        if x_lower > x_upper or y_lower > y_upper:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        # the cells of one column are contiguous in the sorted points
+        slices = []
+        for ix in range(x_lower, x_upper + 1):
+            start = self.cell_starts[ix * n_y + y_lower]
+            end = self.cell_starts[ix * n_y + y_upper + 1]
+            if end > start:
+                slices.append(np.arange(start, end))
+        if len(slices) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        rows = slices[0] if len(slices) == 1 else np.concatenate(slices)
+
+        dst = np.hypot(self.sorted_points[rows, 0] - x, self.sorted_points[rows, 1] - y)
+        is_inside = dst <= radius
+        rows = rows[is_inside]
+        dst = dst[is_inside]
+        sort_idx = np.argsort(dst, kind='stable')
+        return self.order[rows[sort_idx]], dst[sort_idx]
+
+    def query_nearest(self, point, k, max_range=np.inf):
+        """
+        gets the k nearest points to a point. The search circle starts at one cell and doubles until it holds k points,
+        reaches the maximum range, or covers the whole grid.
+
+        :param point: the (x,y) point that is searched around [m]
+        :param k: the number of points
+        :param max_range: points further than this are not returned [m]
+        :return: array of the indices of up to k points, and array of their distances, both sorted by the distance
+        """
+        if len(self.points) == 0 or k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        # no point is further than this from the query point
+        x_origin, y_origin, n_x, n_y = self.grid_shape
+        dx = float(point[0]) - x_origin
+        dy = float(point[1]) - y_origin
+        corner_dst = math.hypot(max(abs(dx), abs(dx - n_x * self.cell_size)), max(abs(dy), abs(dy - n_y * self.cell_size)))
+        radius = self.cell_size
+        while True:
+            is_last = radius >= max_range or radius >= corner_dst
+            idx, dst = self.query_radius(point, min(radius, max_range))
+            if len(idx) >= k or is_last:
+                return idx[:k], dst[:k]
+            radius *= 2.0
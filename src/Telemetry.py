@@ -0,0 +1,109 @@
+"""
+Preallocated storage for the per step histories of the environment and the movers. Numeric columns are held in one
+float64 array that is allocated once and reused across episodes. An episode is trimmed by remembering its length, and
+the history is only turned into a data frame when it is written out.
+
+"""
+
+# native packages
+
+# 3rd party packages
+import numpy as np
+import pandas as pd
+
+# own packages
+
+
+class TelemetryBuffer:
+
+    def __init__(self, columns, object_columns=(), bool_columns=(), constant_columns=None):
+        """
+        a history table with a fixed set of columns
+
+        :param columns: names of every column in the order of the data frame
+        :param object_columns: names of the columns that hold non numeric values, such as strings
+        :param bool_columns: names of numeric columns that are converted to booleans in the data frame
+        :param constant_columns: dictionary of the name of a column to the value it has in every row
+        """
+        self.columns = list(columns)
+        self.constant_columns = dict() if constant_columns is None else dict(constant_columns)
+        self.object_columns = [name for name in self.columns if name in object_columns]
+        self.numeric_columns = [name for name in self.columns
+                                if name not in self.constant_columns and name not in object_columns]
+        self.bool_columns = set(bool_columns)
+        self.numeric_index = dict((name, i) for i, name in enumerate(self.numeric_columns))
+        self.object_index = dict((name, i) for i, name in enumerate(self.object_columns))
+
+        self.data = np.zeros((0, len(self.numeric_columns)))
+        self.objects = np.empty((0, len(self.object_columns)), dtype=object)
+        self.n_rows = 0
+
+    def reset(self, num_steps):
+        """
+        empties the history for a new episode. The arrays are only reallocated when more rows are needed than any
+        earlier episode used
+
+        :param num_steps: the most steps the episode can have
+        :return:
+        """
+        if num_steps > len(self.data):
+            self.data = np.zeros((num_steps, len(self.numeric_columns)))
+            self.objects = np.empty((num_steps, len(self.object_columns)), dtype=object)
+        self.n_rows = 0
+
+    def write(self, step_num, numeric_values, object_values=()):
+        """
+        writes one row of the history
+
+        :param step_num: the step number the row is for
+        :param numeric_values: values of the numeric columns, in the order of numeric_columns
+        :param object_values: values of the object columns, in the order of object_columns
+        :return:
+        """
+        self.data[step_num] = numeric_values
+        if len(self.object_columns) > 0:
+            self.objects[step_num] = object_values
+        if step_num >= self.n_rows:
+            self.n_rows = step_num + 1
+
+    def get_row(self, step_num):
+        """
+        gets the numeric values of one row to be filled in place, for writers that assemble the row from several
+        sources
+
+        :param step_num: the step number the row is for
+        :return: view of the row, in the order of numeric_columns
+        """
+        if step_num >= self.n_rows:
+            self.n_rows = step_num + 1
+        return self.data[step_num]
+
+    def trim(self, step_num):
+        """
+        drops the rows from a step number on. The simulation may have stopped before it ran out of time
+
+        :param step_num: the number of rows that are kept
+        :return:
+        """
+        self.n_rows = min(self.n_rows, step_num)
+
+    def __len__(self):
+        return self.n_rows
+
+    def to_data_frame(self):
+        """
+        converts the rows of the episode to a data frame with the columns in their original order
+
+        :return: the data frame
+        """
+        table = dict()
+        for name in self.columns:
+            if name in self.constant_columns:
+                table[name] = [self.constant_columns[name]] * self.n_rows
+            elif name in self.object_index:
+                table[name] = self.objects[:self.n_rows, self.object_index[name]].copy()
+            elif name in self.bool_columns:
+                table[name] = self.data[:self.n_rows, self.numeric_index[name]].astype(bool)
+            else:
+                table[name] = self.data[:self.n_rows, self.numeric_index[name]].copy()
+        return pd.DataFrame(table, columns=self.columns)
@@ -0,0 +1,320 @@
+"""
+A precomputed surface of the induced velocity of a propeller that replaces the iterative thrust solve with a table
+lookup. The surface is built once and saved to disk so later runs with the same boat load it instead of rebuilding it.
+The batch solver the table is built with is also used to step many boats at once in VectorizedMovers.
+
+"""
+
+# native packages
+import hashlib
+import math
+import os
+
+# 3rd party packages
+import numpy as np
+
+# own packages
+
+
+def thrust_residual(x, a, s):
+    """
+    non-dimensional form of RiverBoat.thrust_helper. Both velocities are divided by the induced velocity in hover so
+    the residual only depends on the ratio of the velocities and the angle of incidence.
+
+    :param x: guess for the induced velocity divided by the induced velocity in hover
+    :param a: inflow velocity magnitude divided by the induced velocity in hover
+    :param s: sine of the angle of incidence of the inflow to the propeller disk
+    :return: error of the thrust equation
+    """
+    return x * x * (x * x + 2.0 * a * s * x + a * a) * (x + a * s) * (x + a * s) - 1.0
+
+
+def solve_induced_velocity_batch(v0, alpha_d, power, rho, area, v_guess=None, tol=1e-12, max_iterations=50):
+    """
+    solves the thrust equation for the smallest positive induced velocity of many propellers at once. This is the
+    array version of Movers.solve_induced_velocity: a bracket that holds only the wanted root is found analytically,
+    and Newton's method with the analytic derivative is started from v_guess. Steps that leave the bracket are replaced
+    with bisection steps. The iterations stop as soon as every propeller has converged, so a warm start from the
+    previous step usually takes a few iterations instead of a fixed number of bisections.
+
+    For a non-negative sine of the angle of incidence the residual increases monotonically from -1 at zero. For a
+    negative sine the residual returns to -1 at x = -a*s, and may cross zero on the hump before that point. The hump
+    can only reach zero when a^6*s^4/16 >= 1, in which case the top of the hump is found with a golden section search.
+
+    :param v0: magnitude of the velocity of the fluid flowing into the rotor disk not due to the rotor [m/s]
+    :param alpha_d: the effective angle of incidence of the fluid flowing into the rotor disk [rad]
+    :param power: the power applied to the rotor [watt]. Must be positive
+    :param rho: the density of the fluid the rotor is in [kg/m^3]
+    :param area: the disk area of the rotor [m^2]
+    :param v_guess: starting guess for the induced velocity of every propeller [m/s]. None to start in the middle of
+        the bracket
+    :param tol: convergence tolerance on the non-dimensional induced velocity
+    :param max_iterations: the maximum number of Newton or bisection steps
+    :return: induced velocity [m/s] for every propeller
+    """
+    vh = np.cbrt(power / (2.0 * rho * area))
+    a = v0 / vh
+    s = np.sin(alpha_d)
+    a_s = a * s
+    a_sq = a * a
+
+    # bracket on the monotone branch past the dip in the residual. The residual is -1 at lo and positive at hi
+    lo = np.maximum(-a_s, 0.0)
+    hi = lo + 1.0
+
+    # check if the hump before the dip crosses zero
+    a_s_sq = a_s * a_s
+    hump = (lo > 0.0) & (a_s_sq * a_s_sq * a_sq >= 16.0)
+    if hump.any():
+        inv_golden = (np.sqrt(5.0) - 1.0) / 2.0
+        a_h = a[hump]
+        s_h = s[hump]
+        left = np.zeros(len(a_h))
+        right = lo[hump].copy()
+        # the search is capped because the width stops shrinking once it reaches the round off of large roots
+        for _ in range(4 * max_iterations):
+            if np.all(right - left <= tol):
+                break
+            c = right - inv_golden * (right - left)
+            d = left + inv_golden * (right - left)
+            is_left = thrust_residual(c, a_h, s_h) > thrust_residual(d, a_h, s_h)
+            right = np.where(is_left, d, right)
+            left = np.where(is_left, left, c)
+        x_peak = 0.5 * (left + right)
+        crosses = thrust_residual(x_peak, a_h, s_h) >= 0.0
+
+        # the first root is on the rising side of the hump
+        hump_idx = np.flatnonzero(hump)[crosses]
+        lo[hump_idx] = 0.0
+        hi[hump_idx] = x_peak[crosses]
+
+    # warm start from the guess where it is inside of the bracket
+    if v_guess is None:
+        x = 0.5 * (lo + hi)
+    else:
+        x = v_guess / vh
+        x = np.where((lo < x) & (x < hi), x, 0.5 * (lo + hi))
+
+    # newton steps on every propeller until all of them have converged. The residual and its derivative are expanded
+    # by hand to keep the number of array operations per iteration small
+    two_a_s = 2.0 * a_s
+    six_a_s = 6.0 * a_s
+    two_a_sq = 2.0 * a_sq
+    is_converged = np.zeros(len(x), dtype=bool)
+    for _ in range(max_iterations):
+        x_sq = x * x
+        x_as = x + a_s
+        x_as_sq = x_as * x_as
+        p1 = x_sq * (x_sq + two_a_s * x + a_sq)
+        f = p1 * x_as_sq - 1.0
+        df = x * (4.0 * x_sq + six_a_s * x + two_a_sq) * x_as_sq + 2.0 * p1 * x_as
+
+        # the residual increases monotonically across the bracket
+        is_above = f >= 0.0
+        hi = np.where(is_above, x, hi)
+        lo = np.where(is_above, lo, x)
+
+        # the derivative is positive inside of the bracket, so a step that divides by zero or leaves the bracket
+        # falls back to bisection
+        newton_step = f / df
+        x_newton = x - newton_step
+        is_small = np.abs(newton_step) < tol
+        is_newton = is_small | ((lo < x_newton) & (x_newton < hi))
+
+        # converged propellers keep their value
+        x = np.where(is_converged, x, np.where(is_newton, x_newton, 0.5 * (lo + hi)))
+        is_converged |= is_small | (hi - lo < tol)
+        if is_converged.all():
+            break
+
+    return x * vh
+
+
+class ThrustSurface:
+
+    def __init__(self, a_max, n_a=256, n_s=256, tol=1.0e-4):
+        """
+        a table of the non-dimensional induced velocity x = v/vh of a propeller. With vh = (power/(2 rho area))^(1/3)
+        the thrust equation only depends on a = v0/vh and s = sin(alpha_d), so one 2D table over (a, s) covers every
+        combination of inflow speed, inflow angle, power, density, and disk area whose a is below a_max.
+
+        Values are bilinearly interpolated. For a negative s the wanted root jumps when the hump of the residual starts
+        to cross zero, so interpolating across it is wrong. Cells where the interpolated value at the center of the
+        cell misses the exact solution by more than tol of the total flow through the disk are marked, and lookups in
+        those cells return None so the caller uses the exact solver.
+
+        :param a_max: the largest inflow speed divided by the induced velocity in hover the table covers
+        :param n_a: number of intervals across [0, a_max]
+        :param n_s: number of intervals across the sine of the inflow angle [-1, 1]
+        :param tol: largest allowed interpolation error at a cell center relative to a + x
+        """
+        if a_max <= 0.0:
+            raise ValueError('The thrust surface must cover a positive range of inflow speeds')
+        if n_a <= 0 or n_s <= 0:
+            raise ValueError('The thrust surface must have a positive number of intervals')
+
+        self.a_max = float(a_max)
+        self.n_a = int(n_a)
+        self.n_s = int(n_s)
+        self.tol = float(tol)
+        self.da = self.a_max / self.n_a
+        self.ds = 2.0 / self.n_s
+
+        # with power=2, rho=1 and area=1 the induced velocity in hover is one so the solver returns x directly
+        a_nodes = np.linspace(0.0, self.a_max, self.n_a + 1)
+        s_nodes = np.linspace(-1.0, 1.0, self.n_s + 1)
+        self.x_table = self.solve(*np.meshgrid(a_nodes, s_nodes, indexing='ij'))
+
+        # mark the cells that can not be interpolated
+        a_center, s_center = np.meshgrid(a_nodes[:-1] + 0.5 * self.da, s_nodes[:-1] + 0.5 * self.ds, indexing='ij')
+        x_center = self.solve(a_center, s_center)
+        x_interp = 0.25 * (self.x_table[:-1, :-1] + self.x_table[1:, :-1] + self.x_table[:-1, 1:] +
+                           self.x_table[1:, 1:])
+        self.exact_cells = np.abs(x_interp - x_center) > self.tol * (a_center + x_center)
+
+        self.set_lookup_lists()
+
+    @staticmethod
+    def solve(a, s):
+        """
+        solves for the non-dimensional induced velocity at arrays of non-dimensional inflow speeds and sines of the
+        inflow angle
+
+        :param a: inflow speed divided by the induced velocity in hover
+        :param s: sine of the inflow angle
+        :return: induced velocity divided by the induced velocity in hover
+        """
+        ones = np.ones(a.size)
+        x = solve_induced_velocity_batch(a.ravel(), np.arcsin(s.ravel()), 2.0 * ones, ones, ones)
+        return x.reshape(a.shape)
+
+    def set_lookup_lists(self):
+        """
+        copies the table into nested lists so scalar lookups do not pay for indexing numpy arrays
+
+        :return:
+        """
+        self.x_list = self.x_table.tolist()
+        self.exact_list = self.exact_cells.tolist()
+
+    def lookup(self, v0, alpha_d, power, rho, area):
+        """
+        interpolates the induced velocity of a propeller from the table
+
+        :param v0: magnitude of the velocity of the fluid flowing into the rotor disk not due to the rotor [m/s]
+        :param alpha_d: the effective angle of incidence of the fluid flowing into the rotor disk [rad]
+        :param power: the power applied to the rotor [watt]. Must be positive
+        :param rho: the density of the fluid the rotor is in [kg/m^3]
+        :param area: the disk area of the rotor [m^2]
+        :return: the induced velocity [m/s], or None if the inflow is outside of the table or in a cell that must be
+            solved exactly
+        """
+        vh = (power / (2.0 * rho * area)) ** (1.0 / 3.0)
+        t_a = v0 / vh / self.da
+        if t_a >= self.n_a:
+            return None
+        t_s = (math.sin(alpha_d) + 1.0) / self.ds
+        i = int(t_a)
+        j = min(int(t_s), self.n_s - 1)
+        if self.exact_list[i][j]:
+            return None
+        t_a -= i
+        t_s -= j
+
+        row_0 = self.x_list[i]
+        row_1 = self.x_list[i + 1]
+        x = (1.0 - t_a) * ((1.0 - t_s) * row_0[j] + t_s * row_0[j + 1]) + \
+            t_a * ((1.0 - t_s) * row_1[j] + t_s * row_1[j + 1])
+        return x * vh
+
+    def exact_fraction(self):
+        """
+        gets the fraction of the cells in the table that fall back to the exact solver
+
+        :return: fraction of cells
+        """
+        return float(np.mean(self.exact_cells))
+
+    def save(self, file_name):
+        """
+        saves the table to a numpy archive
+
+        :param file_name: path of the archive
+        :return:
+        """
+        np.savez(file_name, a_max=self.a_max, n_a=self.n_a, n_s=self.n_s, tol=self.tol, x_table=self.x_table,
+                 exact_cells=self.exact_cells)
+
+    @staticmethod
+    def load(file_name):
+        """
+        loads a table saved with save without rebuilding it
+
+        :param file_name: path of the archive
+        :return: the loaded thrust surface
+        """
+        data = np.load(file_name)
+        ts = ThrustSurface.__new__(ThrustSurface)
+        ts.a_max = float(data['a_max'])
+        ts.n_a = int(data['n_a'])
+        ts.n_s = int(data['n_s'])
+        ts.tol = float(data['tol'])
+        ts.da = ts.a_max / ts.n_a
+        ts.ds = 2.0 / ts.n_s
+        ts.x_table = data['x_table']
+        ts.exact_cells = data['exact_cells']
+        ts.set_lookup_lists()
+        return ts
+
+    @staticmethod
+    def get_cache_key(**params):
+        """
+        builds a key for a cached surface from the parameters that define it. The same parameters always give the same
+        key.
+
+        :param params: the boat and table parameters the surface is built from
+        :return: a hex string
+        """
+        text = ','.join(str(key) + '=' + repr(params[key]) for key in sorted(params))
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def create_for_boat(state_dict, max_speed=10.0, min_power_fraction=0.05, n_a=256, n_s=256, tol=1.0e-4,
+                        cache_dir=os.path.join('Output', 'ThrustSurfaces')):
+        """
+        creates the surface that covers a boat's propeller from inflow speeds of zero to max_speed and from
+        min_power_fraction of its maximum power to its maximum power. The surface is loaded from cache_dir if it has
+        already been built for the same parameters, otherwise it is built and saved there.
+
+        :param state_dict: the state dictionary of the boat
+        :param max_speed: the largest inflow speed the surface covers [m/s]
+        :param min_power_fraction: the smallest power the surface covers as a fraction of the maximum power
+        :param n_a: number of intervals across the non-dimensional inflow speed
+        :param n_s: number of intervals across the sine of the inflow angle
+        :param tol: largest allowed interpolation error at a cell center relative to a + x
+        :param cache_dir: folder the surfaces are saved in. None to not cache the surface
+        :return: the thrust surface
+        """
+        rho = float(state_dict['density_water'])
+        area = float(state_dict['prop_area'])
+        min_power = float(state_dict['power_max']) * min_power_fraction
+        if min_power <= 0.0:
+            raise ValueError('The thrust surface must cover a positive power')
+        a_max = max_speed / (min_power / (2.0 * rho * area)) ** (1.0 / 3.0)
+
+        if cache_dir is None:
+            return ThrustSurface(a_max, n_a, n_s, tol)
+
+        key = ThrustSurface.get_cache_key(density_water=rho, prop_area=area, min_power=min_power,
+                                          max_speed=float(max_speed), n_a=int(n_a), n_s=int(n_s), tol=float(tol))
+        file_name = os.path.join(cache_dir, 'thrust_surface_' + key + '.npz')
+        if os.path.exists(file_name):
+            return ThrustSurface.load(file_name)
+
+        ts = ThrustSurface(a_max, n_a, n_s, tol)
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file first so another process never loads a partially written surface
+        tmp_file_name = os.path.join(cache_dir, 'thrust_surface_' + key + '_' + str(os.getpid()) + '.tmp.npz')
+        ts.save(tmp_file_name)
+        os.replace(tmp_file_name, file_name)
+        return ts
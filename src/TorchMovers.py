@@ -0,0 +1,521 @@
+"""
+A differentiable version of the river boat dynamics written with torch. The physics mirror Movers.RiverBoat and
+VectorizedMovers.VectorizedRiverBoat (thrust, aerodynamic and hydrodynamic coefficients, hull moment and the Euler
+update), but every state variable is a tensor of shape (n_boats,) on the same device as the networks. Rollouts do not
+have to convert between numpy arrays and tensors each step, and gradients of the trajectory with respect to the
+controls and the boat parameters are available to gradient based planners.
+
+"""
+
+# native packages
+from collections import OrderedDict
+import math
+
+# 3rd party packages
+import torch
+
+# own packages
+import src.Movers as Movers
+import src.VectorizedMovers as VectorizedMovers
+
+
+def aero_coeffs(x):
+    """
+    torch version of Movers.aero_coeffs
+
+    :param x: relative flow angle [rad] as a tensor
+    :return: cd, cs, cy, cr
+    """
+    abs_x = torch.abs(x)
+    sign_x = torch.sign(x)
+
+    # drag coefficient
+    cd = 0.195738 + 0.518615 * abs_x - 0.496029 * x * x + 0.0941925 * abs_x ** 3 + \
+         1.86427 * torch.sin(2.0 * math.pi * torch.pow(abs_x / math.pi, 1.05)) * torch.exp(
+        -2.17281 * torch.pow(abs_x - math.pi / 2.0, 2.0))
+
+    # side force coefficient
+    cs = sign_x * (12.3722 - 15.453 * abs_x + 6.0261 * torch.abs(x * x) - 0.532325 * abs_x ** 3) * \
+         torch.sin(abs_x) * torch.exp(-1.68668 * torch.pow(abs_x - math.pi / 2.0, 2.0))
+
+    # yaw coefficient
+    cy = sign_x * (0.710204 - 0.297196 * abs_x + 0.0857296 * torch.abs(x * x)) * torch.sin(
+        math.pi * 2.0 * torch.pow(abs_x / math.pi, 1.05))
+
+    # perpendicular side force coefficient
+    cr = 0.904313
+
+    return cd, cs, cy, cr
+
+
+def hydro_coeffs(x):
+    """
+    torch version of Movers.hydro_coeffs
+
+    :param x: relative flow angle [rad] as a tensor
+    :return: cd, cs, cy, cr
+    """
+    abs_x = torch.abs(x)
+    sign_x = torch.sign(x)
+
+    # drag coefficient
+    cd = 0.245219 - 0.93044 * abs_x + 0.745752 * torch.abs(x * x) - 0.15915 * torch.pow(abs_x, 3.0) + \
+         2.79188 * torch.sin(2.0 * abs_x) * torch.exp(-1.05667 * torch.pow(abs_x - math.pi / 2.0, 2.0))
+
+    # side force coefficient
+    cs = sign_x * (0.115554 + 3.09423 * abs_x - 0.984923 * x * x) * torch.sin(abs_x)
+
+    # yaw coefficient
+    cy = sign_x * (0.322986 + 0.317964 * abs_x - 0.1021844 * x * x) * torch.sin(2.0 * abs_x)
+
+    # perpendicular side force coefficient
+    cr = 2.545759
+
+    return cd, cs, cy, cr
+
+
+def safe_atan2(y, x):
+    """
+    atan2 whose gradient is zero instead of nan where both inputs are zero, such as the relative wind of a boat at rest
+    with no wind. The value is the same as torch.atan2.
+
+    :param y: tensor of the y components
+    :param x: tensor of the x components
+    :return: the angle [rad]
+    """
+    is_zero = (x == 0.0) & (y == 0.0)
+    return torch.atan2(torch.where(is_zero, y.detach(), y), torch.where(is_zero, x.detach(), x))
+
+
+def safe_sqrt(x):
+    """
+    square root whose gradient is zero instead of inf where the input is zero. The value is the same as torch.sqrt.
+
+    :param x: tensor of non-negative values
+    :return: the square root
+    """
+    return torch.sqrt(torch.where(x > 0.0, x, x.detach()))
+
+
+def thrust_residual(x, a, s):
+    """
+    torch version of ThrustSurface.thrust_residual
+
+    :param x: guess for the induced velocity divided by the induced velocity in hover
+    :param a: inflow velocity magnitude divided by the induced velocity in hover
+    :param s: sine of the angle of incidence of the inflow to the propeller disk
+    :return: error of the thrust equation
+    """
+    return x * x * (x * x + 2.0 * a * s * x + a * a) * (x + a * s) * (x + a * s) - 1.0
+
+
+def thrust_residual_derivative(x, a, s):
+    """
+    derivative of thrust_residual with respect to x
+
+    :param x: guess for the induced velocity divided by the induced velocity in hover
+    :param a: inflow velocity magnitude divided by the induced velocity in hover
+    :param s: sine of the angle of incidence of the inflow to the propeller disk
+    :return: derivative of the error of the thrust equation
+    """
+    g = x * x + 2.0 * a * s * x + a * a
+    h = (x + a * s) * (x + a * s)
+    return 2.0 * x * g * h + x * x * (2.0 * x + 2.0 * a * s) * h + 2.0 * x * x * g * (x + a * s)
+
+
+def find_induced_velocity_root(a, s, n_iterations=60):
+    """
+    finds the smallest positive root of the non-dimensional thrust equation in the same bracket as
+    ThrustSurface.solve_induced_velocity_batch, bisected a fixed number of times. No gradients are tracked.
+
+    :param a: inflow velocity magnitude divided by the induced velocity in hover
+    :param s: sine of the angle of incidence of the inflow to the propeller disk
+    :param n_iterations: the number of bisection steps taken on the bracket
+    :return: the induced velocity divided by the induced velocity in hover
+    """
+    with torch.no_grad():
+        a = a.detach()
+        s = s.detach()
+
+        # bracket on the monotone branch past the dip in the residual. The residual is -1 at lo and positive at hi
+        x_dip = torch.clamp(-a * s, min=0.0)
+        lo = x_dip.clone()
+        hi = x_dip + 1.0
+
+        # check if the hump before the dip crosses zero. The search runs on every boat and is only used for the humps
+        hump = (x_dip > 0.0) & (torch.pow(a, 6.0) * torch.pow(s, 4.0) >= 16.0)
+        if bool(torch.any(hump)):
+            inv_golden = (math.sqrt(5.0) - 1.0) / 2.0
+            left = torch.zeros_like(a)
+            right = x_dip.clone()
+            for _ in range(n_iterations):
+                c = right - inv_golden * (right - left)
+                d = left + inv_golden * (right - left)
+                is_left = thrust_residual(c, a, s) > thrust_residual(d, a, s)
+                right = torch.where(is_left, d, right)
+                left = torch.where(is_left, left, c)
+            x_peak = 0.5 * (left + right)
+
+            # the first root is on the rising side of the hump
+            crosses = hump & (thrust_residual(x_peak, a, s) >= 0.0)
+            lo = torch.where(crosses, torch.zeros_like(lo), lo)
+            hi = torch.where(crosses, x_peak, hi)
+
+        # bisect the bracket
+        for _ in range(n_iterations):
+            mid = 0.5 * (lo + hi)
+            is_above = thrust_residual(mid, a, s) >= 0.0
+            hi = torch.where(is_above, mid, hi)
+            lo = torch.where(is_above, lo, mid)
+
+        return 0.5 * (lo + hi)
+
+
+def solve_induced_velocity(v0, alpha_d, power, rho, area, n_iterations=60):
+    """
+    solves the thrust equation for the induced velocity of many propellers at once and makes the result
+    differentiable with respect to every input.
+
+    The root is found without tracking gradients. One Newton step is then taken from the root with gradients tracked.
+    Because the residual is zero at the root the step does not move the value beyond round off, and its gradient is
+    the implicit derivative -(df/dinput)/(df/dx) of the root, so the bisection steps are never differentiated.
+
+    :param v0: magnitude of the velocity of the fluid flowing into the rotor disk not due to the rotor [m/s]
+    :param alpha_d: the effective angle of incidence of the fluid flowing into the rotor disk [rad]
+    :param power: the power applied to the rotor [watt]. Must be positive
+    :param rho: the density of the fluid the rotor is in [kg/m^3]
+    :param area: the disk area of the rotor [m^2]
+    :param n_iterations: the number of bisection steps taken on the bracket
+    :return: induced velocity [m/s] for every propeller
+    """
+    vh = torch.pow(power / (2.0 * rho * area), 1.0 / 3.0)
+    a = v0 / vh
+    s = torch.sin(alpha_d)
+
+    x_root = find_induced_velocity_root(a, s, n_iterations)
+    x = x_root - thrust_residual(x_root, a, s) / thrust_residual_derivative(x_root, a, s).detach()
+
+    return x * vh
+
+
+class TorchRiverBoat:
+
+    def __init__(self, template_boat, n_boats, device='cpu', dtype=torch.float64):
+        """
+        holds the state of n_boats river boats as tensors. Every state variable of VectorizedMovers.STATE_FIELDS is one
+        tensor of shape (n_boats,). Updates create new tensors instead of writing in place, so a whole rollout can be
+        differentiated.
+
+        With float64 the results match VectorizedMovers.VectorizedRiverBoat to round off. Only the analytic aerodynamic
+        and hydrodynamic coefficients are mirrored. Coefficient tables and the thrust surface of the template boat are
+        not used, and neither is its integrator: the step is the euler integrator of Movers.RiverBoat without sub
+        stepping.
+
+        :param template_boat: a Movers.RiverBoat whose current state is copied into every boat
+        :param n_boats: the number of boats to simulate together
+        :param device: the torch device the state is kept on. The same device as the networks
+        :param dtype: the floating point type of the state
+        """
+        if not isinstance(template_boat, Movers.RiverBoat):
+            raise ValueError('The template boat must be of type RiverBoat')
+
+        self.n_boats = n_boats
+        self.device = torch.device(device)
+        self.dtype = dtype
+
+        # the column used when a boat is reset
+        self.init_state = torch.as_tensor(VectorizedMovers.VectorizedRiverBoat.get_column(template_boat.state_dict),
+                                          dtype=self.dtype, device=self.device)
+        self.state = OrderedDict()
+        self.initalize_in_state()
+
+    def __getitem__(self, key):
+        """
+        gets a state variable for all of the boats
+
+        :param key: the name of the state variable
+        :return: tensor of shape (n_boats,)
+        """
+        return self.state[key]
+
+    def __setitem__(self, key, value):
+        """
+        sets a state variable for all of the boats. The tensor is replaced, not written in place.
+
+        :param key: the name of the state variable
+        :param value: a scalar, or a tensor of shape (n_boats,)
+        :return:
+        """
+        if key not in VectorizedMovers.FIELD_INDEX:
+            raise ValueError('Unknown state variable ' + str(key))
+        value = torch.as_tensor(value, dtype=self.dtype, device=self.device)
+        self.state[key] = value.expand(self.n_boats) if value.dim() == 0 else value
+
+    def initalize_in_state(self):
+        """
+        resets every boat to the state the template boat had when this object was created. Any gradient history is
+        dropped.
+
+        :return:
+        """
+        for i, name in enumerate(VectorizedMovers.STATE_FIELDS):
+            self.state[name] = self.init_state[i].expand(self.n_boats).clone()
+
+    def get_state(self, fields):
+        """
+        stacks state variables into one tensor, for example as the input to a network
+
+        :param fields: names of the state variables
+        :return: tensor of shape (n_boats, len(fields))
+        """
+        return torch.stack([self.state[key] for key in fields], dim=1)
+
+    def detach(self):
+        """
+        cuts the gradient history of the state, for example between truncated windows of a long rollout
+
+        :return:
+        """
+        for key, value in self.state.items():
+            self.state[key] = value.detach()
+
+    def set_control(self, power, propeller_angle):
+        """
+        sets the power level and the propeller angle of every boat. The values are clipped to the bounds of each boat.
+
+        :param power: the absolute desired power setting [watt]. Scalar or tensor of shape (n_boats,)
+        :param propeller_angle: the angle of the propeller relative to the longitudinal axis of the boat [rad]. Scalar
+            or tensor of shape (n_boats,)
+        :return:
+        """
+        power = torch.as_tensor(power, dtype=self.dtype, device=self.device)
+        propeller_angle = torch.as_tensor(propeller_angle, dtype=self.dtype, device=self.device)
+        self['power'] = torch.minimum(torch.clamp(power, min=0.0), self['power_max'])
+        self['delta'] = torch.minimum(torch.maximum(propeller_angle, self['delta_max_min']), self['delta_max_max'])
+
+    def get_alpha(self):
+        """
+        determines the angle of attack of the flow travelling across the propeller disk for every boat
+
+        :return: the angle of attack of the flow to the propeller disk [rad]
+        """
+        # lateral velocity induced at the propeller from the boat yawing
+        v_rot = self['hull_length'] / 2.0 * self['psi_dot']
+        v_x = self['v_xp'] * -1.0
+        v_y = self['v_yp'] * -1.0 + v_rot
+
+        axial_x = torch.cos(self['delta'] + math.pi / 2.0)
+        axial_y = torch.sin(self['delta'] + math.pi / 2.0)
+        alpha = safe_atan2(v_y * axial_x - v_x * axial_y, axial_x * v_x + axial_y * v_y)
+
+        self['alpha'] = alpha
+
+        return alpha
+
+    def calc_thrust(self):
+        """
+        calculates the thrust delivered by every propeller based on the controlled power
+
+        :return: the thrust [N] of every boat
+        """
+        v_mag = safe_sqrt(self['v_xp'] * self['v_xp'] + self['v_yp'] * self['v_yp'])
+        alpha_d = self.get_alpha()
+
+        # boats without power get no thrust. Their power is replaced by one in the solve so no gradient is nan
+        power = self['power']
+        is_powered = power > 0.0
+        safe_power = torch.where(is_powered, power, torch.ones_like(power))
+        v_induced = solve_induced_velocity(v_mag, alpha_d, safe_power, self['density_water'], self['prop_area'])
+
+        return torch.where(is_powered, safe_power / (v_mag + v_induced), torch.zeros_like(power))
+
+    def get_moment_hull(self, cr, vy):
+        """
+        get the moment induced on the hull of every boat by the water due to the boat rotating around is vertical axis
+
+        :param cr: side force at phi_eff at 90[deg]
+        :param vy: effective transverse velocity of every boat
+        :return: the moment [N-m] of every boat
+        """
+        l = self['hull_length']
+        omega = self['psi_dot']
+        alpha = cr * self['area_water'] * self['density_water'] / (l / 2.0)
+
+        # forward porition
+        mrf = l * l * alpha / 192.0 * (3 * l * l * omega * omega + 16.0 * l * omega * vy + 24.0 * vy * vy)
+
+        # the second branch is only used when omega is not zero
+        is_translating = torch.abs(vy) >= torch.abs(omega * l / 2.0)
+        omega_sq = torch.where(is_translating, torch.ones_like(omega), omega * omega)
+        mrb = torch.where(is_translating,
+                          -l * l * alpha / 192.0 * (3.0 * l * l * omega * omega - 16.0 * l * omega * vy +
+                                                    24.0 * vy * vy),
+                          alpha / (192.0 * omega_sq) * (torch.pow(l * omega - 2.0 * vy, 3.0) *
+                                                        (3.0 * l * omega + 2 * vy) - 16.0 * torch.pow(vy, 4.0)))
+
+        mr = mrf + mrb
+
+        # adjust the direction of the moment based on the rate of rotation
+        return torch.where(omega < 0, torch.abs(mr), -torch.abs(mr))
+
+    def calc_forces_and_moments(self, thrust):
+        """
+        given the state of the boats and their current thrust level, determine the forces and moments from the air,
+        water, and the propeller. The results are saved into the state of every boat.
+
+        :param thrust: the amount of thrust [N] of every boat
+        :return:
+        """
+        rho_air = self['density_air']
+        rho_water = self['density_water']
+        rot_angle = -self['psi']
+        cos_rot = torch.cos(rot_angle)
+        sin_rot = torch.sin(rot_angle)
+
+        # air forces and moments
+        v_eff_air_x = self['v_wind_x'] - self['v_x']
+        v_eff_air_y = self['v_wind_y'] - self['v_y']
+        self['v_x_eff_air'] = v_eff_air_x
+        self['v_y_eff_air'] = v_eff_air_y
+        v_air_local_x = cos_rot * v_eff_air_x - sin_rot * v_eff_air_y
+        v_air_local_y = sin_rot * v_eff_air_x + cos_rot * v_eff_air_y
+
+        phi_eff_air_local = safe_atan2(v_air_local_y, v_air_local_x)
+        self['psi_eff_air'] = phi_eff_air_local
+        q_air = v_air_local_x * v_air_local_x + v_air_local_y * v_air_local_y
+
+        cd_aero, cs_aero, cy_aero, cr_aero = aero_coeffs(phi_eff_air_local)
+
+        f_d_air = 0.5 * rho_air * q_air * self['area_air'] * cd_aero
+        f_s_air = 0.5 * rho_air * q_air * self['area_air'] * cs_aero
+        m_air = -0.5 * cy_aero * self['area_air'] * self['hull_length'] * rho_air * q_air
+
+        # water forces and moments
+        v_eff_water_x = self['v_current_x'] - self['v_x']
+        v_eff_water_y = self['v_current_y'] - self['v_y']
+        self['v_x_eff_water'] = v_eff_water_x
+        self['v_y_eff_water'] = v_eff_water_y
+        v_water_local_x = cos_rot * v_eff_water_x - sin_rot * v_eff_water_y
+        v_water_local_y = sin_rot * v_eff_water_x + cos_rot * v_eff_water_y
+        q_water = v_water_local_x * v_water_local_x + v_water_local_y * v_water_local_y
+
+        phi_eff_water_local = safe_atan2(v_water_local_y, v_water_local_x)
+        self['psi_eff_water'] = phi_eff_water_local
+        cd_hydro, cs_hydro, cy_hydro, cr_hydro = hydro_coeffs(phi_eff_water_local)
+
+        f_d_hydro = 0.5 * rho_water * q_water * self['area_water'] * cd_hydro
+        f_s_hydro = 0.5 * rho_water * q_water * self['area_water'] * cs_hydro
+
+        # the scalar model uses the air density for the hydrodynamic moment. Kept the same for equivalence
+        m_hydro = -0.5 * cy_hydro * self['area_water'] * self['hull_length'] * rho_air * q_water
+
+        mr = self.get_moment_hull(cr_hydro, self['v_yp'])
+
+        # propulsion forces
+        fx_p = thrust * torch.cos(self['delta'])
+        fy_p = thrust * torch.sin(self['delta'])
+        my_p = -fy_p * self['hull_length'] / 2.0
+
+        # save all of the forces and moments
+        self['f_d_air'] = f_d_air
+        self['f_s_air'] = f_s_air
+        self['m_air'] = m_air
+        self['f_d_water'] = f_d_hydro
+        self['f_s_water'] = f_s_hydro
+        self['m_water'] = m_hydro
+        self['fx_p'] = fx_p
+        self['fy_p'] = fy_p
+        self['my_p'] = my_p
+        self['mr'] = mr
+
+    def step(self, time):
+        """
+        steps every boat forward in time using the same Euler integration scheme as Movers.RiverBoat.step. The control
+        (power and propeller angle) should be set ahead of calling this function.
+
+        :param time: the time [s] of the simulation. Only used for data logging
+        :return:
+        """
+        # correct power if there is no fuel
+        no_fuel = self['fuel'] <= 0.0
+        self['power'] = torch.where(no_fuel, torch.zeros_like(self['power']), self['power'])
+        self['thrust'] = torch.where(no_fuel, torch.zeros_like(self['power']), self.calc_thrust())
+
+        psi = self['psi']
+        v_xp = self['v_xp']
+        v_yp = self['v_yp']
+        self['v_x'] = v_xp * torch.cos(-psi) + v_yp * torch.sin(-psi)
+        self['v_y'] = -v_xp * torch.sin(-psi) + v_yp * torch.cos(-psi)
+
+        # get the forces and moments of the boats. save them for telemetry later
+        self.calc_forces_and_moments(self['thrust'])
+
+        dt = self['delta_t']
+        mass = self['mass']
+        moi = self['moi']
+
+        fx_p = self['f_d_air'] + self['f_d_water'] + self['fx_p']
+        delta_xp = v_xp * dt + 0.5 * fx_p / mass * dt * dt
+
+        fy_p = self['f_s_air'] + self['f_s_water'] + self['fy_p']
+        delta_yp = v_yp * dt + 0.5 * fy_p / mass * dt * dt
+
+        mom = self['m_air'] + self['m_water'] + self['my_p'] + self['mr']
+        delta_psi = self['psi_dot'] * dt + 0.5 * mom * (self['hull_length'] / 2.0) / moi * dt * dt
+
+        psi = psi + delta_psi
+        psi = torch.where(psi > 2.0 * math.pi, psi - 2.0 * math.pi, psi)
+        psi = torch.where(psi < 0.0, psi + 2.0 * math.pi, psi)
+        self['psi'] = psi
+
+        # convert change in position to global frame
+        cos_psi = torch.cos(-psi)
+        sin_psi = torch.sin(-psi)
+        self['x_pos'] = self['x_pos'] + delta_xp * cos_psi + delta_yp * sin_psi
+        self['y_pos'] = self['y_pos'] - delta_xp * sin_psi + delta_yp * cos_psi
+
+        v_xp = v_xp + fx_p / mass * dt
+        v_yp = v_yp + fy_p / mass * dt
+        self['v_xp'] = v_xp
+        self['v_yp'] = v_yp
+        self['psi_dot'] = self['psi_dot'] + mom / moi * dt
+
+        self['v_x'] = v_xp * cos_psi + v_yp * sin_psi
+        self['v_y'] = -v_xp * sin_psi + v_yp * cos_psi
+
+        acc_xp = fx_p / mass
+        acc_yp = fy_p / mass
+        self['acc_xp'] = acc_xp
+        self['acc_yp'] = acc_yp
+        self['psi_double_dot'] = mom / moi
+
+        # convert acceleration to global reference plane
+        self['acc_x'] = acc_xp * cos_psi + acc_yp * sin_psi
+        self['acc_y'] = -acc_xp * sin_psi + acc_yp * cos_psi
+
+        # calculate the fuel used in the simulation
+        fuel = self['fuel'] - self['power'] * self['bsfc'] * dt
+        self['fuel'] = torch.clamp(fuel, min=0.0)
+
+        self['time'] = time
+
+    def derived_measurements(self, destination):
+        """
+        given the destination, the distance and angle from every boat to the destination is calculated.
+
+        :param destination: goal state of the boats. Either one (x,y) pair of points [m] shared by all boats, or a
+            tensor of shape (n_boats, 2)
+        :return:
+        """
+        destination = torch.as_tensor(destination, dtype=self.dtype, device=self.device)
+        dest_x = destination[..., 0]
+        dest_y = destination[..., 1]
+
+        delta_x = dest_x - self['x_pos']
+        delta_y = dest_y - self['y_pos']
+        self['dest_dist'] = safe_sqrt(delta_x * delta_x + delta_y * delta_y)
+        self['theta'] = safe_atan2(delta_y, delta_x)
+
+        mu1 = self['theta'] - self['psi']
+        mu2 = torch.where(mu1 >= 0, math.pi * 2.0 - mu1, math.pi * 2.0 + mu1)  # explementary angle
+        self['mu'] = torch.where(torch.abs(mu2) < torch.abs(mu1), mu2, mu1)
@@ -0,0 +1,91 @@
+"""
+Schedules how many gradient steps the agent takes per transition of data. By default the agent takes a fixed number of
+batches after every episode. When train_every is set, the number of batches is instead proportional to the transitions
+the episodes added to the replay storage, so short and long episodes get compute in proportion to their data. The
+gradient steps can also be capped to a rate in wall clock time. The realized update to data ratio is tracked so it can
+be logged.
+
+"""
+
+# native packages
+import time
+
+# 3rd party packages
+
+# own packages
+
+
+class UpdateScheduler:
+
+    def __init__(self, n_batches, train_every=None, max_updates_per_second=None):
+        """
+        :param n_batches: the number of gradient steps of one training
+        :param train_every: the number of transitions per training of n_batches. None to train once per episode
+        :param max_updates_per_second: the most gradient steps per second of wall clock time. None for no limit
+        """
+        if train_every is not None and train_every <= 0:
+            raise ValueError('train_every must be a positive number of transitions')
+        if max_updates_per_second is not None and max_updates_per_second <= 0:
+            raise ValueError('max_updates_per_second must be positive')
+
+        self.n_batches = n_batches
+        self.train_every = train_every
+        self.max_updates_per_second = max_updates_per_second
+
+        self.n_transitions = 0  # transitions in the replay storage the schedule has seen
+        self.n_updates = 0  # gradient steps that have been taken
+        self.pending_transitions = 0  # transitions that have not yet earned a training
+
+        # the gradient steps that can be taken under the rate cap. At most one second of steps can be saved up
+        self.budget = max_updates_per_second
+        self.last_time = time.perf_counter()
+
+    def get_n_updates(self, n_transitions):
+        """
+        gets the number of gradient steps to take now. Steps over the rate cap are dropped rather than delayed, so the
+        training never falls behind the collection of data.
+
+        :param n_transitions: total number of transitions that have been added to the replay storage
+        :return: the number of gradient steps
+        """
+        new_transitions = n_transitions - self.n_transitions
+        self.n_transitions = n_transitions
+
+        if self.train_every is None:
+            n_updates = self.n_batches
+        else:
+            self.pending_transitions += new_transitions
+            n_trainings = int(self.pending_transitions // self.train_every)
+            self.pending_transitions -= n_trainings * self.train_every
+            n_updates = n_trainings * self.n_batches
+
+        if self.max_updates_per_second is not None:
+            now = time.perf_counter()
+            self.budget = min(self.budget + (now - self.last_time) * self.max_updates_per_second,
+                              self.max_updates_per_second)
+            self.last_time = now
+            n_updates = min(n_updates, int(self.budget))
+            self.budget -= n_updates
+
+        return n_updates
+
+    def add_updates(self, n_updates):
+        """
+        records the gradient steps that were taken. This can be less than requested when the replay storage does not
+        have enough data for a batch.
+
+        :param n_updates: the number of gradient steps taken
+        :return:
+        """
+        self.n_updates += n_updates
+
+    def get_update_to_data_ratio(self, n_transitions=None):
+        """
+        :param n_transitions: transitions to divide by. The transitions the schedule has seen if None
+        :return: the gradient steps taken per transition of data so far
+        """
+        if n_transitions is None:
+            n_transitions = self.n_transitions
+        if n_transitions == 0:
+            return 0.0
+        return self.n_updates / n_transitions
@@ -0,0 +1,128 @@
+"""
+Runs several training episodes of an environment in lockstep. Every slot is an independent copy of the scenario with
+its own movers, action operation, and reward function, while the agent and the replay storage are shared. Each step
+the observations of all of the slots are stacked so the agent makes its decisions with one batched forward pass, and
+the completed transitions of all of the slots are pushed into the replay storage at once. A slot whose episode ends is
+reset to a new episode at the start of the next step, so its history can still be written out after the step returns.
+
+"""
+
+
+class VecEnvironment:
+
+    def __init__(self, env, n_slots, num_episodes, reset_to_max_power, first_episode=0):
+        """
+        creates the slots from an environment that has been set up for training
+
+        :param env: the Environment.Environment with its agent, action operation, reward function, and replay storage
+        :param n_slots: number of episodes that are run in lockstep
+        :param num_episodes: the episode number after which no more episodes are started
+        :param reset_to_max_power: if the boats start at their maximum power
+        :param first_episode: episode number of the first episode that is started
+        """
+        if n_slots < 1:
+            raise ValueError('A vectorized environment needs at least one slot')
+        n_learning = len([mover for mover in env.mover_dict.values() if mover.can_learn])
+        if n_learning != 1:
+            raise ValueError('A vectorized environment needs exactly one learning mover per slot, {} were given'.format(n_learning))
+
+        self.env = env
+        self.num_episodes = num_episodes
+        self.reset_to_max_power = reset_to_max_power
+        self.next_episode = first_episode
+        self.slots = [env.create_slot() for _ in range(n_slots)]
+        self.progress = [None] * n_slots  # progress of the episode in each slot. None when the slot is idle
+        self.states = [None] * n_slots  # observation of each slot before its next step
+        self.ended_slots = []  # slots whose episodes ended in the last step, restarted at the start of the next one
+
+        for i in range(n_slots):
+            self.start_episode(i)
+
+    def start_episode(self, slot_idx):
+        """
+        resets a slot to the next episode. The slot goes idle when all of the episodes have been started
+
+        :param slot_idx: index of the slot
+        :return:
+        """
+        if self.next_episode >= self.num_episodes:
+            self.progress[slot_idx] = None
+            self.states[slot_idx] = None
+            return
+
+        slot = self.slots[slot_idx]
+        self.progress[slot_idx] = slot.begin_episode(self.next_episode, is_evaluation=False,
+                                                     reset_to_max_power=self.reset_to_max_power)
+        self.states[slot_idx] = slot.observe(slot.observation_spec.state_buffer).copy()
+        self.next_episode += 1
+
+    def is_done(self):
+        """
+        :return: true when every slot is idle
+        """
+        if len(self.ended_slots) > 0:
+            # the ended slots may still start new episodes
+            return False
+        return all(progress is None for progress in self.progress)
+
+    def step(self):
+        """
+        steps every active slot one time step. The agent gets the observations of all of the slots that need a decision
+        in one call, and the completed transitions are pushed in one batch. The slots whose episodes ended in the
+        previous step are reset first, so the caller can write out their histories before the next call.
+
+        :return: list of tuples of the episode number, the slot environment, and the results of the episode as
+            returned from Environment.run_simulation, for each episode that ended this step
+        """
+        for i in self.ended_slots:
+            self.start_episode(i)
+        self.ended_slots = []
+
+        active = [i for i, progress in enumerate(self.progress) if progress is not None]
+        if len(active) == 0:
+            return []
+
+        # one forward pass for the decisions of every slot that needs one
+        deciding = [i for i in active if self.slots[i].ao.needs_decision(self.progress[i].t)]
+        raw_outputs = dict()
+        if len(deciding) > 0:
+            batch_outputs, batch_critic_values = self.env.agent.get_batch_output([self.states[i] for i in deciding])
+            batch_critic_values = batch_critic_values.cpu().detach().numpy()
+            for row, i in enumerate(deciding):
+                raw_outputs[i] = batch_outputs[row:row + 1]
+                self.slots[i].critic_values = batch_critic_values[row]
+
+        transition_slots = []
+        transitions = []
+        ended = []
+        for i in active:
+            slot = self.slots[i]
+            progress = self.progress[i]
+
+            org_action, used_action, path_cps, end_step = slot.act(progress.ep_num, progress.t, raw_outputs.get(i),
+                                                                   is_evaluation=False)
+            next_state = slot.observe(slot.observation_spec.next_state_buffer)
+            reward, is_terminal, dest_dst = slot.get_step_outcome(progress.t)
+
+            transition = slot.record_step(progress, self.states[i], org_action, used_action, path_cps, reward,
+                                          next_state, end_step, is_terminal, dest_dst)
+            if transition is not None:
+                transition_slots.append(i)
+                transitions.append(transition)
+
+            self.states[i] = next_state.copy()
+            if progress.is_done():
+                ended.append(i)
+
+        # store the data of every slot at once
+        self.env.replay_storage.push_batch(self.env.device, transition_slots, transitions)
+
+        results = []
+        for i in ended:
+            progress = self.progress[i]
+            results.append((progress.ep_num, self.slots[i], self.slots[i].end_episode(progress)))
+            self.env.replay_storage.sort_data_into_buffers(i)
+            self.progress[i] = None
+            self.ended_slots.append(i)
+
+        return results
@@ -0,0 +1,382 @@
+"""
+Vectorized movers hold the state of many river boats in contiguous arrays so a whole group of boats is stepped forward
+with one call. The physics mirror Movers.RiverBoat (thrust, aerodynamic and hydrodynamic coefficients, hull moment and
+the Euler update) but operate on arrays of shape (n_boats,) instead of one boat's state dictionary.
+
+"""
+
+# native packages
+
+# 3rd party packages
+import numpy as np
+
+# own packages
+import src.Movers as Movers
+import src.ThrustSurface as ThrustSurface
+
+
+# the state variables held for every boat, in the same order as the array backed state of Movers.RiverBoat. Each
+# variable is stored as one contiguous row of length n_boats
+STATE_FIELDS = Movers.RIVER_BOAT_FIELDS
+
+# row of each state variable in the state array
+FIELD_INDEX = dict((name, i) for i, name in enumerate(STATE_FIELDS))
+
+# state dictionary entries that hold a pair of values and are split across two rows of the state array
+PAIR_FIELDS = Movers.RIVER_BOAT_PAIR_FIELDS
+
+
+class VectorizedRiverBoat:
+
+    def __init__(self, template_boat, n_boats):
+        """
+        holds the state of n_boats river boats in a structure of arrays. Every state variable of Movers.RiverBoat is a
+        contiguous row of length n_boats in one float64 array, and step advances every boat at once.
+
+        The results match Movers.RiverBoat.step to round off. Both solve the thrust equation for the same root to
+        machine precision. Forces and moments for a given thrust agree to 1e-12 relative, thrust agrees to 1e-12
+        relative, and positions over 100 steps of 0.1 [s] agree to 1e-9 [m]. Only the euler integrator of
+        Movers.RiverBoat without sub stepping is mirrored. The integrator selected on the template boat is not used.
+
+        :param template_boat: a Movers.RiverBoat whose current state is copied into every boat. The template is also
+            used for the aerodynamic and hydrodynamic coefficient functions
+        :param n_boats: the number of boats to simulate together
+        """
+        if not isinstance(template_boat, Movers.RiverBoat):
+            raise ValueError('The template boat must be of type RiverBoat')
+
+        self.template = template_boat
+        self.n_boats = n_boats
+
+        # one row per state variable, one column per boat
+        self.state = np.zeros((len(STATE_FIELDS), n_boats))
+
+        # the column used when a boat is reset
+        self.init_state = self.get_column(template_boat.state_dict)
+        self.initalize_in_state()
+
+    def __getitem__(self, key):
+        """
+        gets the row of a state variable for all of the boats. The returned row is a view into the state so writing to
+        it changes the boats.
+
+        :param key: the name of the state variable
+        :return: array of shape (n_boats,)
+        """
+        return self.state[FIELD_INDEX[key]]
+
+    def __setitem__(self, key, value):
+        """
+        sets a state variable for all of the boats.
+
+        :param key: the name of the state variable
+        :param value: a scalar, or an array of shape (n_boats,)
+        :return:
+        """
+        self.state[FIELD_INDEX[key]] = value
+
+    @staticmethod
+    def get_column(state_dict):
+        """
+        converts the state dictionary of a Movers.RiverBoat into one column of the state array
+
+        :param state_dict: the state dictionary of a river boat
+        :return: array of shape (len(STATE_FIELDS),)
+        """
+        column = np.zeros(len(STATE_FIELDS))
+        for key, value in state_dict.items():
+            if key in PAIR_FIELDS:
+                column[FIELD_INDEX[PAIR_FIELDS[key][0]]] = value[0]
+                column[FIELD_INDEX[PAIR_FIELDS[key][1]]] = value[1]
+            elif key in FIELD_INDEX:
+                column[FIELD_INDEX[key]] = value
+
+        return column
+
+    def initalize_in_state(self, boat_idx=None):
+        """
+        resets boats to the state the template boat had when this object was created.
+
+        :param boat_idx: indices of the boats to reset. All of the boats are reset if None
+        :return:
+        """
+        if boat_idx is None:
+            self.state[:] = self.init_state[:, np.newaxis]
+        else:
+            self.state[:, boat_idx] = self.init_state[:, np.newaxis]
+
+    def set_boat(self, boat_idx, boat):
+        """
+        copies the state of a scalar river boat into one of the boats
+
+        :param boat_idx: index of the boat to overwrite
+        :param boat: the Movers.RiverBoat to copy from
+        :return:
+        """
+        self.state[:, boat_idx] = self.get_column(boat.state_dict)
+
+    def get_boat_state(self, boat_idx):
+        """
+        gets the state of one boat as a dictionary with the same keys as Movers.RiverBoat.state_dict
+
+        :param boat_idx: index of the boat
+        :return: dictionary of the boats state
+        """
+        state = dict((name, self.state[i, boat_idx]) for i, name in enumerate(STATE_FIELDS))
+        for key, pair in PAIR_FIELDS.items():
+            state[key] = np.array([state.pop(pair[0]), state.pop(pair[1])])
+
+        return state
+
+    def set_control(self, power, propeller_angle):
+        """
+        sets the power level and the propeller angle of every boat. The values are clipped to the bounds of each boat.
+
+        :param power: the absolute desired power setting [watt]. Scalar or array of shape (n_boats,)
+        :param propeller_angle: the angle of the propeller relative to the longitudinal axis of the boat [rad]. Scalar
+            or array of shape (n_boats,)
+        :return:
+        """
+        self['power'] = np.clip(power, 0.0, self['power_max'])
+        self['delta'] = np.clip(propeller_angle, self['delta_max_min'], self['delta_max_max'])
+
+    def get_alpha(self):
+        """
+        determines the angle of attack of the flow travelling across the propeller disk for every boat
+
+        :return: the angle of attack of the flow to the propeller disk [rad]
+        """
+        # lateral velocity induced at the propeller from the boat yawing
+        v_rot = self['hull_length'] / 2.0 * self['psi_dot']
+        v_x = self['v_xp'] * -1.0
+        v_y = self['v_yp'] * -1.0 + v_rot
+
+        axial_x = np.cos(self['delta'] + np.pi / 2.0)
+        axial_y = np.sin(self['delta'] + np.pi / 2.0)
+        alpha = np.arctan2(v_y * axial_x - v_x * axial_y, axial_x * v_x + axial_y * v_y)
+
+        self['alpha'] = alpha
+
+        return alpha
+
+    def calc_thrust(self):
+        """
+        calculates the thrust delivered by every propeller based on the controlled power
+
+        :return: the thrust [N] of every boat
+        """
+        v_mag = np.sqrt(self['v_xp'] * self['v_xp'] + self['v_yp'] * self['v_yp'])
+        alpha_d = self.get_alpha()
+
+        power = self['power']
+        thrust = np.zeros(self.n_boats)
+        is_powered = power > 0.0
+
+        # no power is delivered to the other propellers so they have no induced velocity
+        v_induced = np.zeros(self.n_boats)
+        if np.all(is_powered):
+            # every boat is solved, so the rows are used without copying out the powered boats
+            v_induced = ThrustSurface.solve_induced_velocity_batch(v_mag, alpha_d, power, self['density_water'],
+                                                                   self['prop_area'], v_guess=self['v_induced'])
+            thrust = power / (v_mag + v_induced)
+        elif np.any(is_powered):
+            # the induced velocity of the previous step warm starts the solver
+            v_induced[is_powered] = ThrustSurface.solve_induced_velocity_batch(v_mag[is_powered], alpha_d[is_powered],
+                                                                               power[is_powered],
+                                                                               self['density_water'][is_powered],
+                                                                               self['prop_area'][is_powered],
+                                                                               v_guess=self['v_induced'][is_powered])
+            thrust[is_powered] = power[is_powered] / (v_mag[is_powered] + v_induced[is_powered])
+        self['v_induced'] = v_induced
+
+        return thrust
+
+    def get_moment_hull(self, cr, vy):
+        """
+        get the moment induced on the hull of every boat by the water due to the boat rotating around is vertical axis
+
+        :param cr: side force at phi_eff at 90[deg]
+        :param vy: effective transverse velocity of every boat
+        :return: the moment [N-m] of every boat
+        """
+        l = self['hull_length']
+        omega = self['psi_dot']
+        alpha = cr * self['area_water'] * self['density_water'] / (l / 2.0)
+
+        # forward porition
+        mrf = l * l * alpha / 192.0 * (3 * l * l * omega * omega + 16.0 * l * omega * vy + 24.0 * vy * vy)
+
+        # the second branch is only used when omega is not zero
+        is_translating = np.abs(vy) >= np.abs(omega * l / 2.0)
+        omega_sq = np.where(is_translating, 1.0, omega * omega)
+        mrb = np.where(is_translating,
+                       -l * l * alpha / 192.0 * (3.0 * l * l * omega * omega - 16.0 * l * omega * vy + 24.0 * vy * vy),
+                       alpha / (192.0 * omega_sq) * (np.power(l * omega - 2.0 * vy, 3.0) * (3.0 * l * omega + 2 * vy) -
+                                                     16.0 * np.power(vy, 4.0)))
+
+        mr = mrf + mrb
+
+        # adjust the direction of the moment based on the rate of rotation
+        return np.where(omega < 0, np.abs(mr), -np.abs(mr))
+
+    def calc_forces_and_moments(self, thrust):
+        """
+        given the state of the boats and their current thrust level, determine the forces and moments from the air,
+        water, and the propeller. The results are saved into the state of every boat.
+
+        :param thrust: the amount of thrust [N] of every boat
+        :return:
+        """
+        rho_air = self['density_air']
+        rho_water = self['density_water']
+        rot_angle = -self['psi']
+        cos_rot = np.cos(rot_angle)
+        sin_rot = np.sin(rot_angle)
+
+        # air forces and moments
+        v_eff_air_x = self['v_wind_x'] - self['v_x']
+        v_eff_air_y = self['v_wind_y'] - self['v_y']
+        self['v_x_eff_air'] = v_eff_air_x
+        self['v_y_eff_air'] = v_eff_air_y
+        v_air_local_x = cos_rot * v_eff_air_x - sin_rot * v_eff_air_y
+        v_air_local_y = sin_rot * v_eff_air_x + cos_rot * v_eff_air_y
+
+        phi_eff_air_local = np.arctan2(v_air_local_y, v_air_local_x)
+        self['psi_eff_air'] = phi_eff_air_local
+        q_air = v_air_local_x * v_air_local_x + v_air_local_y * v_air_local_y
+
+        cd_aero, cs_aero, cy_aero, cr_aero = self.template.get_aero_coeffs(phi_eff_air_local)
+
+        f_d_air = 0.5 * rho_air * q_air * self['area_air'] * cd_aero
+        f_s_air = 0.5 * rho_air * q_air * self['area_air'] * cs_aero
+        m_air = -0.5 * cy_aero * self['area_air'] * self['hull_length'] * rho_air * q_air
+
+        # water forces and moments
+        v_eff_water_x = self['v_current_x'] - self['v_x']
+        v_eff_water_y = self['v_current_y'] - self['v_y']
+        self['v_x_eff_water'] = v_eff_water_x
+        self['v_y_eff_water'] = v_eff_water_y
+        v_water_local_x = cos_rot * v_eff_water_x - sin_rot * v_eff_water_y
+        v_water_local_y = sin_rot * v_eff_water_x + cos_rot * v_eff_water_y
+        q_water = v_water_local_x * v_water_local_x + v_water_local_y * v_water_local_y
+
+        phi_eff_water_local = np.arctan2(v_water_local_y, v_water_local_x)
+        self['psi_eff_water'] = phi_eff_water_local
+        cd_hydro, cs_hydro, cy_hydro, cr_hydro = self.template.get_hydro_coeffs(phi_eff_water_local)
+
+        f_d_hydro = 0.5 * rho_water * q_water * self['area_water'] * cd_hydro
+        f_s_hydro = 0.5 * rho_water * q_water * self['area_water'] * cs_hydro
+
+        # the scalar model uses the air density for the hydrodynamic moment. Kept the same for equivalence
+        m_hydro = -0.5 * cy_hydro * self['area_water'] * self['hull_length'] * rho_air * q_water
+
+        mr = self.get_moment_hull(cr_hydro, self['v_yp'])
+
+        # propulsion forces
+        fx_p = thrust * np.cos(self['delta'])
+        fy_p = thrust * np.sin(self['delta'])
+        my_p = -fy_p * self['hull_length'] / 2.0
+
+        # save all of the forces and moments
+        self['f_d_air'] = f_d_air
+        self['f_s_air'] = f_s_air
+        self['m_air'] = m_air
+        self['f_d_water'] = f_d_hydro
+        self['f_s_water'] = f_s_hydro
+        self['m_water'] = m_hydro
+        self['fx_p'] = fx_p
+        self['fy_p'] = fy_p
+        self['my_p'] = my_p
+        self['mr'] = mr
+
+    def step(self, time):
+        """
+        steps every boat forward in time using the same Euler integration scheme as Movers.RiverBoat.step. The control
+        (power and propeller angle) should be set ahead of calling this function.
+
+        :param time: the time [s] of the simulation. Only used for data logging
+        :return:
+        """
+        # correct power if there is no fuel
+        no_fuel = self['fuel'] <= 0.0
+        self['power'] = np.where(no_fuel, 0.0, self['power'])
+        self['thrust'] = np.where(no_fuel, 0.0, self.calc_thrust())
+
+        psi = self['psi']
+        v_xp = self['v_xp']
+        v_yp = self['v_yp']
+        self['v_x'] = v_xp * np.cos(-psi) + v_yp * np.sin(-psi)
+        self['v_y'] = -v_xp * np.sin(-psi) + v_yp * np.cos(-psi)
+
+        # get the forces and moments of the boats. save them for telemetry later
+        self.calc_forces_and_moments(self['thrust'])
+
+        dt = self['delta_t']
+        mass = self['mass']
+        moi = self['moi']
+
+        fx_p = self['f_d_air'] + self['f_d_water'] + self['fx_p']
+        delta_xp = v_xp * dt + 0.5 * fx_p / mass * dt * dt
+
+        fy_p = self['f_s_air'] + self['f_s_water'] + self['fy_p']
+        delta_yp = v_yp * dt + 0.5 * fy_p / mass * dt * dt
+
+        mom = self['m_air'] + self['m_water'] + self['my_p'] + self['mr']
+        delta_psi = self['psi_dot'] * dt + 0.5 * mom * (self['hull_length'] / 2.0) / moi * dt * dt
+
+        psi = psi + delta_psi
+        psi = np.where(psi > 2.0 * np.pi, psi - 2.0 * np.pi, psi)
+        psi = np.where(psi < 0.0, psi + 2.0 * np.pi, psi)
+        self['psi'] = psi
+
+        # convert change in position to global frame
+        cos_psi = np.cos(-psi)
+        sin_psi = np.sin(-psi)
+        self['x_pos'] += delta_xp * cos_psi + delta_yp * sin_psi
+        self['y_pos'] += -delta_xp * sin_psi + delta_yp * cos_psi
+
+        v_xp = v_xp + fx_p / mass * dt
+        v_yp = v_yp + fy_p / mass * dt
+        self['v_xp'] = v_xp
+        self['v_yp'] = v_yp
+        self['psi_dot'] += mom / moi * dt
+
+        self['v_x'] = v_xp * cos_psi + v_yp * sin_psi
+        self['v_y'] = -v_xp * sin_psi + v_yp * cos_psi
+
+        acc_xp = fx_p / mass
+        acc_yp = fy_p / mass
+        self['acc_xp'] = acc_xp
+        self['acc_yp'] = acc_yp
+        self['psi_double_dot'] = mom / moi
+
+        # convert acceleration to global reference plane
+        self['acc_x'] = acc_xp * cos_psi + acc_yp * sin_psi
+        self['acc_y'] = -acc_xp * sin_psi + acc_yp * cos_psi
+
+        # calculate the fuel used in the simulation
+        fuel = self['fuel'] - self['power'] * self['bsfc'] * dt
+        self['fuel'] = np.maximum(fuel, 0.0)
+
+        self['time'] = time
+
+    def derived_measurements(self, destination):
+        """
+        given the destination, the distance and angle from every boat to the destination is calculated.
+
+        :param destination: goal state of the boats. Either one (x,y) pair of points [m] shared by all boats, or an
+            array of shape (n_boats, 2)
+        :return:
+        """
+        destination = np.asarray(destination, dtype=float)
+        dest_x = destination[..., 0]
+        dest_y = destination[..., 1]
+
+        delta_x = dest_x - self['x_pos']
+        delta_y = dest_y - self['y_pos']
+        self['dest_dist'] = np.sqrt(delta_x * delta_x + delta_y * delta_y)
+        self['theta'] = np.arctan2(delta_y, delta_x)
+
+        mu1 = self['theta'] - self['psi']
+        mu2 = np.where(mu1 >= 0, np.pi * 2.0 - mu1, np.pi * 2.0 + mu1)  # explementary angle
+        self['mu'] = np.where(np.abs(mu2) < np.abs(mu1), mu2, mu1)